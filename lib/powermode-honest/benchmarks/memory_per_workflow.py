@@ -0,0 +1,65 @@
+"""
+Memory per tracked workflow - legacy dict vs WorkflowRecord
+
+Builds N workflows both ways with tracemalloc running and reports the
+bytes each one costs. The structure dict is shared by all workflows so
+only the per-workflow bookkeeping is measured.
+
+    python benchmarks/memory_per_workflow.py            # 100k
+    python benchmarks/memory_per_workflow.py 100000 1000000
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.storage import InMemoryWorkflowStore, WorkflowRecord  # noqa: E402
+
+
+STRUCTURE: Dict[str, Any] = {'tasks': [{'id': f't{i}', 'estimated_effort': 1} for i in range(5)]}
+
+
+def legacy_workflow(index: int) -> Dict[str, Any]:
+    """The dict every workflow used to be stored as"""
+    return {
+        'description': f"Workflow {index}",
+        'structure': STRUCTURE,
+        'created_at': datetime.now(),
+        'status': 'organized',
+        'progress': 0.0,
+    }
+
+
+def record_workflow(index: int) -> WorkflowRecord:
+    return WorkflowRecord(f"Workflow {index}", STRUCTURE)
+
+
+def measure(count: int, factory: Callable[[int], Any]) -> float:
+    """Bytes allocated per workflow while filling a store with count workflows"""
+    gc.collect()
+    tracemalloc.start()
+    store = InMemoryWorkflowStore()
+    for index in range(count):
+        # Bypass the aggregates so legacy dicts can be measured through the same store
+        store._save(f"workflow_{index:016x}", factory(index))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return current / count
+
+
+def main(counts: List[int]):
+    print(f"{'workflows':>10} {'dict (B)':>10} {'record (B)':>11} {'saved':>7}")
+    for count in counts:
+        legacy = measure(count, legacy_workflow)
+        compact = measure(count, record_workflow)
+        print(f"{count:>10} {legacy:>10.0f} {compact:>11.0f} {1 - compact / legacy:>7.0%}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100_000])
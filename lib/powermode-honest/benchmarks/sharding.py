@@ -0,0 +1,84 @@
+"""
+Sharded engine scaling - throughput with 1, 2, 4 and 8 shards
+
+Every workflow goes through organize, manage_tasks and one progress
+update (three routed calls). Shards use in-memory stores, so the numbers
+measure engine and routing work rather than disk. Scaling can only be
+near-linear up to the number of free cores; the router itself runs on
+one core and caps the total eventually.
+
+    python benchmarks/sharding.py
+    python benchmarks/sharding.py --workflows 50000 --shards 1 2 4 8 16
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from main import PowerModeHonest  # noqa: E402
+
+
+def bench_config(directory: str) -> Dict[str, Any]:
+    config = PowerModeHonest._default_config()
+    config['storage'] = {'backend': 'memory'}
+    config['tiering'] = {'enabled': False}
+    config['logging'] = {'level': 'WARNING', 'file': os.path.join(directory, 'bench.log'), 'console': False}
+    return config
+
+
+async def run(shards: int, workflows: int, concurrency: int, directory: str) -> float:
+    """Workflows per second through a router over `shards` worker processes"""
+    router = PowerModeHonest.sharded(shards, bench_config(directory))
+    await router.start()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with slots:
+            result = await router.organize_workflow(f"Benchmark workflow {index}: build and test a feature")
+            workflow_id = result['workflow_id']
+            await router.manage_tasks(workflow_id)
+            tasks = result['structure'].get('tasks', [])
+            await router.mark_completed(workflow_id, [task['id'] for task in tasks[:1]])
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(workflows)))
+        elapsed = time.perf_counter() - started
+        report = await router.generate_report()
+        if report['total_workflows'] != workflows:
+            raise RuntimeError(f"Expected {workflows} workflows, report has {report['total_workflows']}")
+        print(f"  messages per frame: {report['metrics']['router']['messages_per_frame']}")
+    finally:
+        await router.close()
+    return workflows / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure sharded engine scaling')
+    parser.add_argument('--workflows', type=int, default=20_000)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--concurrency', type=int, default=512, help='Workflows in flight at once')
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.workflows} workflows per run")
+    results: List[Any] = []
+    with tempfile.TemporaryDirectory() as directory:
+        for shards in args.shards:
+            print(f"{shards} shard(s)...")
+            results.append((shards, asyncio.run(run(shards, args.workflows, args.concurrency, directory))))
+
+    baseline = results[0][1] / results[0][0]
+    print(f"\n{'shards':>6} {'workflows/s':>12} {'speedup':>8} {'efficiency':>10}")
+    for shards, rate in results:
+        speedup = rate / baseline
+        print(f"{shards:>6} {rate:>12.0f} {speedup:>7.2f}x {speedup / shards:>9.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+CLI cold-start benchmark
+
+Measures what a script pays per `main.py --task` invocation:
+- import time of main (python -X importtime), with the heaviest imports
+- wall-clock time of complete --task runs (median and best of N)
+
+Runs use a scratch directory as --data-dir so the database and logs
+persist between runs, like repeated calls from a script.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 20 --main /path/to/other/main.py
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+
+DEFAULT_MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main.py')
+
+
+def _environment(main_path: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    package_dir = os.path.dirname(os.path.abspath(main_path))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [env.get('PYTHONPATH'), package_dir]))
+    return env
+
+
+def import_times(main_path: str, cwd: str, top: int) -> Tuple[int, List[Tuple[int, str]]]:
+    """Cumulative import time of main in microseconds, plus its heaviest direct imports"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=cwd, env=_environment(main_path), capture_output=True, text=True, check=True
+    )
+    total = 0
+    children: List[Tuple[int, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if name.strip() == 'main':
+            total = int(cumulative)
+        elif depth == 1:
+            children.append((int(cumulative), name.strip()))
+    return total, sorted(children, reverse=True)[:top]
+
+
+def task_runs(main_path: str, cwd: str, runs: int) -> List[float]:
+    """Wall-clock seconds of complete `main.py --task` runs"""
+    timings = []
+    for run in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, main_path, '--task', f"Startup benchmark {run}", '--data-dir', cwd],
+            cwd=cwd, env=_environment(main_path), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True
+        )
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _timed(command: List[str], cwd: str) -> float:
+    started = time.perf_counter()
+    subprocess.run(command, cwd=cwd, check=True)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure CLI cold-start time')
+    parser.add_argument('--main', default=DEFAULT_MAIN, help='main.py to measure (default: this checkout)')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=8, help='Heaviest imports to list')
+    args = parser.parse_args()
+    main_path = os.path.abspath(args.main)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        interpreter = task_runs(main_path, scratch, 1)  # warms the OS page cache and bytecode
+        bare = statistics.median(
+            _timed([sys.executable, '-c', 'pass'], scratch) for _ in range(args.runs)
+        )
+        total, heaviest = import_times(main_path, scratch, args.top)
+        timings = task_runs(main_path, scratch, args.runs)
+
+    print(f"main.py: {main_path}")
+    print(f"import main: {total / 1000:.1f} ms (python -X importtime, includes its overhead)")
+    for cumulative, name in heaviest:
+        print(f"  {cumulative / 1000:7.1f} ms  {name}")
+    print(f"--task wall clock over {args.runs} runs: median {statistics.median(timings) * 1000:.1f} ms, "
+          f"best {min(timings) * 1000:.1f} ms (first run {interpreter[0] * 1000:.1f} ms)")
+    print(f"bare interpreter start: {bare * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
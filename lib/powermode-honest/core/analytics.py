@@ -0,0 +1,232 @@
+"""
+Columnar workflow analytics (requires numpy)
+
+Keeps one row per workflow in NumPy columns - progress, status code,
+created_at, last_updated and task count - so capacity-planning queries
+are vectorized instead of looping over WorkflowRecords:
+- Progress percentiles and histogram, per-status breakdowns, progress
+  over workflow age, staleness and task-count distributions
+- Rows are maintained incrementally as a store observer; the only full
+  scan is the one that fills the columns when they are attached
+- Deleted rows are reused, and capacity doubles when the columns fill up
+- Percentiles are nearest-rank over fixed-width bins (0.1 percentage
+  points of progress, 1 hour of staleness, 1 task) - one O(n) bincount
+  instead of a sort, so a million workflows take milliseconds
+
+Import this module only when distributions are requested - numpy is an
+optional dependency.
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from core.storage import WorkflowRecord, WorkflowStore, epoch_ms
+
+
+HOUR_MS = 3600 * 1000
+DAY_MS = 24 * HOUR_MS
+
+# Upper bounds of the age buckets used by progress_by_age()
+AGE_BUCKETS_MS = (HOUR_MS, 6 * HOUR_MS, DAY_MS, 7 * DAY_MS, 30 * DAY_MS)
+AGE_LABELS = ('<1h', '1-6h', '6-24h', '1-7d', '7-30d', '>30d')
+
+DEFAULT_PERCENTILES = (50, 75, 90, 95, 99)
+PROGRESS_STEPS = 10  # Progress bins per percentage point
+
+# Query methods take a row selector from _live_rows(), so summary() selects once
+Rows = Union[slice, np.ndarray, None]
+
+
+def _binned_percentiles(counts: np.ndarray, percentiles: Sequence[float], bin_width: float = 1) -> Dict[str, float]:
+    """Nearest-rank percentiles from per-bin counts (value = lower edge of the bin)"""
+    cumulative = np.cumsum(counts)
+    total = int(cumulative[-1]) if len(cumulative) else 0
+    if not total:
+        return {}
+    ranks = np.maximum(np.ceil(np.asarray(percentiles, dtype=float) / 100 * total), 1)
+    bins = np.searchsorted(cumulative, ranks)
+    return {f"p{p:g}": round(float(b * bin_width), 1) for p, b in zip(percentiles, bins)}
+
+
+class ProgressColumns:
+    """Columnar view of every workflow in a store, kept current by its write path"""
+
+    def __init__(self, capacity: int = 1024):
+        self._capacity = max(capacity, 16)
+        self.progress = np.zeros(self._capacity, dtype=np.float32)
+        self.status = np.zeros(self._capacity, dtype=np.uint8)
+        self.created_at = np.zeros(self._capacity, dtype=np.int64)
+        self.last_updated = np.zeros(self._capacity, dtype=np.int64)
+        self.task_count = np.zeros(self._capacity, dtype=np.int32)
+        self.live = np.zeros(self._capacity, dtype=bool)
+
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._size = 0  # High-water mark; rows >= _size were never used
+        self._status_codes: Dict[str, int] = {}
+        self.status_names: List[str] = []
+
+    @classmethod
+    def attach(cls, store: WorkflowStore) -> 'ProgressColumns':
+        """Fill columns from store (one full scan) and follow its writes from then on"""
+        columns = cls(capacity=max(len(store) * 5 // 4, 1024))
+        for workflow_id, workflow in store.items():
+            columns.workflow_changed(workflow_id, workflow)
+        store.add_observer(columns)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # -- store observer ------------------------------------------------------
+
+    def workflow_changed(self, workflow_id: str, workflow: WorkflowRecord) -> None:
+        row = self._rows.get(workflow_id)
+        if row is None:
+            row = self._allocate()
+            self._rows[workflow_id] = row
+            self.live[row] = True
+            self.created_at[row] = workflow.created_at
+            self.task_count[row] = len(workflow.structure.get('tasks', ()))
+        self.progress[row] = workflow.progress
+        self.status[row] = self._status_code(workflow.status)
+        self.last_updated[row] = workflow.last_updated or workflow.created_at
+
+    def workflow_removed(self, workflow_id: str) -> None:
+        row = self._rows.pop(workflow_id, None)
+        if row is not None:
+            self.live[row] = False
+            self._free.append(row)
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._size == self._capacity:
+            self._grow()
+        self._size += 1
+        return self._size - 1
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        for name in ('progress', 'status', 'created_at', 'last_updated', 'task_count', 'live'):
+            column = getattr(self, name)
+            grown = np.zeros(self._capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def _status_code(self, status: str) -> int:
+        code = self._status_codes.get(status)
+        if code is None:
+            if len(self.status_names) > np.iinfo(np.uint8).max:
+                raise ValueError("More than 256 distinct workflow statuses")
+            code = self._status_codes[status] = len(self.status_names)
+            self.status_names.append(status)
+        return code
+
+    # -- vectorized queries ----------------------------------------------------
+
+    def _live_rows(self) -> Rows:
+        """Row selector: a plain slice (views, no copying) unless deleted rows leave holes"""
+        if not self._free:
+            return slice(0, self._size)
+        return np.flatnonzero(self.live[:self._size])
+
+    def _progress_counts(self, rows: Rows) -> np.ndarray:
+        """Workflows per 0.1-point progress bin; the last bin (1000) is exactly complete"""
+        steps = (np.clip(self.progress[rows], 0, 100) * PROGRESS_STEPS).astype(np.int32)
+        return np.bincount(steps, minlength=100 * PROGRESS_STEPS + 1)
+
+    def progress_percentiles(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                             rows: Rows = None) -> Dict[str, float]:
+        rows = self._live_rows() if rows is None else rows
+        return _binned_percentiles(self._progress_counts(rows), percentiles, 1 / PROGRESS_STEPS)
+
+    def progress_histogram(self, bins: int = 10, rows: Rows = None) -> Dict[str, int]:
+        """Counts per progress range; exactly-complete workflows get their own '100' bin"""
+        rows = self._live_rows() if rows is None else rows
+        counts = self._progress_counts(rows)
+        edges = np.linspace(0, 100 * PROGRESS_STEPS, bins + 1).astype(int)
+        sums = np.add.reduceat(counts[:-1], edges[:-1])
+        histogram = {
+            f"{edges[i] / PROGRESS_STEPS:g}-{edges[i + 1] / PROGRESS_STEPS:g}": int(count)
+            for i, count in enumerate(sums)
+        }
+        histogram['100'] = int(counts[-1])
+        return histogram
+
+    def by_status(self, rows: Rows = None) -> Dict[str, Dict[str, Any]]:
+        """Count, mean progress and mean task count per status"""
+        rows = self._live_rows() if rows is None else rows
+        codes = self.status[rows]
+        statuses = len(self.status_names)
+        counts = np.bincount(codes, minlength=statuses)
+        progress_sums = np.bincount(codes, weights=self.progress[rows], minlength=statuses)
+        task_sums = np.bincount(codes, weights=self.task_count[rows], minlength=statuses)
+        return {
+            self.status_names[code]: {
+                'count': int(counts[code]),
+                'average_progress_percent': round(float(progress_sums[code] / counts[code]), 1),
+                'average_tasks': round(float(task_sums[code] / counts[code]), 1),
+            }
+            for code in np.flatnonzero(counts)
+        }
+
+    def progress_by_age(self, now: Optional[int] = None, rows: Rows = None) -> Dict[str, Dict[str, Any]]:
+        """Progress curve over workflow age (time since created_at), in fixed buckets"""
+        rows = self._live_rows() if rows is None else rows
+        now = epoch_ms() if now is None else now
+        ages = now - self.created_at[rows]
+        # A few whole-array comparisons beat a binary search per row for this many edges
+        buckets = np.zeros(len(ages), dtype=np.intp)
+        for edge in AGE_BUCKETS_MS:
+            buckets += ages >= edge
+        progress = self.progress[rows]
+        counts = np.bincount(buckets, minlength=len(AGE_LABELS))
+        progress_sums = np.bincount(buckets, weights=progress, minlength=len(AGE_LABELS))
+        completed = np.bincount(buckets[progress >= 100], minlength=len(AGE_LABELS))
+        curve = {}
+        for bucket, label in enumerate(AGE_LABELS):
+            count = int(counts[bucket])
+            curve[label] = {
+                'count': count,
+                'average_progress_percent': round(float(progress_sums[bucket] / count), 1) if count else 0.0,
+                'completed_percent': round(float(completed[bucket] / count * 100), 1) if count else 0.0,
+            }
+        return curve
+
+    def staleness_hours(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES, now: Optional[int] = None,
+                        rows: Rows = None) -> Dict[str, float]:
+        """Percentiles of hours since the last update, over unfinished workflows"""
+        rows = self._live_rows() if rows is None else rows
+        unfinished = self.last_updated[rows][self.progress[rows] < 100]
+        now = epoch_ms() if now is None else now
+        hours = np.maximum(now - unfinished, 0) // HOUR_MS
+        return _binned_percentiles(np.bincount(hours), percentiles)
+
+    def task_count_distribution(self, rows: Rows = None) -> Dict[str, Any]:
+        rows = self._live_rows() if rows is None else rows
+        task_counts = self.task_count[rows]
+        if not len(task_counts):
+            return {}
+        distribution = _binned_percentiles(np.bincount(task_counts), DEFAULT_PERCENTILES)
+        distribution.update({'mean': round(float(task_counts.mean()), 1), 'max': int(task_counts.max())})
+        return distribution
+
+    def summary(self, now: Optional[int] = None) -> Dict[str, Any]:
+        """Every distribution above in one dict, computed from one live-row selection"""
+        started = time.perf_counter()
+        now = epoch_ms() if now is None else now
+        rows = self._live_rows()
+        summary = {
+            'workflows': len(self),
+            'progress_percentiles': self.progress_percentiles(rows=rows),
+            'progress_histogram': self.progress_histogram(rows=rows),
+            'by_status': self.by_status(rows=rows),
+            'progress_by_age': self.progress_by_age(now, rows=rows),
+            'staleness_hours': self.staleness_hours(now=now, rows=rows),
+            'tasks_per_workflow': self.task_count_distribution(rows=rows),
+        }
+        summary['query_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return summary
@@ -0,0 +1,190 @@
+"""
+Batch helpers - bounded fan-out for many workflow operations
+
+Only a window of max_concurrency items is in flight at any time and the
+input iterable is consumed lazily, so memory stays flat no matter how many
+items a batch holds. Failures are returned per item instead of aborting
+the whole batch.
+
+JSON-lines input is read by a background thread into a bounded queue, so
+a slow disk or pipe never stalls the event loop and a fast one never
+buffers more than max_buffered lines.
+"""
+
+import asyncio
+import json
+import sys
+import threading
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple, TypeVar, Union
+)
+
+
+T = TypeVar('T')
+
+# Per-process organizer used by worker processes (see create_structure_in_worker)
+_worker_organizer = None
+
+
+def create_structure_in_worker(task_description: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run WorkflowOrganizer.create_structure inside a ProcessPoolExecutor worker
+
+    Module-level so it can be pickled. Each worker process builds its own
+    organizer once and reuses it for every item it receives.
+    """
+    global _worker_organizer
+    if _worker_organizer is None:
+        from core.workflow import WorkflowOrganizer
+        _worker_organizer = WorkflowOrganizer()
+    return asyncio.run(_worker_organizer.create_structure(task_description, context))
+
+
+def parse_batch_line(line: str) -> Tuple[str, Dict[str, Any], Any]:
+    """
+    Parse one JSON-lines batch item into (description, context, client id)
+
+    An item is either a JSON string or an object with 'description' and
+    optional 'context' and 'id' (echoed back in the result).
+    """
+    value = json.loads(line)
+    if isinstance(value, str):
+        return value, {}, None
+    if isinstance(value, dict) and isinstance(value.get('description'), str):
+        return value['description'], value.get('context') or {}, value.get('id')
+    raise ValueError("Expected a JSON string or an object with a 'description' string")
+
+
+async def read_lines(path: str, max_buffered: int = 1024) -> AsyncIterator[str]:
+    """
+    Yield lines of a text file ('-' for stdin) read by a background thread
+
+    The thread blocks once max_buffered lines are waiting, so memory stays
+    constant however large the input is.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(max_buffered)
+    stopped = threading.Event()
+    end = object()
+
+    def reader():
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        outcome: Any = end
+        try:
+            for line in stream:
+                if stopped.is_set():
+                    return
+                asyncio.run_coroutine_threadsafe(queue.put(line), loop).result()
+        except Exception as e:
+            outcome = e
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        if not stopped.is_set():
+            asyncio.run_coroutine_threadsafe(queue.put(outcome), loop).result()
+
+    threading.Thread(target=reader, name='batch-reader', daemon=True).start()
+    try:
+        while True:
+            line = await queue.get()
+            if line is end:
+                return
+            if isinstance(line, Exception):
+                raise line
+            yield line
+    finally:
+        # Unblock a reader waiting on a full queue so it can notice the stop
+        stopped.set()
+        while not queue.empty():
+            queue.get_nowait()
+
+
+async def _indexed(index: int, awaitable: Awaitable[T]) -> Tuple[int, Any]:
+    try:
+        return index, await awaitable
+    except Exception as e:
+        return index, e
+
+
+async def bounded_as_completed(items: Union[Iterable[Any], AsyncIterable[Any]],
+                               worker: Callable[[Any], Awaitable[T]],
+                               max_concurrency: int = 32) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Run worker(item) for every item with at most max_concurrency in flight
+
+    Yields (input_index, result) as items finish. If worker raises, the
+    exception object is yielded as the result for that index. items may
+    also be an async iterable (e.g. lines still being read).
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+
+    if isinstance(items, AsyncIterable):
+        async for outcome in _bounded_from_stream(items.__aiter__(), worker, max_concurrency):
+            yield outcome
+        return
+
+    iterator = enumerate(items)
+    pending = set()
+    exhausted = False
+
+    try:
+        while True:
+            while not exhausted and len(pending) < max_concurrency:
+                try:
+                    index, item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(_indexed(index, worker(item))))
+
+            if not pending:
+                return
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # Consumer stopped early - don't leave orphaned work running
+        for task in pending:
+            task.cancel()
+
+
+async def _bounded_from_stream(iterator: AsyncIterator[Any],
+                               worker: Callable[[Any], Awaitable[T]],
+                               max_concurrency: int) -> AsyncIterator[Tuple[int, Any]]:
+    """bounded_as_completed for async input - the next item is awaited alongside running work"""
+    pending = set()
+    next_item: Optional[asyncio.Future] = None
+    index = 0
+    exhausted = False
+
+    try:
+        while True:
+            if not exhausted and next_item is None and len(pending) < max_concurrency:
+                next_item = asyncio.ensure_future(iterator.__anext__())
+
+            waiting = pending | {next_item} if next_item is not None else pending
+            if not waiting:
+                return
+
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            if next_item in done:
+                try:
+                    item = next_item.result()
+                except StopAsyncIteration:
+                    exhausted = True
+                else:
+                    pending.add(asyncio.ensure_future(_indexed(index, worker(item))))
+                    index += 1
+                done.discard(next_item)
+                next_item = None
+
+            for task in done:
+                pending.discard(task)
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if next_item is not None:
+            next_item.cancel()
@@ -0,0 +1,194 @@
+"""
+Workflow structure cache
+
+Memoizes WorkflowOrganizer.create_structure results keyed by a normalized
+task description plus a stable hash of the context dict.
+
+- LRU + TTL eviction and a byte-size budget
+- Single-flight: concurrent identical requests share one breakdown, run
+  as its own task so no single caller's cancellation aborts it
+- Cached structures are frozen (read-only dicts and tuples), so one
+  workflow can never mutate what another workflow sees
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+_FILLER_WORDS = frozenset({'a', 'an', 'the'})
+
+
+class FrozenDict(dict):
+    """Read-only dict - still a dict, so json.dumps and .get() keep working"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Cached workflow structures are read-only, use thaw() for a mutable copy")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts to FrozenDict and lists to tuples"""
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Mutable deep copy of a frozen structure"""
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    if isinstance(value, frozenset):
+        return set(value)
+    return value
+
+
+def normalize_description(task_description: str) -> str:
+    """Lowercase, drop punctuation and filler words, collapse whitespace"""
+    text = _PUNCTUATION.sub(' ', task_description.lower())
+    return ' '.join(word for word in _WHITESPACE.split(text) if word and word not in _FILLER_WORDS)
+
+
+def context_fingerprint(context: Optional[Dict[str, Any]]) -> str:
+    """Stable hash of a context dict, independent of key order"""
+    if not context:
+        return ''
+    encoded = json.dumps(context, sort_keys=True, separators=(',', ':'), default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class StructureCache:
+    """
+    LRU/TTL cache of frozen workflow structures with single-flight loading
+
+    Not thread-safe - meant to be used from one event loop.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 3600.0,
+                 max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        # key -> (structure, expires_at, size_bytes)
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[Any, float, int]]' = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = {'lru': 0, 'ttl': 0, 'size': 0}
+
+    @staticmethod
+    def make_key(task_description: str, context: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+        return normalize_description(task_description), context_fingerprint(context)
+
+    def _lookup(self, key: Tuple[str, str]) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        structure, expires_at, size = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._bytes -= size
+            self.evictions['ttl'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return structure
+
+    def _store(self, key: Tuple[str, str], structure: Any) -> None:
+        # A replaced entry's bytes are released first, or the budget would count both
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[2]
+        size = len(json.dumps(structure, separators=(',', ':'), default=str))
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (structure, time.monotonic() + self.ttl_seconds, size)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries:
+            self._evict_oldest('lru')
+        while self._bytes > self.max_bytes:
+            self._evict_oldest('size')
+
+    def _evict_oldest(self, reason: str) -> None:
+        _, (_, _, size) = self._entries.popitem(last=False)
+        self._bytes -= size
+        self.evictions[reason] += 1
+
+    async def get_or_create(self, task_description: str, context: Optional[Dict[str, Any]],
+                            factory: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Return the cached structure, or build it once with factory()
+
+        Concurrent callers with the same key wait for the same factory call,
+        which runs in a task of its own: a cancelled caller stops waiting,
+        the others still get the structure (and a factory error each). The
+        returned structure is frozen; use thaw() to get a mutable copy.
+        """
+        key = self.make_key(task_description, context)
+
+        structure = self._lookup(key)
+        if structure is not None:
+            self.hits += 1
+            return structure
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._create(key, factory))
+            self._inflight[key] = task
+            # Retrieve the outcome so a failure whose callers all left isn't logged as unhandled
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return await asyncio.shield(task)
+
+    async def _create(self, key: Tuple[str, str], factory: Callable[[], Awaitable[Dict[str, Any]]]) -> Any:
+        try:
+            structure = freeze(await factory())
+        finally:
+            del self._inflight[key]
+        self._store(key, structure)
+        return structure
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the metrics summary"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate_percent': round((self.hits + self.coalesced) / lookups * 100, 1) if lookups else 0.0,
+            'evictions': dict(self.evictions),
+        }
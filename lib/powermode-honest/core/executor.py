@@ -0,0 +1,232 @@
+"""
+Dependency-aware task executor
+
+Runs the tasks of a plan with user-registered handlers:
+- A task is dispatched once all its dependencies have completed, most
+  critical first (longest remaining effort downstream of it)
+- Handlers run on the event loop (coroutine functions), in a thread
+  pool or in a process pool (sync functions, mode='thread'/'process')
+- Every task holds a slot of one resource type - cpu, memory, network or
+  storage, the four types the status dashboard tracks - and each type has
+  its own concurrency limit; a saturated resource never holds back ready
+  tasks that need a different one
+- A failed task blocks its dependents, independent branches keep going
+- on_complete(task_id) is awaited after each success, e.g. to feed
+  completions into progress tracking
+"""
+
+import asyncio
+import heapq
+import inspect
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from core.graph import TaskGraph
+from core.progress import task_id_of
+
+
+RESOURCE_TYPES = ('cpu', 'memory', 'network', 'storage')
+EXECUTION_MODES = ('async', 'thread', 'process')
+
+# Lookup order for a task's handler: its ID, then these task fields, then DEFAULT_HANDLER
+HANDLER_FIELDS = ('handler', 'type')
+DEFAULT_HANDLER = '*'
+
+
+def default_resource_limits() -> Dict[str, int]:
+    """Concurrent tasks per resource type"""
+    return {'cpu': os.cpu_count() or 1, 'memory': 2, 'network': 32, 'storage': 4}
+
+
+class TaskHandler:
+    """A registered callable plus where and with which resource it runs"""
+
+    __slots__ = ('func', 'mode', 'resource')
+
+    def __init__(self, func: Callable[[Dict[str, Any]], Any], mode: Optional[str] = None, resource: str = 'cpu'):
+        if mode is None:
+            mode = 'async' if inspect.iscoroutinefunction(func) else 'thread'
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"mode must be one of {EXECUTION_MODES}")
+        if resource not in RESOURCE_TYPES:
+            raise ValueError(f"resource must be one of {RESOURCE_TYPES}")
+        self.func = func
+        self.mode = mode
+        self.resource = resource
+
+
+class TaskExecutor:
+    """
+    Runs task plans with bounded, per-resource concurrency
+
+    Register handlers with register(), then await run(tasks). Thread and
+    process pools are created on first use; close() shuts them down.
+    """
+
+    def __init__(self, resource_limits: Optional[Mapping[str, Optional[int]]] = None, max_concurrency: int = 64,
+                 thread_workers: Optional[int] = None, process_workers: Optional[int] = None):
+        self.resource_limits = default_resource_limits()
+        for resource, limit in (resource_limits or {}).items():
+            if resource not in RESOURCE_TYPES:
+                raise ValueError(f"Unknown resource type: {resource}")
+            if limit is not None:
+                self.resource_limits[resource] = max(int(limit), 1)
+        self.max_concurrency = max_concurrency
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+
+        self.handlers: Dict[str, TaskHandler] = {}
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    def register(self, name: str, func: Callable[[Dict[str, Any]], Any],
+                 mode: Optional[str] = None, resource: str = 'cpu') -> None:
+        """
+        Run func(task) for tasks matching name
+
+        name is a task ID, a value of the task's 'handler' or 'type' field,
+        or '*' for every other task. mode defaults to 'async' for coroutine
+        functions and 'thread' otherwise; 'process' needs a picklable
+        module-level function. A task's own 'resource' field overrides
+        resource.
+        """
+        self.handlers[name] = TaskHandler(func, mode, resource)
+
+    def handler_for(self, task: Mapping[str, Any], task_id: Optional[str] = None) -> Optional[TaskHandler]:
+        handler = self.handlers.get(task_id if task_id is not None else task_id_of(task))
+        for field in HANDLER_FIELDS:
+            if handler is None and task.get(field) is not None:
+                handler = self.handlers.get(str(task[field]))
+        return handler or self.handlers.get(DEFAULT_HANDLER)
+
+    async def run(self, tasks: Iterable[Mapping[str, Any]], completed: Iterable[str] = (),
+                  on_complete: Optional[Callable[[str], Awaitable[Any]]] = None,
+                  stop_on_failure: bool = False) -> Dict[str, Any]:
+        """
+        Execute every open task in dependency order
+
+        completed lists tasks that are already done (not run again). Raises
+        CycleError for cyclic plans and KeyError if a task has no handler,
+        both before anything runs. Returns completed, failed and blocked
+        task IDs, handler results and peak parallelism per resource.
+        """
+        task_list = list(tasks)
+        graph = TaskGraph.from_tasks(task_list)
+        tasks = {task_id_of(task, position): task for position, task in enumerate(task_list)}
+        done = set(completed) & tasks.keys()
+        graph.complete(done)
+
+        plan: Dict[str, Tuple[TaskHandler, str]] = {}
+        for task_id, task in tasks.items():
+            if task_id in done:
+                continue
+            handler = self.handler_for(task, task_id)
+            if handler is None:
+                raise KeyError(f"No handler registered for task {task_id}")
+            resource = task.get('resource') or handler.resource
+            if resource not in RESOURCE_TYPES:
+                raise ValueError(f"Task {task_id} needs unknown resource type {resource!r}")
+            plan[task_id] = (handler, resource)
+
+        # Ready tasks stay in critical-path order: longest remaining chain behind them first
+        downstream = dict(zip(graph.task_ids, graph.downstream_effort()))
+        waiting_on = {
+            task_id: sum(1 for dependency in graph.dependencies(task_id) if dependency not in done)
+            for task_id in plan
+        }
+        ready: Dict[str, List[Tuple[float, int, str]]] = {resource: [] for resource in RESOURCE_TYPES}
+        order = {task_id: rank for rank, task_id in enumerate(graph.topological_order())}
+
+        def make_ready(task_id: str) -> None:
+            heapq.heappush(ready[plan[task_id][1]], (-downstream[task_id], order[task_id], task_id))
+
+        for task_id, count in waiting_on.items():
+            if not count:
+                make_ready(task_id)
+
+        in_use = dict.fromkeys(RESOURCE_TYPES, 0)
+        peak = dict.fromkeys(RESOURCE_TYPES, 0)
+        running: Dict[asyncio.Future, str] = {}
+        finished: List[str] = []
+        failed: Dict[str, str] = {}
+        results: Dict[str, Any] = {}
+        stopping = False
+        started = time.perf_counter()
+
+        try:
+            while True:
+                # Dispatch the most critical ready task among resources with a free slot
+                while not stopping and len(running) < self.max_concurrency:
+                    candidates = [
+                        heap[0] + (resource,) for resource, heap in ready.items()
+                        if heap and in_use[resource] < self.resource_limits[resource]
+                    ]
+                    if not candidates:
+                        break
+                    *_, task_id, resource = min(candidates)
+                    heapq.heappop(ready[resource])
+                    in_use[resource] += 1
+                    peak[resource] = max(peak[resource], in_use[resource])
+                    running[asyncio.ensure_future(self._invoke(plan[task_id][0], tasks[task_id]))] = task_id
+
+                if not running:
+                    break
+
+                done_futures, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done_futures:
+                    task_id = running.pop(future)
+                    in_use[plan[task_id][1]] -= 1
+                    error = future.exception()
+                    if error is not None:
+                        failed[task_id] = f"{type(error).__name__}: {error}"
+                        stopping = stopping or stop_on_failure
+                        continue
+                    results[task_id] = future.result()
+                    finished.append(task_id)
+                    if on_complete is not None:
+                        await on_complete(task_id)
+                    for dependent in graph.dependents(task_id):
+                        if dependent in waiting_on:
+                            waiting_on[dependent] -= 1
+                            if not waiting_on[dependent]:
+                                make_ready(dependent)
+        finally:
+            for future in running:
+                future.cancel()
+
+        settled: Set[str] = set(finished) | failed.keys()
+        return {
+            'completed': finished,
+            'failed': failed,
+            'blocked': [task_id for task_id in plan if task_id not in settled],
+            'results': results,
+            'elapsed_seconds': round(time.perf_counter() - started, 3),
+            'peak_concurrency': peak,
+        }
+
+    async def _invoke(self, handler: TaskHandler, task: Mapping[str, Any]) -> Any:
+        if handler.mode == 'async':
+            result = handler.func(task)
+            return await result if inspect.isawaitable(result) else result
+        # Pools get a plain dict - structures from the cache are read-only mappings
+        task = dict(task)
+        return await asyncio.get_running_loop().run_in_executor(self._pool(handler.mode), handler.func, task)
+
+    def _pool(self, mode: str) -> Executor:
+        if mode == 'process':
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            return self._process_pool
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix='task-executor')
+        return self._thread_pool
+
+    def close(self) -> None:
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown()
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
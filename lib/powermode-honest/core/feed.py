@@ -0,0 +1,207 @@
+"""
+Workflow change feed
+
+In-process pub/sub so dashboards can follow state changes instead of
+polling full reports.
+
+- publish() never blocks and never awaits; with no subscribers it is a
+  single length check
+- Every subscriber has its own bounded queue. On overflow it either drops
+  its oldest event ('drop_oldest') or keeps only the newest pending event
+  per workflow ('coalesce'), so a slow consumer only loses its own
+  history and never holds up writers
+- Events carry a feed-wide sequence number so consumers can spot gaps
+"""
+
+import asyncio
+import json
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+
+from core.storage import epoch_ms
+
+
+OVERFLOW_POLICIES = ('drop_oldest', 'coalesce')
+
+
+class ChangeEvent:
+    """One state transition of one workflow"""
+
+    __slots__ = ('seq', 'type', 'workflow_id', 'timestamp', 'data')
+
+    def __init__(self, seq: int, type: str, workflow_id: str, timestamp: int, data: Dict[str, Any]):
+        self.seq = seq
+        self.type = type
+        self.workflow_id = workflow_id
+        self.timestamp = timestamp
+        self.data = data
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'seq': self.seq,
+            'type': self.type,
+            'workflow_id': self.workflow_id,
+            'ts': self.timestamp,
+            **self.data
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(',', ':'), default=str)
+
+
+class Subscription:
+    """
+    Bounded event queue for one consumer
+
+    Iterate with `async for event in subscription`; iteration ends after
+    close(). workflow_ids, if given, restricts the feed to those workflows.
+    """
+
+    def __init__(self, feed: 'ChangeFeed', max_queue: int = 1000, overflow: str = 'drop_oldest',
+                 workflow_ids: Optional[Iterable[str]] = None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow} (expected one of {OVERFLOW_POLICIES})")
+        if max_queue < 1:
+            raise ValueError("max_queue must be at least 1")
+        self.feed = feed
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.workflow_ids: Optional[Set[str]] = set(workflow_ids) if workflow_ids else None
+
+        self._fifo: Deque[ChangeEvent] = deque()
+        # coalesce: workflow_id -> newest pending event, in first-pending order
+        self._latest: 'OrderedDict[str, ChangeEvent]' = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def _offer(self, event: ChangeEvent) -> None:
+        """Queue an event without ever blocking (called by the feed)"""
+        if self.workflow_ids is not None and event.workflow_id not in self.workflow_ids:
+            return
+        if self.overflow == 'coalesce':
+            if event.workflow_id in self._latest:
+                self._latest[event.workflow_id] = event
+                self.coalesced += 1
+            else:
+                if len(self._latest) >= self.max_queue:
+                    self._latest.popitem(last=False)
+                    self.dropped += 1
+                self._latest[event.workflow_id] = event
+        else:
+            if len(self._fifo) >= self.max_queue:
+                self._fifo.popleft()
+                self.dropped += 1
+            self._fifo.append(event)
+        self._wakeup.set()
+
+    def pending(self) -> int:
+        return len(self._latest) if self.overflow == 'coalesce' else len(self._fifo)
+
+    def get_nowait(self) -> Optional[ChangeEvent]:
+        """Next queued event, or None if the queue is empty"""
+        if self.overflow == 'coalesce':
+            if not self._latest:
+                return None
+            _, event = self._latest.popitem(last=False)
+        else:
+            if not self._fifo:
+                return None
+            event = self._fifo.popleft()
+        self.delivered += 1
+        return event
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[ChangeEvent]:
+        """
+        Wait for the next event
+
+        Returns None when the subscription is closed or timeout expires
+        with nothing queued.
+        """
+        while True:
+            event = self.get_nowait()
+            if event is not None:
+                return event
+            if self.closed:
+                return None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                # An event may have landed as the timeout fired - None must mean an empty queue
+                return self.get_nowait()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ChangeEvent:
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.feed._subscriptions.discard(self)
+            self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'overflow': self.overflow,
+            'max_queue': self.max_queue,
+            'pending': self.pending(),
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+        }
+
+
+class ChangeFeed:
+    """Fan-out of workflow change events to any number of subscriptions"""
+
+    def __init__(self, max_queue: int = 1000, overflow: str = 'drop_oldest'):
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self._subscriptions: Set[Subscription] = set()
+        self.seq = 0
+
+    def publish(self, type: str, workflow_id: str, **data: Any) -> None:
+        """Emit an event to every subscriber (no-op without subscribers)"""
+        if not self._subscriptions:
+            return
+        self.seq += 1
+        event = ChangeEvent(self.seq, type, workflow_id, epoch_ms(), data)
+        for subscription in list(self._subscriptions):
+            subscription._offer(event)
+
+    def subscribe(self, max_queue: Optional[int] = None, overflow: Optional[str] = None,
+                  workflow_ids: Optional[Iterable[str]] = None) -> Subscription:
+        """New subscription (defaults to the feed's queue size and overflow policy); close() it when done"""
+        subscription = Subscription(
+            self,
+            max_queue=self.max_queue if max_queue is None else max_queue,
+            overflow=overflow or self.overflow,
+            workflow_ids=workflow_ids
+        )
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def close(self) -> None:
+        """End every subscription (consumers see the end of iteration)"""
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def stats(self) -> Dict[str, Any]:
+        subscriptions: List[Dict[str, Any]] = [subscription.stats() for subscription in self._subscriptions]
+        return {
+            'events_published': self.seq,
+            'subscribers': len(subscriptions),
+            'dropped': sum(stats['dropped'] for stats in subscriptions),
+            'coalesced': sum(stats['coalesced'] for stats in subscriptions),
+        }
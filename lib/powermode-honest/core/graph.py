@@ -0,0 +1,413 @@
+"""
+Task dependency graph
+
+Compact DAG engine used for task plans:
+- Nodes are task positions; edges live in per-node int arrays
+- Kahn topological ordering with cycle detection (reports the cycle)
+- Critical path = longest remaining-effort path through the DAG
+- Incremental: completing or reopening tasks updates the ready set and
+  the remaining effort in O(changed tasks + their edges). Finish times
+  are brought up to date when the critical path is asked for, by
+  re-evaluating the changed nodes and only the descendants whose finish
+  time changes
+- Ready tasks are ordered by planned downstream effort (longest chain of
+  estimated effort behind them), which only changes with the structure
+"""
+
+import heapq
+from array import array
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from core.progress import task_id_of
+
+
+class CycleError(ValueError):
+    """Raised when task dependencies form a cycle"""
+
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__(f"Dependency cycle: {' -> '.join(cycle)}")
+
+
+def _dependencies_of(task: Any) -> Sequence[str]:
+    if isinstance(task, Mapping):
+        return task.get('dependencies') or task.get('depends_on') or ()
+    return ()
+
+
+def _effort_of(task: Any) -> float:
+    if isinstance(task, Mapping):
+        effort = task.get('estimated_effort', task.get('effort', 1.0))
+        if isinstance(effort, (int, float)):
+            return float(effort)
+    return 1.0
+
+
+class TaskGraph:
+    """
+    Dependency DAG over the tasks of one workflow
+
+    finish[v] is the remaining effort of the longest chain ending at v
+    (completed tasks contribute zero). The critical path is the chain
+    behind the largest finish value.
+    """
+
+    def __init__(self):
+        self.task_ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.missing_dependencies: Dict[str, List[str]] = {}
+
+        self._successors: List[array] = []
+        self._predecessors: List[array] = []
+        self._effort = array('d')
+        self._completed = bytearray()
+        self._finish = array('d')
+        self._best_predecessor = array('i')
+        self._planned_downstream = array('d')  # Longest estimated-effort chain from the node, completion ignored
+        self._stale = set()  # Nodes whose finish time needs re-evaluating
+        self._rank = array('i')  # position in a valid topological order
+        self._next_rank = 0
+        self._open_predecessors = array('i')
+        self._ready = set()  # Open nodes without open predecessors
+        self._remaining = 0.0
+        self._open = 0
+
+    # -- construction ------------------------------------------------------
+
+    @classmethod
+    def from_tasks(cls, tasks: Iterable[Any]) -> 'TaskGraph':
+        """Build a graph from structure tasks ('id', 'dependencies', 'estimated_effort')"""
+        graph = cls()
+        tasks = list(tasks)
+        for position, task in enumerate(tasks):
+            graph._add_node(task_id_of(task, position), _effort_of(task))
+        for node, task in enumerate(tasks):
+            for dependency in _dependencies_of(task):
+                parent = graph.positions.get(str(dependency))
+                if parent is None:
+                    graph.missing_dependencies.setdefault(graph.task_ids[node], []).append(str(dependency))
+                    continue
+                if parent == node:
+                    # A task that waits for itself can never become ready
+                    raise CycleError([graph.task_ids[node], graph.task_ids[node]])
+                graph._successors[parent].append(node)
+                graph._predecessors[node].append(parent)
+        graph._rebuild()
+        return graph
+
+    def _add_node(self, task_id: str, effort: float) -> int:
+        if task_id in self.positions:
+            raise ValueError(f"Duplicate task ID: {task_id}")
+        node = len(self.task_ids)
+        self.task_ids.append(task_id)
+        self.positions[task_id] = node
+        self._successors.append(array('i'))
+        self._predecessors.append(array('i'))
+        self._effort.append(effort)
+        self._completed.append(0)
+        self._finish.append(0.0)
+        self._best_predecessor.append(-1)
+        self._planned_downstream.append(effort)
+        self._rank.append(self._next_rank)
+        self._next_rank += 1
+        self._open_predecessors.append(0)
+        self._ready.add(node)
+        self._remaining += effort
+        self._open += 1
+        return node
+
+    def _rebuild(self) -> None:
+        """Full Kahn pass: ranks, finish times and cycle check"""
+        order = self._kahn_order()
+        for rank, node in enumerate(order):
+            self._rank[node] = rank
+            self._evaluate(node)
+        for node in reversed(order):
+            self._evaluate_downstream(node)
+        self._next_rank = len(order)
+        self._stale.clear()
+
+        completed = self._completed
+        self._ready = set()
+        for node, parents in enumerate(self._predecessors):
+            self._open_predecessors[node] = sum(1 for parent in parents if not completed[parent])
+            if not completed[node] and not self._open_predecessors[node]:
+                self._ready.add(node)
+        self._remaining = sum(effort for effort, done in zip(self._effort, completed) if not done)
+        self._open = len(completed) - sum(completed)
+
+    def _kahn_order(self) -> List[int]:
+        count = len(self.task_ids)
+        indegree = [len(preds) for preds in self._predecessors]
+        queue = deque(node for node in range(count) if indegree[node] == 0)
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for child in self._successors[node]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    queue.append(child)
+        if len(order) < count:
+            raise CycleError(self._find_cycle(indegree))
+        return order
+
+    def _find_cycle(self, indegree: List[int]) -> List[str]:
+        """Walk predecessors among nodes Kahn could not drain until one repeats"""
+        node = next(n for n, degree in enumerate(indegree) if degree > 0)
+        seen: Dict[int, int] = {}
+        path: List[int] = []
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = next(p for p in self._predecessors[node] if indegree[p] > 0)
+        cycle = path[seen[node]:]
+        cycle.reverse()
+        return [self.task_ids[n] for n in cycle + cycle[:1]]
+
+    # -- evaluation --------------------------------------------------------
+
+    def _evaluate(self, node: int) -> bool:
+        """Recompute finish[node] from its predecessors; True if it changed"""
+        best, best_finish = -1, 0.0
+        for parent in self._predecessors[node]:
+            if self._finish[parent] > best_finish:
+                best, best_finish = parent, self._finish[parent]
+        finish = best_finish + (0.0 if self._completed[node] else self._effort[node])
+        changed = finish != self._finish[node] or best != self._best_predecessor[node]
+        self._finish[node] = finish
+        self._best_predecessor[node] = best
+        return changed
+
+    def _evaluate_downstream(self, node: int) -> bool:
+        """Recompute planned downstream effort of node from its successors; True if it changed"""
+        downstream = self._effort[node] + max(
+            (self._planned_downstream[child] for child in self._successors[node]), default=0.0
+        )
+        changed = downstream != self._planned_downstream[node]
+        self._planned_downstream[node] = downstream
+        return changed
+
+    def _propagate_downstream(self, start: Iterable[int]) -> int:
+        """Mirror of _propagate for structure changes: ancestors in reverse topological order, while values change"""
+        heap = [(-self._rank[node], node) for node in set(start)]
+        heapq.heapify(heap)
+        queued = {node for _, node in heap}
+        evaluated = 0
+        while heap:
+            _, node = heapq.heappop(heap)
+            queued.discard(node)
+            evaluated += 1
+            if self._evaluate_downstream(node):
+                for parent in self._predecessors[node]:
+                    if parent not in queued:
+                        queued.add(parent)
+                        heapq.heappush(heap, (-self._rank[parent], parent))
+        return evaluated
+
+    def _refresh(self) -> None:
+        """Bring finish times up to date with the changes since the last query"""
+        if self._stale:
+            stale, self._stale = self._stale, set()
+            self._propagate(stale)
+
+    def _propagate(self, start: Iterable[int]) -> int:
+        """Re-evaluate start nodes and, in topological order, only descendants that change"""
+        heap = [(self._rank[node], node) for node in set(start)]
+        heapq.heapify(heap)
+        queued = {node for _, node in heap}
+        evaluated = 0
+        while heap:
+            _, node = heapq.heappop(heap)
+            queued.discard(node)
+            evaluated += 1
+            if self._evaluate(node):
+                for child in self._successors[node]:
+                    if child not in queued:
+                        queued.add(child)
+                        heapq.heappush(heap, (self._rank[child], child))
+        return evaluated
+
+    # -- incremental updates -----------------------------------------------
+
+    def _nodes(self, task_ids: Iterable[str]) -> List[int]:
+        nodes = []
+        for task_id in task_ids:
+            node = self.positions.get(task_id)
+            if node is None:
+                raise KeyError(task_id)
+            nodes.append(node)
+        return nodes
+
+    def set_completed(self, nodes: Iterable[int], completed: bool = True) -> int:
+        """Mark task positions completed/open; returns how many changed state"""
+        flag = 1 if completed else 0
+        step = -1 if completed else 1
+        changed = []
+        for node in nodes:
+            if self._completed[node] == flag:
+                continue
+            self._completed[node] = flag
+            changed.append(node)
+            self._remaining += step * self._effort[node]
+            self._open += step
+            if completed:
+                self._ready.discard(node)
+            elif not self._open_predecessors[node]:
+                self._ready.add(node)
+            for child in self._successors[node]:
+                self._open_predecessors[child] += step
+                if self._completed[child]:
+                    continue
+                if not self._open_predecessors[child]:
+                    self._ready.add(child)
+                else:
+                    self._ready.discard(child)
+        self._stale.update(changed)
+        return len(changed)
+
+    def complete(self, task_ids: Iterable[str]) -> int:
+        return self.set_completed(self._nodes(task_ids), True)
+
+    def reopen(self, task_ids: Iterable[str]) -> int:
+        return self.set_completed(self._nodes(task_ids), False)
+
+    def add_task(self, task_id: str, dependencies: Iterable[str] = (), effort: float = 1.0) -> None:
+        """Add a task after existing ones; only the new node is evaluated"""
+        parents = self._nodes(dependencies)
+        node = self._add_node(task_id, effort)  # ranked after every existing node
+        for parent in parents:
+            self._successors[parent].append(node)
+            self._predecessors[node].append(parent)
+            if not self._completed[parent]:
+                self._open_predecessors[node] += 1
+        if self._open_predecessors[node]:
+            self._ready.discard(node)
+        self._stale.add(node)
+        self._propagate_downstream(parents)
+
+    def add_dependency(self, task_id: str, depends_on: str) -> None:
+        """Add an edge depends_on -> task_id, rejecting it if it would close a cycle"""
+        node, parent = self._nodes((task_id, depends_on))
+        if parent in self._predecessors[node]:
+            return
+        path = self._path(node, parent)
+        if path is not None:
+            raise CycleError([self.task_ids[n] for n in [parent] + path])
+        self._successors[parent].append(node)
+        self._predecessors[node].append(parent)
+        if self._rank[parent] > self._rank[node]:
+            # Edge runs against the current order - re-rank once (rare)
+            self._rebuild()
+            return
+        if not self._completed[parent]:
+            self._open_predecessors[node] += 1
+            self._ready.discard(node)
+        self._stale.add(node)
+        self._propagate_downstream((parent,))
+
+    def _path(self, source: int, target: int) -> Optional[List[int]]:
+        """Nodes on a successor path from source to target, or None"""
+        parents = {source: -1}
+        stack = [source]
+        while stack:
+            node = stack.pop()
+            if node == target:
+                path = []
+                while node != -1:
+                    path.append(node)
+                    node = parents[node]
+                return path[::-1]
+            for child in self._successors[node]:
+                if child not in parents:
+                    parents[child] = node
+                    stack.append(child)
+        return None
+
+    # -- queries -----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.task_ids)
+
+    def topological_order(self) -> List[str]:
+        order = sorted(range(len(self.task_ids)), key=self._rank.__getitem__)
+        return [self.task_ids[node] for node in order]
+
+    def critical_path(self) -> List[str]:
+        """Open tasks on the longest remaining-effort chain, first to last"""
+        if not self.task_ids:
+            return []
+        self._refresh()
+        node = self._finish.index(max(self._finish))
+        path = []
+        while node != -1:
+            if not self._completed[node]:
+                path.append(self.task_ids[node])
+            node = self._best_predecessor[node]
+        path.reverse()
+        return path
+
+    def critical_path_effort(self) -> float:
+        self._refresh()
+        return max(self._finish) if self.task_ids else 0.0
+
+    def remaining_effort(self) -> float:
+        # Kept as a running sum; exactly zero once nothing is open, whatever the rounding on the way
+        return self._remaining if self._open else 0.0
+
+    def ready_tasks(self) -> List[str]:
+        """Open tasks whose dependencies are all completed, largest planned downstream effort first"""
+        downstream = self._planned_downstream
+        ready = sorted(self._ready, key=lambda node: (-downstream[node], node))
+        return [self.task_ids[node] for node in ready]
+
+    def downstream_effort(self) -> List[float]:
+        """Per node: longest remaining effort from the node to any sink, one reverse-topological pass"""
+        downstream = [0.0] * len(self.task_ids)
+        for node in sorted(range(len(self.task_ids)), key=self._rank.__getitem__, reverse=True):
+            own = 0.0 if self._completed[node] else self._effort[node]
+            downstream[node] = own + max((downstream[c] for c in self._successors[node]), default=0.0)
+        return downstream
+
+    def dependencies(self, task_id: str) -> List[str]:
+        return [self.task_ids[p] for p in self._predecessors[self.positions[task_id]]]
+
+    def dependents(self, task_id: str) -> List[str]:
+        return [self.task_ids[c] for c in self._successors[self.positions[task_id]]]
+
+    def is_completed(self, task_id: str) -> bool:
+        return bool(self._completed[self.positions[task_id]])
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'task_count': len(self.task_ids),
+            'critical_path': self.critical_path(),
+            'critical_path_effort': self.critical_path_effort(),
+            'remaining_effort': self.remaining_effort(),
+            'ready_tasks': self.ready_tasks(),
+            'missing_dependencies': self.missing_dependencies,
+        }
+
+
+class TaskGraphCache:
+    """Bounded LRU of live task graphs per workflow (rebuilt from the structure on a miss)"""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._graphs: 'OrderedDict[str, TaskGraph]' = OrderedDict()
+
+    def get(self, workflow_id: str) -> Optional[TaskGraph]:
+        graph = self._graphs.get(workflow_id)
+        if graph is not None:
+            self._graphs.move_to_end(workflow_id)
+        return graph
+
+    def put(self, workflow_id: str, graph: TaskGraph) -> None:
+        self._graphs[workflow_id] = graph
+        self._graphs.move_to_end(workflow_id)
+        if len(self._graphs) > self.max_entries:
+            self._graphs.popitem(last=False)
+
+    def discard(self, workflow_id: str) -> None:
+        self._graphs.pop(workflow_id, None)
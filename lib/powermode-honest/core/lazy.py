@@ -0,0 +1,46 @@
+"""
+Lazily constructed components
+
+A one-shot CLI run touches only a few of the engine's components, so
+they are imported and built on first attribute access instead of in
+__init__.
+"""
+
+import importlib
+from typing import Any
+
+
+class LazyComponent:
+    """
+    Class attribute that imports module_name, builds class_name() on first
+    access and caches the instance on the owning object
+
+    Assigning the attribute (e.g. to inject a test double) replaces it as
+    usual, and is_built() tells whether it has been constructed. If the
+    owner defines _wrap_component(name, component), the stored instance is
+    whatever it returns (the engine uses it for tracing proxies).
+    """
+
+    def __init__(self, module_name: str, class_name: str):
+        self.module_name = module_name
+        self.class_name = class_name
+        self.name = class_name
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        if instance is None:
+            return self
+        component_class = getattr(importlib.import_module(self.module_name), self.class_name)
+        component = component_class()
+        wrap = getattr(instance, '_wrap_component', None)
+        if wrap is not None:
+            component = wrap(self.name, component)
+        # Stored in the instance dict, which shadows this (non-data) descriptor from now on
+        instance.__dict__[self.name] = component
+        return component
+
+    @staticmethod
+    def is_built(instance: Any, name: str) -> bool:
+        return name in instance.__dict__
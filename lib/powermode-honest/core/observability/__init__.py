@@ -0,0 +1,25 @@
+"""
+Observability - logging pipeline and other runtime instrumentation
+"""
+
+from .histogram import LogLinearHistogram
+from .logs import configure_logging, shutdown_logging, JsonLinesFormatter, SamplingFilter
+from .operations import OperationMetrics, instrumented
+from .profiling import SamplingProfiler
+from .tracing import Span, TracedComponent, Tracer, current_span, traced
+
+__all__ = [
+    'configure_logging',
+    'shutdown_logging',
+    'JsonLinesFormatter',
+    'SamplingFilter',
+    'LogLinearHistogram',
+    'OperationMetrics',
+    'instrumented',
+    'Tracer',
+    'Span',
+    'TracedComponent',
+    'current_span',
+    'traced',
+    'SamplingProfiler',
+]
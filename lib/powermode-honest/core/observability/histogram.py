@@ -0,0 +1,81 @@
+"""
+Log-linear latency histogram
+
+HDR-style bucketing: every power of two is split into a fixed number of
+linear sub-buckets, so relative error is bounded (~1.6% with the default
+7 sub-bucket bits) and memory is fixed no matter how many samples are
+recorded. Values are integers (microseconds for latencies).
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+
+class LogLinearHistogram:
+    """Fixed-memory histogram with percentile queries"""
+
+    __slots__ = ('sub_bucket_bits', 'max_value', '_half', '_counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self, max_value: int = 3_600_000_000, sub_bucket_bits: int = 7):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_value = max_value
+        self._half = 1 << (sub_bucket_bits - 1)
+        self._counts: List[int] = [0] * (self._index(max_value) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        shift = value.bit_length() - self.sub_bucket_bits
+        if shift <= 0:
+            return value
+        return shift * self._half + (value >> shift)
+
+    def _bounds(self, index: int) -> Tuple[int, int]:
+        """Inclusive [low, high] value range of a bucket"""
+        if index < 2 * self._half:
+            return index, index
+        shift = index // self._half - 1
+        mantissa = index - shift * self._half
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+    def record(self, value: int) -> None:
+        value = min(max(int(value), 0), self.max_value)
+        self._counts[self._index(value)] += 1
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def percentile(self, percent: float) -> int:
+        """Value at the given percentile (upper edge of its bucket, capped at max)"""
+        if self.count == 0:
+            return 0
+        rank = max(1, int(round(percent / 100 * self.count)))
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self._bounds(index)[1], self.max)
+        return self.max
+
+    def percentiles(self, percents: Iterable[float]) -> Dict[float, int]:
+        return {percent: self.percentile(percent) for percent in percents}
+
+    def cumulative_counts(self, upper_bounds: Iterable[int]) -> List[Tuple[int, int]]:
+        """(bound, samples <= bound) pairs, for Prometheus 'le' buckets"""
+        results = []
+        seen = 0
+        index = 0
+        for bound in sorted(upper_bounds):
+            while index < len(self._counts) and self._bounds(index)[1] <= bound:
+                seen += self._counts[index]
+                index += 1
+            results.append((bound, seen))
+        return results
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
@@ -0,0 +1,180 @@
+"""
+Non-blocking logging pipeline
+
+Log calls on the event loop only enqueue the record; a QueueListener thread
+does the formatting-to-disk work. Configured once per process, flushed at
+shutdown (explicitly or via atexit).
+
+- Optional JSON-lines output for machine parsing
+- File rotation on size and on time, whichever comes first
+- Per-logger sampling for high-volume INFO/DEBUG messages
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message (+ exc_info)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep 1 in N records below WARNING for configured loggers
+
+    sample_rates maps logger name (or a parent such as 'PowerModeHonest')
+    to N. Warnings and errors always pass.
+    """
+
+    def __init__(self, sample_rates: Dict[str, int]):
+        super().__init__()
+        self.sample_rates = {name: max(int(rate), 1) for name, rate in sample_rates.items()}
+        self._counters: Dict[str, int] = {}
+        self._resolved: Dict[str, int] = {}
+
+    def _rate_for(self, name: str) -> int:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate, candidate = 1, name
+            while candidate:
+                if candidate in self.sample_rates:
+                    rate = self.sample_rates[candidate]
+                    break
+                candidate = candidate.rpartition('.')[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate_for(record.name)
+        if rate == 1:
+            return True
+        count = self._counters.get(record.name, 0)
+        self._counters[record.name] = count + 1
+        return count % rate == 0
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """
+    Timed rotation that also rotates when the file passes max_bytes
+
+    Each record is formatted once; the size check and the write share it.
+    """
+
+    def __init__(self, filename: str, max_bytes: int = 0, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.max_bytes = max_bytes
+
+    def _over_size(self, message: str) -> bool:
+        if self.max_bytes <= 0 or self.stream is None:
+            return False
+        self.stream.seek(0, os.SEEK_END)
+        return self.stream.tell() + len(message) + len(self.terminator) >= self.max_bytes
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            message = self.format(record)
+            if self.shouldRollover(record) or self._over_size(message):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(message + self.terminator)
+            self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def rotation_filename(self, default_name: str) -> str:
+        # Several size rollovers can fall in one time interval - never overwrite
+        name, counter = super().rotation_filename(default_name), 1
+        candidate = name
+        while os.path.exists(candidate):
+            candidate = f"{name}.{counter}"
+            counter += 1
+        return candidate
+
+
+def configure_logging(level: str = 'INFO', file: Optional[str] = 'power_mode_honest.log',
+                      json_lines: bool = False, max_bytes: int = 10 * 1024 * 1024,
+                      when: str = 'midnight', backup_count: int = 7, console: bool = True,
+                      sample_rates: Optional[Dict[str, int]] = None) -> bool:
+    """
+    Route root logging through a background QueueListener
+
+    Only the first call per process takes effect; returns True if this call
+    configured logging.
+    """
+    global _listener, _queue_handler
+
+    with _lock:
+        if _listener is not None:
+            return False
+
+        formatter = JsonLinesFormatter() if json_lines else logging.Formatter(TEXT_FORMAT)
+        handlers = []
+        if file:
+            file_handler = SizeAndTimeRotatingFileHandler(
+                file, max_bytes=max_bytes, when=when, backupCount=backup_count, encoding='utf-8'
+            )
+            handlers.append(file_handler)
+        if console:
+            handlers.append(logging.StreamHandler())
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        if sample_rates:
+            _queue_handler.addFilter(SamplingFilter(sample_rates))
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(_queue_handler)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return True
+
+
+def shutdown_logging() -> None:
+    """Drain queued records, stop the listener thread and close handlers"""
+    global _listener, _queue_handler
+
+    with _lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _queue_handler = None
+        atexit.unregister(shutdown_logging)
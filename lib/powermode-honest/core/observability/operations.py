@@ -0,0 +1,170 @@
+"""
+Per-operation latency, throughput and in-flight metrics
+
+Each public PowerModeHonest operation (organize, manage, track, report)
+gets a LogLinearHistogram of durations in microseconds plus counters for
+started/succeeded/failed calls and an in-flight gauge. Everything can be
+rendered in the Prometheus text exposition format.
+"""
+
+import functools
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+from .histogram import LogLinearHistogram
+
+
+OPERATIONS = ('organize', 'manage', 'track', 'report')
+SUMMARY_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+# Prometheus 'le' buckets in microseconds (100us .. 60s)
+PROMETHEUS_BUCKETS_US = (
+    100, 250, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000,
+    100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000, 60_000_000,
+)
+
+
+class OperationStats:
+    """Histogram and counters for one operation"""
+
+    __slots__ = ('histogram', 'started', 'succeeded', 'failed', 'in_flight')
+
+    def __init__(self):
+        self.histogram = LogLinearHistogram()
+        self.started = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.in_flight = 0
+
+
+class OperationMetrics:
+    """Latency histograms and throughput counters keyed by operation name"""
+
+    def __init__(self, operations=OPERATIONS):
+        self.started_at = time.monotonic()
+        self._stats: Dict[str, OperationStats] = {name: OperationStats() for name in operations}
+
+    def _get(self, operation: str) -> OperationStats:
+        stats = self._stats.get(operation)
+        if stats is None:
+            stats = self._stats[operation] = OperationStats()
+        return stats
+
+    @contextmanager
+    def track(self, operation: str) -> Iterator[Dict[str, bool]]:
+        """
+        Time a block as one call of operation
+
+        Yields a dict; set outcome['failed'] = True for calls that return an
+        error result instead of raising.
+        """
+        stats = self._get(operation)
+        stats.started += 1
+        stats.in_flight += 1
+        outcome = {'failed': False}
+        start = time.perf_counter_ns()
+        try:
+            yield outcome
+        except BaseException:
+            outcome['failed'] = True
+            raise
+        finally:
+            stats.histogram.record((time.perf_counter_ns() - start) // 1000)
+            stats.in_flight -= 1
+            if outcome['failed']:
+                stats.failed += 1
+            else:
+                stats.succeeded += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-operation counts, rates and latency percentiles (milliseconds)"""
+        uptime = max(time.monotonic() - self.started_at, 1e-9)
+        operations = {}
+        for name, stats in self._stats.items():
+            histogram = stats.histogram
+            latency = {
+                f"p{percent:g}".replace('.', ''): round(value / 1000, 3)
+                for percent, value in histogram.percentiles(SUMMARY_PERCENTILES).items()
+            }
+            latency['mean'] = round(histogram.mean / 1000, 3)
+            latency['max'] = round(histogram.max / 1000, 3)
+            operations[name] = {
+                'calls': stats.started,
+                'succeeded': stats.succeeded,
+                'failed': stats.failed,
+                'in_flight': stats.in_flight,
+                'calls_per_second': round(histogram.count / uptime, 2),
+                'latency_ms': latency,
+            }
+        return {'uptime_seconds': round(uptime, 1), 'operations': operations}
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition (format 0.0.4)"""
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family('powermode_operation_duration_seconds', 'histogram', 'Operation latency')
+        for name, stats in self._stats.items():
+            histogram = stats.histogram
+            for bound, count in histogram.cumulative_counts(PROMETHEUS_BUCKETS_US):
+                lines.append(
+                    f'powermode_operation_duration_seconds_bucket{{operation="{name}",le="{bound / 1e6:g}"}} {count}'
+                )
+            lines.append(f'powermode_operation_duration_seconds_bucket{{operation="{name}",le="+Inf"}} {histogram.count}')
+            lines.append(f'powermode_operation_duration_seconds_sum{{operation="{name}"}} {histogram.total / 1e6:.6f}')
+            lines.append(f'powermode_operation_duration_seconds_count{{operation="{name}"}} {histogram.count}')
+
+        family('powermode_operation_duration_quantile_seconds', 'gauge', 'Operation latency percentiles')
+        for name, stats in self._stats.items():
+            for percent, value in stats.histogram.percentiles(SUMMARY_PERCENTILES).items():
+                lines.append(
+                    f'powermode_operation_duration_quantile_seconds{{operation="{name}",quantile="{percent / 100:g}"}} '
+                    f'{value / 1e6:.6f}'
+                )
+
+        for metric, attribute, help_text in (
+            ('powermode_operations_started_total', 'started', 'Operations started'),
+            ('powermode_operations_succeeded_total', 'succeeded', 'Operations that succeeded'),
+            ('powermode_operations_failed_total', 'failed', 'Operations that failed or returned an error'),
+        ):
+            family(metric, 'counter', help_text)
+            for name, stats in self._stats.items():
+                lines.append(f'{metric}{{operation="{name}"}} {getattr(stats, attribute)}')
+
+        family('powermode_operations_in_flight', 'gauge', 'Operations currently running')
+        for name, stats in self._stats.items():
+            lines.append(f'powermode_operations_in_flight{{operation="{name}"}} {stats.in_flight}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def instrumented(operation: str) -> Callable:
+    """
+    Decorator for async PowerModeHonest methods
+
+    Records the call in self.operation_metrics; a returned dict with an
+    'error' key counts as a failure. When self.tracer is enabled the call
+    is also a span, and self.profiler may take a cProfile sample of it.
+    """
+    def decorator(method: Callable) -> Callable:
+        span_name = method.__qualname__
+
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            with self.operation_metrics.track(operation) as outcome:
+                if not (self.tracer.enabled or self.profiler.enabled):
+                    result = await method(self, *args, **kwargs)
+                else:
+                    with self.tracer.span(span_name, operation=operation) as span, self.profiler.profile(operation):
+                        result = await method(self, *args, **kwargs)
+                        if span is not None and isinstance(result, dict) and 'error' in result:
+                            span.set_error(str(result['error']))
+                if isinstance(result, dict) and 'error' in result:
+                    outcome['failed'] = True
+                return result
+        return wrapper
+    return decorator
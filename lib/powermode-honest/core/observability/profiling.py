@@ -0,0 +1,136 @@
+"""
+Sampling profiler for engine operations
+
+Runs cProfile on a random fraction of calls and accumulates the samples
+per operation into <directory>/<operation>.pstats (load with pstats or
+snakeviz). With sample_rate 0 a call costs one float comparison.
+
+cProfile profiles the whole thread, so an async call that yields to the
+event loop also collects whatever else runs until it resumes; the
+numbers are a sample of where the time goes around that operation, not
+an exact per-call cost. Only one call is profiled at a time - samples
+that would overlap are skipped.
+
+Every flush_every samples an operation's batch is handed to a single
+writer thread that merges it into the pstats file, so no file I/O runs
+on the event loop. flush() waits for the writer and is meant for
+shutdown.
+"""
+
+import os
+import random
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, Set
+
+if TYPE_CHECKING:
+    # Type hints only - both are imported on the first sample, pstats costs noticeable start-up time
+    import cProfile
+    import pstats
+
+
+class SamplingProfiler:
+    """cProfile on sample_rate of calls, pstats files per operation"""
+
+    def __init__(self, sample_rate: float = 0.0, directory: str = 'power_mode_honest_profiles',
+                 flush_every: int = 100):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.flush_every = flush_every
+        self._batches: Dict[str, 'pstats.Stats'] = {}  # Samples not handed to the writer yet
+        self._pending: Dict[str, int] = {}
+        self._written: Set[str] = set()  # Operations whose file already holds samples from this run
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._last_write: Optional[Future] = None
+        self._active = False
+        self.samples: Dict[str, int] = {}
+        self.skipped = 0
+        self.write_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0.0
+
+    @contextmanager
+    def profile(self, operation: str) -> Iterator[Optional['cProfile.Profile']]:
+        """Profile the block if this call is sampled (yields None otherwise)"""
+        if self.sample_rate <= 0.0 or random.random() >= self.sample_rate:
+            yield None
+            return
+        if self._active:
+            self.skipped += 1
+            yield None
+            return
+        import cProfile
+        self._active = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            self._active = False
+            self._add(operation, profiler)
+
+    def _add(self, operation: str, profiler: 'cProfile.Profile') -> None:
+        import pstats
+        batch = self._batches.get(operation)
+        if batch is None:
+            self._batches[operation] = pstats.Stats(profiler)
+        else:
+            batch.add(profiler)
+        self.samples[operation] = self.samples.get(operation, 0) + 1
+        self._pending[operation] = self._pending.get(operation, 0) + 1
+        if self._pending[operation] >= self.flush_every:
+            self._submit(operation)
+
+    def path_for(self, operation: str) -> str:
+        return os.path.join(self.directory, f"{operation}.pstats")
+
+    def _submit(self, operation: str) -> None:
+        """Hand an operation's batch to the writer thread (one thread, so writes to a file stay in order)"""
+        batch = self._batches.pop(operation)
+        self._pending[operation] = 0
+        # The first write of a run replaces a file left by an earlier run; later ones merge into it
+        merge = operation in self._written
+        self._written.add(operation)
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profile-writer')
+        self._last_write = self._writer.submit(self._write, self.path_for(operation), batch, merge)
+        self._last_write.add_done_callback(self._count_error)
+
+    def _write(self, path: str, batch: 'pstats.Stats', merge: bool) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if merge and os.path.exists(path):
+            batch.add(path)
+        batch.dump_stats(path)
+
+    def _count_error(self, write: Future) -> None:
+        if write.exception() is not None:
+            self.write_errors += 1
+
+    def flush(self, operation: Optional[str] = None) -> None:
+        """
+        Write accumulated samples (of one operation, or all) to their pstats files
+
+        Blocks until the writer thread has caught up - call it at shutdown,
+        not from the event loop while serving.
+        """
+        operations = [operation] if operation is not None else list(self._batches)
+        for name in operations:
+            if name in self._batches:
+                self._submit(name)
+        if self._last_write is not None:
+            self._last_write.exception()  # Waits; failures are counted in write_errors
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sample_rate': self.sample_rate,
+            'samples': dict(self.samples),
+            'skipped_overlapping': self.skipped,
+            'write_errors': self.write_errors,
+            'directory': self.directory,
+        }
+
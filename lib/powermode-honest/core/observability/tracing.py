@@ -0,0 +1,288 @@
+"""
+In-process tracing
+
+Spans are timed blocks - a public engine method, a component call - whose
+parent is whatever span is current in the calling context. The current
+span lives in a contextvar, so it follows awaits and asyncio tasks
+started from inside a span (gather, create_task) without being passed.
+
+- Finished spans go to a bounded ring buffer; the oldest drop first
+- Export as Chrome trace-event JSON (chrome://tracing, Perfetto) or as
+  OTLP/JSON, the OpenTelemetry file-exporter format
+- Disabled tracers hand out one shared no-op context manager, so
+  instrumentation costs an attribute check when tracing is off
+- TracedComponent wraps an object so each method call is a span
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional
+
+
+EXPORT_FORMATS = ('chrome', 'otlp')
+
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('powermode_span', default=None)
+_NO_SPAN = nullcontext()
+
+# perf_counter_ns for durations, shifted onto the wall clock once for export
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+
+def current_span() -> Optional['Span']:
+    return _current_span.get()
+
+
+class Span:
+    """One timed block; IDs are random 128-bit (trace) and 64-bit (span) ints"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns',
+                 'attributes', 'error', 'thread_id', 'lane', '_token')
+
+    def __init__(self, name: str, parent: Optional['Span'], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else random.getrandbits(128)
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.thread_id = threading.get_ident()
+        # Spans of one asyncio task nest strictly; concurrent tasks get separate lanes in exports
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        self.lane = id(task) if task is not None else self.thread_id
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = self.start_ns
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.error = message
+
+    @property
+    def duration_ns(self) -> int:
+        return self.end_ns - self.start_ns
+
+
+class _ActiveSpan:
+    """Context manager that makes a new span current for the duration of a block"""
+
+    __slots__ = ('tracer', 'span')
+
+    def __init__(self, tracer: 'Tracer', name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.span = Span(name, _current_span.get(), attributes)
+
+    def __enter__(self) -> Span:
+        self.span._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        span = self.span
+        span.end_ns = time.perf_counter_ns()
+        if exc_type is not None and span.error is None:
+            span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(span._token)
+        span._token = None
+        self.tracer._finish(span)
+
+
+class Tracer:
+    """Span factory plus a ring buffer of finished spans"""
+
+    def __init__(self, enabled: bool = False, max_spans: int = 100_000, service_name: str = 'powermode-honest',
+                 export_path: Optional[str] = None, export_format: str = 'chrome'):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"export_format must be one of {EXPORT_FORMATS}")
+        self.enabled = enabled
+        self.service_name = service_name
+        self.export_path = export_path
+        self.export_format = export_format
+        self._spans: deque = deque(maxlen=max_spans)
+        self.finished = 0
+
+    def span(self, name: str, **attributes: Any):
+        """
+        `with tracer.span('name', key=value) as span:` - span is None when
+        tracing is disabled
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return _ActiveSpan(self, name, attributes)
+
+    def _finish(self, span: Span) -> None:
+        self._spans.append(span)
+        self.finished += 1
+
+    def spans(self) -> List[Span]:
+        return list(self._spans)
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'buffered_spans': len(self._spans),
+            'finished_spans': self.finished,
+            'dropped_spans': self.finished - len(self._spans),
+        }
+
+    # -- export ----------------------------------------------------------------
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """
+        Chrome trace-event JSON
+
+        Spans become nestable async begin/end pairs with one track per
+        asyncio task, so concurrent calls interleaving on the event loop
+        thread do not overlap on one track. Trace and span IDs are in args.
+        """
+        pid = os.getpid()
+        events = []
+        for span in self._spans:
+            common = {'name': span.name, 'cat': 'powermode', 'id': f"{span.lane:x}",
+                      'pid': pid, 'tid': span.thread_id}
+            args = {**span.attributes, 'trace_id': f"{span.trace_id:032x}", 'span_id': f"{span.span_id:016x}"}
+            if span.error is not None:
+                args['error'] = span.error
+            events.append({**common, 'ph': 'b', 'ts': (span.start_ns + _EPOCH_OFFSET_NS) / 1000, 'args': args})
+            events.append({**common, 'ph': 'e', 'ts': (span.end_ns + _EPOCH_OFFSET_NS) / 1000})
+        events.sort(key=lambda event: event['ts'])
+        return {'traceEvents': events, 'displayTimeUnit': 'ms',
+                'otherData': {'service.name': self.service_name}}
+
+    def otlp_trace(self) -> Dict[str, Any]:
+        """OTLP/JSON ExportTraceServiceRequest with every buffered span"""
+        spans = []
+        for span in self._spans:
+            record = {
+                'traceId': f"{span.trace_id:032x}",
+                'spanId': f"{span.span_id:016x}",
+                'name': span.name,
+                'kind': 1,  # SPAN_KIND_INTERNAL
+                'startTimeUnixNano': str(span.start_ns + _EPOCH_OFFSET_NS),
+                'endTimeUnixNano': str(span.end_ns + _EPOCH_OFFSET_NS),
+                'attributes': [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+                'status': {'code': 2, 'message': span.error} if span.error is not None else {'code': 1},
+            }
+            if span.parent_id is not None:
+                record['parentSpanId'] = f"{span.parent_id:016x}"
+            spans.append(record)
+        return {'resourceSpans': [{
+            'resource': {'attributes': [
+                _otlp_attribute('service.name', self.service_name),
+                _otlp_attribute('process.pid', os.getpid()),
+            ]},
+            'scopeSpans': [{'scope': {'name': 'powermode_honest.tracing'}, 'spans': spans}],
+        }]}
+
+    def export(self, path: Optional[str] = None, export_format: Optional[str] = None) -> int:
+        """
+        Write buffered spans to path and return how many were written
+
+        Chrome traces are one JSON document per file; OTLP requests are
+        appended as one JSON line each, like the collector's file exporter.
+        """
+        path = path or self.export_path
+        export_format = export_format or self.export_format
+        if path is None:
+            raise ValueError("No export path given or configured")
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"export_format must be one of {EXPORT_FORMATS}")
+        count = len(self._spans)
+        if export_format == 'chrome':
+            with open(path, 'w', encoding='utf-8') as output:
+                json.dump(self.chrome_trace(), output, default=str)
+        else:
+            with open(path, 'a', encoding='utf-8') as output:
+                output.write(json.dumps(self.otlp_trace(), default=str) + '\n')
+        return count
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+
+class TracedComponent:
+    """
+    Proxy that opens a span named '<label>.<method>' around each method
+    call of the wrapped object (awaited until done for coroutines)
+
+    Attribute reads other than callables pass straight through; use
+    unwrap() to get the original object back.
+    """
+
+    def __init__(self, component: Any, label: str, tracer: Tracer):
+        self._component = component
+        self._label = label
+        self._tracer = tracer
+
+    def unwrap(self) -> Any:
+        return self._component
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._component, name)
+        if not callable(attribute):
+            return attribute
+        tracer = self._tracer
+        span_name = f"{self._label}.{name}"
+
+        if inspect.iscoroutinefunction(attribute):
+            @functools.wraps(attribute)
+            async def traced_async(*args, **kwargs):
+                with tracer.span(span_name):
+                    return await attribute(*args, **kwargs)
+            return traced_async
+
+        @functools.wraps(attribute)
+        def traced(*args, **kwargs):
+            with tracer.span(span_name):
+                return attribute(*args, **kwargs)
+        return traced
+
+    def __repr__(self) -> str:
+        return f"TracedComponent({self._component!r})"
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator for async engine methods: a span around each call, taken
+    from self.tracer. A returned dict with an 'error' key marks the span
+    as failed.
+    """
+    def decorator(method: Callable) -> Callable:
+        span_name = name or method.__qualname__
+
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            tracer = self.tracer
+            if not tracer.enabled:
+                return await method(self, *args, **kwargs)
+            with tracer.span(span_name) as span:
+                result = await method(self, *args, **kwargs)
+                if isinstance(result, dict) and 'error' in result:
+                    span.set_error(str(result['error']))
+                return result
+        return wrapper
+    return decorator
@@ -0,0 +1,113 @@
+"""
+Task completion tracking
+
+Completed tasks are stored per workflow as a bitset (a Python int) indexed
+by task position in the workflow structure. Marking tasks done or reopened
+touches only the given tasks, duplicates are idempotent and task IDs that
+are not part of the workflow are rejected.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+
+def task_id_of(task: Any, position: Optional[int] = None) -> str:
+    """
+    ID of a task entry - dict tasks use 'id' (or 'name'), anything else is str()
+
+    A dict task with neither gets task-<position>, its place in the
+    structure; without a position that is a ValueError.
+    """
+    if isinstance(task, Mapping):
+        task_id = task.get('id')
+        if task_id is None:
+            task_id = task.get('name')
+        if task_id is not None:
+            return str(task_id)
+        if position is None:
+            raise ValueError("Task has no 'id' or 'name'")
+        return f"task-{position}"
+    return str(task)
+
+
+def with_task_ids(structure: Mapping[str, Any]) -> Mapping[str, Any]:
+    """
+    structure with every dict task that lacks 'id' and 'name' given task-<position>
+
+    Returned unchanged (the same object) when every task already has an
+    ID. Filling the IDs in once keeps them stable when a plan reorders
+    the tasks.
+    """
+    tasks = structure.get('tasks') or ()
+    if all(not isinstance(task, Mapping) or task.get('id') is not None or task.get('name') is not None
+           for task in tasks):
+        return structure
+    return {
+        **structure,
+        'tasks': [
+            {**task, 'id': task_id_of(task, position)} if isinstance(task, Mapping) else task
+            for position, task in enumerate(tasks)
+        ]
+    }
+
+
+def bit_positions(mask: int) -> Iterator[int]:
+    """Positions of the set bits in mask, lowest first"""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+class TaskIndex:
+    """Position lookup for the tasks of one workflow structure"""
+
+    __slots__ = ('task_ids', 'positions')
+
+    def __init__(self, structure: Mapping[str, Any]):
+        self.task_ids: Tuple[str, ...] = tuple(
+            task_id_of(task, position) for position, task in enumerate(structure.get('tasks', ()))
+        )
+        self.positions: Dict[str, int] = {task_id: i for i, task_id in enumerate(self.task_ids)}
+
+    def __len__(self) -> int:
+        return len(self.task_ids)
+
+    def mask_for(self, task_ids: Iterable[str]) -> Tuple[int, List[str]]:
+        """Bitset for task_ids plus the IDs that are not in this workflow"""
+        mask = 0
+        unknown = []
+        positions = self.positions
+        for task_id in task_ids:
+            position = positions.get(task_id)
+            if position is None:
+                unknown.append(task_id)
+            else:
+                mask |= 1 << position
+        return mask, unknown
+
+    def ids_in(self, mask: int) -> List[str]:
+        """Task IDs whose bit is set in mask, in structure order"""
+        return [task_id for i, task_id in enumerate(self.task_ids) if mask >> i & 1]
+
+
+class TaskIndexCache:
+    """Bounded LRU of TaskIndex per workflow, so repeated updates skip the rebuild"""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._indexes: 'OrderedDict[str, TaskIndex]' = OrderedDict()
+
+    def get(self, workflow_id: str, structure: Mapping[str, Any]) -> TaskIndex:
+        index = self._indexes.get(workflow_id)
+        if index is None:
+            index = TaskIndex(structure)
+            self._indexes[workflow_id] = index
+            if len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+        else:
+            self._indexes.move_to_end(workflow_id)
+        return index
+
+    def discard(self, workflow_id: str) -> None:
+        self._indexes.pop(workflow_id, None)
@@ -0,0 +1,458 @@
+"""
+Sharded engine - workflows partitioned across worker processes
+
+Each worker process runs its own engine (store, caches, event loop) and
+owns the workflows whose ID hashes to it. The router in the parent
+process allocates workflow IDs, so it knows the owning shard before the
+workflow exists, and forwards every call for that ID there.
+
+- One socketpair per shard carrying length-prefixed pickle frames
+- Messages queued in the same event-loop iteration travel as one frame
+  (up to max_batch), in both directions
+- The system report merges the shards' running aggregates, so it stays
+  constant-time however many shards there are
+- Change events are relayed from the shards into the router's own feed
+  once someone subscribes, so the HTTP API and /events work unchanged
+- Shard state (database, cold archive, log file) gets a per-shard
+  suffix, so shards never share files
+
+Ownership depends on the shard count, so reopen existing shard files with
+the same number of shards.
+"""
+
+import asyncio
+import copy
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import signal
+import socket
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.batch import bounded_as_completed
+from core.feed import ChangeFeed, Subscription
+from core.observability import OperationMetrics, SamplingProfiler, Tracer, instrumented
+from core.storage import NodeLease, WorkflowAggregates, WorkflowIdAllocator
+
+
+_HEADER_BYTES = 4
+
+# Engine coroutines a router may call on a shard
+SHARD_OPERATIONS = frozenset({
+    'organize_workflow', 'manage_tasks', 'track_progress', 'mark_completed', 'mark_reopened', 'update_progress',
+    'generate_report'
+})
+
+
+def shard_for(workflow_id: str, shards: int) -> int:
+    """Owning shard of a workflow - stable across processes, unlike hash()"""
+    # The low bits of crc32 come in runs for sequential IDs, so a burst of new workflows would
+    # land on one shard; a multiplicative (Fibonacci) step spreads every bit into the high half
+    mixed = (zlib.crc32(workflow_id.encode()) * 0x9E3779B1) & 0xFFFFFFFF
+    return (mixed >> 16) % shards
+
+
+def _suffixed(path: str, index: int) -> str:
+    root, extension = os.path.splitext(path)
+    return f"{root}.shard{index}{extension}"
+
+
+def shard_config(config: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """Engine config for one shard: per-shard files and node ID"""
+    config = copy.deepcopy(config)
+    storage = config.get('storage', {})
+    if storage.get('path'):
+        storage['path'] = _suffixed(storage['path'], index)
+    tiering = config.get('tiering', {})
+    if tiering.get('directory'):
+        tiering['directory'] = f"{tiering['directory']}.shard{index}"
+    logging_config = config.get('logging', {})
+    if logging_config.get('file'):
+        logging_config['file'] = _suffixed(logging_config['file'], index)
+    tracing = config.get('tracing', {})
+    if tracing.get('export_path'):
+        tracing['export_path'] = _suffixed(tracing['export_path'], index)
+    profiling = config.get('profiling', {})
+    if profiling.get('directory'):
+        profiling['directory'] = f"{profiling['directory']}.shard{index}"
+    config['node_id'] = index
+    return config
+
+
+def _lease_path(config: Dict[str, Any]) -> Optional[str]:
+    """The unsuffixed SQLite path, where routers sharing a data directory lease their ID nodes"""
+    storage = config.get('storage', {})
+    path = storage.get('path')
+    if storage.get('backend') != 'sqlite' or not path:
+        return None
+    data_dir = config.get('data_dir')
+    if data_dir is not None and not os.path.isabs(path):
+        os.makedirs(data_dir, exist_ok=True)
+        path = os.path.join(data_dir, path)
+    return path
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> List[Any]:
+    header = await reader.readexactly(_HEADER_BYTES)
+    return pickle.loads(await reader.readexactly(int.from_bytes(header, 'big')))
+
+
+class _Outbox:
+    """
+    Collects messages and writes everything queued in one loop iteration as one frame
+
+    Every frame is followed by writer.drain(), and a sender that fills a
+    batch waits for that drain, so a peer that stops reading slows its
+    senders down instead of growing the transport buffer without bound.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, max_batch: int):
+        self.writer = writer
+        self.max_batch = max_batch
+        self._messages: List[Any] = []
+        self._scheduled: Optional[asyncio.Task] = None
+        self.frames = 0
+        self.messages = 0
+
+    async def send(self, message: Any) -> None:
+        self._messages.append(message)
+        if len(self._messages) >= self.max_batch:
+            await self.flush()
+        elif self._scheduled is None:
+            self._scheduled = asyncio.ensure_future(self.flush())
+
+    async def flush(self) -> None:
+        self._scheduled = None
+        if not self._messages or self.writer.is_closing():
+            return
+        data = pickle.dumps(self._messages, pickle.HIGHEST_PROTOCOL)
+        self.writer.write(len(data).to_bytes(_HEADER_BYTES, 'big') + data)
+        self.frames += 1
+        self.messages += len(self._messages)
+        self._messages = []
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            pass  # The reading side notices the closed peer and fails what is pending
+
+
+def run_shard(engine_class: type, index: int, config: Dict[str, Any], sock: socket.socket, max_batch: int) -> None:
+    """Worker process entry point - serves router requests until told to close"""
+    # The router owns shutdown; Ctrl-C in a terminal reaches every process in the group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_serve_shard(engine_class, index, config, sock, max_batch))
+
+
+async def _serve_shard(engine_class: type, index: int, config: Dict[str, Any],
+                       sock: socket.socket, max_batch: int) -> None:
+    engine = engine_class(config)
+    reader, writer = await asyncio.open_connection(sock=sock)
+    outbox = _Outbox(writer, max_batch)
+    running = set()
+    closing = False
+    relay: Optional[asyncio.Task] = None
+
+    async def relay_changes() -> None:
+        # Request ID None marks an event rather than a reply
+        async for event in engine.subscribe_changes():
+            await outbox.send((None, event.to_dict()))
+
+    async def handle(request_id: int, operation: str, args: Tuple[Any, ...]) -> None:
+        nonlocal relay
+        try:
+            if operation in SHARD_OPERATIONS:
+                result = await getattr(engine, operation)(*args)
+            elif operation == 'aggregates':
+                report = await engine.generate_report(None, *args)
+                result = (engine.active_workflows.aggregates, report.get('metrics'), report.get('distributions'))
+            elif operation == 'relay_changes':
+                if relay is None:
+                    relay = asyncio.ensure_future(relay_changes())
+                result = index
+            elif operation in ('ping', 'close'):
+                result = index
+            else:
+                result = {'error': f"Unknown shard operation: {operation}", 'honest_assessment': True}
+        except Exception as e:
+            engine.logger.error(f"Shard {index} failed {operation}: {e}")
+            result = {'error': str(e), 'honest_assessment': True}
+        await outbox.send((request_id, result))
+
+    try:
+        while not closing:
+            try:
+                messages = await _read_frame(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break  # Router went away
+            for request_id, operation, args in messages:
+                if operation == 'close':
+                    closing = True
+                    # Answered once everything already received has finished
+                    if running:
+                        await asyncio.wait(running)
+                task = asyncio.ensure_future(handle(request_id, operation, args))
+                running.add(task)
+                task.add_done_callback(running.discard)
+        if running:
+            await asyncio.wait(running)
+        if relay is not None:
+            relay.cancel()
+        await outbox.flush()
+    finally:
+        engine.close()
+        writer.close()
+
+
+class ShardRouter:
+    """
+    Front end for a sharded engine with the engine's public coroutines
+
+    engine_class is instantiated once per worker process with that
+    shard's config (see shard_config); it must be importable there.
+    Call start() before use and close() when done. Like the engine it has
+    change_feed, prometheus_metrics() and stream_changes(), so ApiServer
+    can serve it (see serve()).
+    """
+
+    def __init__(self, engine_class: type, shards: int, config: Dict[str, Any],
+                 max_batch: int = 256, start_method: str = 'spawn'):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.engine_class = engine_class
+        self.shards = shards
+        self.config = config
+        self.max_batch = max_batch
+        # Routers over the same files lease distinct nodes, like engines sharing a database
+        lease_path = _lease_path(config)
+        self.lease: Optional[NodeLease] = None
+        node_id = config.get('node_id')
+        if lease_path is not None:
+            self.lease = NodeLease(lease_path, config['storage'].get('lease_timeout_seconds', 3600))
+            node_id = self.lease.acquire(node_id)
+        self.id_allocator = WorkflowIdAllocator(node_id=node_id)
+        self.session_start = datetime.now()
+        self.logger = logging.getLogger('PowerModeHonest.shards')
+        # Latency as seen by router callers; shards keep their own operation metrics
+        self.operation_metrics = OperationMetrics()
+        self.tracer = Tracer()
+        self.profiler = SamplingProfiler()
+        self.change_feed = ChangeFeed(**config.get('change_feed', {}))
+        self._relay: Optional[asyncio.Future] = None
+
+        self._context = multiprocessing.get_context(start_method)
+        self._processes: List[Any] = []
+        self._outboxes: List[_Outbox] = []
+        self._readers: List[asyncio.Task] = []
+        self._pending: List[Dict[int, asyncio.Future]] = []
+        self._request_ids = itertools.count()
+
+    async def start(self) -> None:
+        """Start the worker processes and wait until every shard answers"""
+        for index in range(self.shards):
+            parent_sock, child_sock = socket.socketpair()
+            process = self._context.Process(
+                target=run_shard,
+                args=(self.engine_class, index, shard_config(self.config, index), child_sock, self.max_batch),
+                name=f"power-mode-shard-{index}",
+                daemon=True
+            )
+            process.start()
+            child_sock.close()
+            reader, writer = await asyncio.open_connection(sock=parent_sock)
+            self._processes.append(process)
+            self._outboxes.append(_Outbox(writer, self.max_batch))
+            self._pending.append({})
+            self._readers.append(asyncio.ensure_future(self._receive(index, reader)))
+        await asyncio.gather(*(self._call(index, 'ping') for index in range(self.shards)))
+        self.logger.info(f"Started {self.shards} engine shards")
+
+    async def _receive(self, index: int, reader: asyncio.StreamReader) -> None:
+        pending = self._pending[index]
+        try:
+            while True:
+                for request_id, result in await _read_frame(reader):
+                    if request_id is None:
+                        self._republish(index, result)
+                        continue
+                    future = pending.pop(request_id, None)
+                    if future is not None and not future.done():
+                        future.set_result(result)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"Shard {index} exited"))
+            pending.clear()
+
+    async def _call(self, index: int, operation: str, *args: Any) -> Any:
+        if self._readers[index].done():
+            raise ConnectionError(f"Shard {index} exited")
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[index][request_id] = future
+        await self._outboxes[index].send((request_id, operation, args))
+        return await future
+
+    async def _forward(self, workflow_id: str, operation: str, *args: Any) -> Dict[str, Any]:
+        try:
+            return await self._call(self.shard_for(workflow_id), operation, *args)
+        except ConnectionError as e:
+            return {'error': str(e), 'honest_assessment': True}
+
+    def shard_for(self, workflow_id: str) -> int:
+        return shard_for(workflow_id, self.shards)
+
+    def _republish(self, index: int, event: Dict[str, Any]) -> None:
+        data = {key: value for key, value in event.items() if key not in ('seq', 'type', 'workflow_id', 'ts')}
+        self.change_feed.publish(event['type'], event['workflow_id'], shard=index, **data)
+
+    # -- engine API --------------------------------------------------------
+
+    @instrumented('organize')
+    async def organize_workflow(self, task_description: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+        workflow_id = self.id_allocator.allocate()
+        return await self._forward(workflow_id, 'organize_workflow', task_description, context, workflow_id)
+
+    async def organize_workflows(self, task_descriptions: Iterable[Any], max_concurrency: int = 256,
+                                 ordered: bool = True) -> List[Dict[str, Any]]:
+        """
+        Organize descriptions or (description, context) pairs
+
+        At most max_concurrency are in flight and the input is consumed
+        lazily (see core.batch). Results carry an 'index' key and come back
+        in input order unless ordered=False.
+        """
+        async def organize(item: Any) -> Dict[str, Any]:
+            task_description, context = (item, None) if isinstance(item, str) else item
+            return await self.organize_workflow(task_description, context)
+
+        results = []
+        async for index, outcome in bounded_as_completed(task_descriptions, organize, max_concurrency):
+            if isinstance(outcome, Exception):
+                outcome = {'error': str(outcome), 'honest_assessment': True}
+            outcome['index'] = index
+            results.append(outcome)
+        if ordered:
+            results.sort(key=lambda result: result['index'])
+        return results
+
+    @instrumented('manage')
+    async def manage_tasks(self, workflow_id: str) -> Dict[str, Any]:
+        return await self._forward(workflow_id, 'manage_tasks', workflow_id)
+
+    @instrumented('track')
+    async def track_progress(self, workflow_id: str, completed_tasks: List[str] = None) -> Dict[str, Any]:
+        return await self._forward(workflow_id, 'track_progress', workflow_id, completed_tasks)
+
+    @instrumented('track')
+    async def mark_completed(self, workflow_id: str, task_ids: Iterable[str]) -> Dict[str, Any]:
+        return await self._forward(workflow_id, 'mark_completed', workflow_id, list(task_ids))
+
+    @instrumented('track')
+    async def mark_reopened(self, workflow_id: str, task_ids: Iterable[str]) -> Dict[str, Any]:
+        return await self._forward(workflow_id, 'mark_reopened', workflow_id, list(task_ids))
+
+    @instrumented('track')
+    async def update_progress(self, workflow_id: str, complete: Iterable[str] = (),
+                              reopen: Iterable[str] = ()) -> Dict[str, Any]:
+        return await self._forward(workflow_id, 'update_progress', workflow_id, list(complete), list(reopen))
+
+    @instrumented('report')
+    async def generate_report(self, workflow_id: str = None, include_distributions: bool = False) -> Dict[str, Any]:
+        """
+        Single-workflow report from its shard, or a system report over every shard
+
+        Percentiles do not merge, so with include_distributions the report
+        carries each shard's distributions side by side.
+        """
+        if workflow_id:
+            return await self._forward(workflow_id, 'generate_report', workflow_id)
+        try:
+            replies = await asyncio.gather(*(
+                self._call(index, 'aggregates', include_distributions) for index in range(self.shards)
+            ))
+        except ConnectionError as e:
+            return {'error': str(e), 'honest_assessment': True}
+
+        aggregates = WorkflowAggregates()
+        for shard_aggregates, _, _ in replies:
+            aggregates.merge(shard_aggregates)
+        report = self.engine_class.system_report(aggregates, self.session_start)
+        if include_distributions:
+            report['distributions'] = {'shards': [distributions for _, _, distributions in replies]}
+        report['metrics'] = {
+            'router': self.stats(),
+            'shards': [metrics for _, metrics, _ in replies],
+        }
+        return report
+
+    # -- change feed and HTTP ----------------------------------------------
+
+    def subscribe_changes(self, max_queue: int = None, overflow: str = None,
+                          workflow_ids: Iterable[str] = None) -> Subscription:
+        """
+        Subscribe to change events from every shard
+
+        The first subscription turns on the shards' relays, so events from
+        before it are not delivered.
+        """
+        subscription = self.change_feed.subscribe(max_queue=max_queue, overflow=overflow, workflow_ids=workflow_ids)
+        if self._relay is None:
+            self._relay = asyncio.gather(
+                *(self._call(index, 'relay_changes') for index in range(self.shards)), return_exceptions=True
+            )
+        return subscription
+
+    async def stream_changes(self, request: Any, writer: asyncio.StreamWriter) -> Any:
+        """GET /events - Server-Sent Events stream of every shard's changes"""
+        from core.web import serve_change_stream
+        return await serve_change_stream(request, writer, self.subscribe_changes)
+
+    def prometheus_metrics(self) -> str:
+        """Router-side operation latency histograms and counters in Prometheus text format"""
+        return self.operation_metrics.render_prometheus()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765) -> None:
+        """Run the JSON HTTP API over the shards until SIGTERM/SIGINT; close() is still up to the caller"""
+        from core.web import ApiServer
+
+        api = ApiServer(self, **self.config.get('api', {}))
+        bound_port = await api.start(host, port)
+        self.logger.info(f"API over {self.shards} shards listening on http://{host}:{bound_port}")
+        await api.serve_forever()
+        self.logger.info(f"API stopped: {api.stats()}")
+
+    def stats(self) -> Dict[str, Any]:
+        frames = sum(outbox.frames for outbox in self._outboxes)
+        messages = sum(outbox.messages for outbox in self._outboxes)
+        return {
+            'shards': self.shards,
+            'alive': sum(1 for process in self._processes if process.is_alive()),
+            'in_flight': sum(len(pending) for pending in self._pending),
+            'frames_sent': frames,
+            'messages_sent': messages,
+            'messages_per_frame': round(messages / frames, 1) if frames else 0.0,
+        }
+
+    async def close(self, timeout: float = 30.0) -> None:
+        """Let every shard finish its work and flush its store, then stop the processes"""
+        self.change_feed.close()
+        closing = [self._call(index, 'close') for index, reader in enumerate(self._readers) if not reader.done()]
+        await asyncio.gather(*closing, return_exceptions=True)
+        for outbox in self._outboxes:
+            outbox.writer.close()
+        for reader in self._readers:
+            reader.cancel()
+        loop = asyncio.get_running_loop()
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                self.logger.warning(f"Shard process {process.name} did not exit, terminating")
+                process.terminate()
+        if self.lease is not None:
+            self.lease.release()
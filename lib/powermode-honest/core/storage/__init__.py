@@ -0,0 +1,53 @@
+"""
+Workflow storage - pluggable backends for workflow state
+
+- InMemoryWorkflowStore: plain dict, used in tests and short sessions
+- SQLiteWorkflowStore: embedded SQLite (WAL) with batched writes
+- WorkflowIdAllocator: time-ordered, collision-free workflow IDs
+- NodeLease: per-process workflow ID node leased from a SQLite file
+- WorkflowAggregates: running counts kept up to date on every write
+- WorkflowRecord: compact slotted per-workflow state with a write version
+- VersionConflict: raised by compare-and-set updates (update(expected_version=...))
+- TieredWorkflowStore: hot store plus a compressed append-only ColdArchive
+  for completed and idle workflows
+"""
+
+from typing import Any
+
+from .aggregates import WorkflowAggregates
+from .base import VersionConflict, WorkflowStore
+from .cold import ColdArchive
+from .ids import WorkflowIdAllocator
+from .leases import NodeLease, NodeLeaseError
+from .memory import InMemoryWorkflowStore
+from .record import STATUS_ORGANIZED, STATUS_TASK_MANAGED, WorkflowRecord, epoch_ms
+from .sqlite import SQLiteWorkflowStore
+from .tiered import TieredWorkflowStore
+
+
+def create_store(backend: str = 'memory', **options: Any) -> WorkflowStore:
+    """Create a workflow store from a backend name and its options"""
+    if backend == 'memory':
+        return InMemoryWorkflowStore()
+    if backend == 'sqlite':
+        return SQLiteWorkflowStore(**options)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+__all__ = [
+    'WorkflowStore',
+    'VersionConflict',
+    'InMemoryWorkflowStore',
+    'SQLiteWorkflowStore',
+    'NodeLease',
+    'NodeLeaseError',
+    'TieredWorkflowStore',
+    'ColdArchive',
+    'WorkflowIdAllocator',
+    'WorkflowAggregates',
+    'WorkflowRecord',
+    'epoch_ms',
+    'STATUS_ORGANIZED',
+    'STATUS_TASK_MANAGED',
+    'create_store',
+]
@@ -0,0 +1,100 @@
+"""
+Running workflow aggregates
+
+Maintained at write time by the store so the system report never has to
+scan every workflow. Each workflow contributes (status, progress); the
+store removes the old contribution and adds the new one on every write.
+"""
+
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List
+
+if TYPE_CHECKING:
+    from .record import WorkflowRecord
+
+
+PROGRESS_BUCKETS = 11  # 0-10, 10-20, ..., 90-100, and exactly 100
+BUCKET_LABELS = [f"{i * 10}-{i * 10 + 10}" for i in range(10)] + ['100']
+
+
+def progress_bucket(progress: float) -> int:
+    """Histogram bucket for a progress percentage"""
+    if progress >= 100:
+        return PROGRESS_BUCKETS - 1
+    if progress <= 0:
+        return 0
+    return min(int(progress // 10), PROGRESS_BUCKETS - 2)
+
+
+class WorkflowAggregates:
+    """Counts per status, completed count, progress sum and distribution"""
+
+    def __init__(self):
+        self.total = 0
+        self.completed = 0
+        self.progress_sum = 0.0
+        self.by_status: Counter = Counter()
+        self.progress_histogram: List[int] = [0] * PROGRESS_BUCKETS
+
+    def add(self, status: str, progress: float, count: int = 1) -> None:
+        self.total += count
+        self.by_status[status] += count
+        self.progress_sum += progress * count
+        self.progress_histogram[progress_bucket(progress)] += count
+        if progress >= 100:
+            self.completed += count
+
+    def remove(self, status: str, progress: float, count: int = 1) -> None:
+        self.add(status, progress, -count)
+        if self.by_status[status] <= 0:
+            del self.by_status[status]
+
+    def add_workflow(self, workflow: 'WorkflowRecord') -> None:
+        self.add(workflow.status, workflow.progress)
+
+    def remove_workflow(self, workflow: 'WorkflowRecord') -> None:
+        self.remove(workflow.status, workflow.progress)
+
+    def merge(self, other: 'WorkflowAggregates') -> None:
+        """Add another set of aggregates (e.g. a second storage tier) to this one"""
+        self.total += other.total
+        self.completed += other.completed
+        self.progress_sum += other.progress_sum
+        self.by_status.update(other.by_status)
+        for bucket, count in enumerate(other.progress_histogram):
+            self.progress_histogram[bucket] += count
+
+    @property
+    def active(self) -> int:
+        return self.total - self.completed
+
+    @property
+    def average_progress(self) -> float:
+        return self.progress_sum / self.total if self.total else 0.0
+
+    @classmethod
+    def from_workflows(cls, workflows: Iterable['WorkflowRecord']) -> 'WorkflowAggregates':
+        """Recompute from scratch (full scan) - used for consistency checks"""
+        aggregates = cls()
+        for workflow in workflows:
+            aggregates.add_workflow(workflow)
+        return aggregates
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'total': self.total,
+            'completed': self.completed,
+            'active': self.active,
+            'by_status': dict(self.by_status),
+            'average_progress_percent': round(self.average_progress, 1),
+            'progress_distribution': dict(zip(BUCKET_LABELS, self.progress_histogram)),
+        }
+
+    def drift(self, other: 'WorkflowAggregates') -> Dict[str, Any]:
+        """Fields where self differs from other, as {field: {'running': x, 'recomputed': y}}"""
+        drift = {}
+        mine, theirs = self.summary(), other.summary()
+        for field, value in mine.items():
+            if value != theirs[field]:
+                drift[field] = {'running': value, 'recomputed': theirs[field]}
+        return drift
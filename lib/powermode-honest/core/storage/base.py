@@ -0,0 +1,201 @@
+"""
+Workflow store interface
+
+A store behaves like a read-mostly mapping of workflow_id -> WorkflowRecord.
+New workflows go in with put(); changes go through update() so the store
+can keep its running aggregates (see aggregates.py) exact without ever
+rescanning. Backends implement _load/_save and the scan primitives.
+
+Observers (add_observer) see the same writes, for derived views that
+have to stay incremental too (e.g. core.analytics).
+
+Every write bumps the record's version. update(expected_version=...) is
+a compare-and-set: it raises VersionConflict if the workflow was written
+since the caller read it (see core.concurrency for the retry loop).
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+from .aggregates import WorkflowAggregates
+from .record import WorkflowRecord
+
+
+class VersionConflict(Exception):
+    """The workflow was written by someone else since expected_version was read"""
+
+    def __init__(self, workflow_id: str, expected_version: int, actual_version: int):
+        super().__init__(
+            f"Workflow {workflow_id} is at version {actual_version}, expected {expected_version}"
+        )
+        self.workflow_id = workflow_id
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+
+
+class WorkflowStore(ABC):
+    """Abstract base for workflow storage backends"""
+
+    def __init__(self):
+        self.aggregates = WorkflowAggregates()
+        self._observers: List[Any] = []
+
+    # -- backend primitives ------------------------------------------------
+
+    @abstractmethod
+    def _load(self, workflow_id: str) -> Optional[WorkflowRecord]:
+        """Fetch a workflow from the backend, or None"""
+
+    @abstractmethod
+    def _save(self, workflow_id: str, workflow: WorkflowRecord) -> None:
+        """Persist a workflow (may be deferred until flush())"""
+
+    @abstractmethod
+    def _delete(self, workflow_id: str) -> None:
+        """Remove a workflow from the backend (may be deferred until flush())"""
+
+    @abstractmethod
+    def items(self) -> Iterator[Tuple[str, WorkflowRecord]]:
+        """Iterate over all workflows (full scan - avoid on hot paths)"""
+
+    # -- public API --------------------------------------------------------
+
+    def get(self, workflow_id: str) -> Optional[WorkflowRecord]:
+        """Return the workflow, or None if it does not exist"""
+        return self._load(workflow_id)
+
+    def put(self, workflow_id: str, workflow: WorkflowRecord) -> None:
+        """Insert a workflow, replacing any existing one with the same ID"""
+        previous = self._load(workflow_id)
+        if previous is not None:
+            self.aggregates.remove_workflow(previous)
+            workflow.version = previous.version + 1
+        self.aggregates.add_workflow(workflow)
+        self._save(workflow_id, workflow)
+        self._notify_changed(workflow_id, workflow)
+
+    def update(self, workflow_id: str, expected_version: Optional[int] = None, **changes: Any) -> WorkflowRecord:
+        """
+        Apply changes to an existing workflow and return it
+
+        Always mutate stored workflows through this method - in-place edits
+        bypass the running aggregates and the version. With expected_version
+        the update only happens if the workflow is still at that version.
+        """
+        workflow = self._load(workflow_id)
+        if workflow is None:
+            raise KeyError(workflow_id)
+        self._check_version(workflow_id, workflow, expected_version)
+        self.aggregates.remove_workflow(workflow)
+        workflow.apply(changes)
+        workflow.version += 1
+        self.aggregates.add_workflow(workflow)
+        self._save(workflow_id, workflow)
+        self._notify_changed(workflow_id, workflow)
+        return workflow
+
+    def delete(self, workflow_id: str) -> Optional[WorkflowRecord]:
+        """Remove a workflow and return it, or None if it does not exist"""
+        workflow = self._load(workflow_id)
+        if workflow is None:
+            return None
+        self.aggregates.remove_workflow(workflow)
+        self._delete(workflow_id)
+        for observer in self._observers:
+            observer.workflow_removed(workflow_id)
+        return workflow
+
+    @staticmethod
+    def _check_version(workflow_id: str, workflow: WorkflowRecord, expected_version: Optional[int]) -> None:
+        if expected_version is not None and workflow.version != expected_version:
+            raise VersionConflict(workflow_id, expected_version, workflow.version)
+
+    def add_observer(self, observer: Any) -> None:
+        """
+        Call observer.workflow_changed(workflow_id, workflow) after every
+        put/update and observer.workflow_removed(workflow_id) after delete
+
+        Moves between storage tiers are not changes and are not reported.
+        """
+        self._observers.append(observer)
+
+    def remove_observer(self, observer: Any) -> None:
+        self._observers.remove(observer)
+
+    def _notify_changed(self, workflow_id: str, workflow: WorkflowRecord) -> None:
+        for observer in self._observers:
+            observer.workflow_changed(workflow_id, workflow)
+
+    def count_completed(self) -> int:
+        """Number of workflows with progress >= 100 (constant time)"""
+        return self.aggregates.completed
+
+    def verify_aggregates(self, repair: bool = False) -> Dict[str, Any]:
+        """
+        Recompute aggregates with a full scan and report any drift
+
+        Returns {'consistent': bool, 'drift': {...}}. With repair=True the
+        recomputed aggregates replace the running ones.
+        """
+        recomputed = WorkflowAggregates.from_workflows(workflow for _, workflow in self.items())
+        drift = self.aggregates.drift(recomputed)
+        if drift and repair:
+            self.aggregates = recomputed
+        return {'consistent': not drift, 'drift': drift, 'repaired': bool(drift) and repair}
+
+    def activity(self) -> Iterator[Tuple[str, float, int]]:
+        """
+        (workflow_id, progress, last activity in epoch ms) for every workflow
+
+        Last activity is last_updated, or created_at if never updated. Full
+        scan; backends override it to skip decoding whole records.
+        """
+        for workflow_id, workflow in self.items():
+            yield workflow_id, workflow.progress, workflow.last_updated or workflow.created_at
+
+    def range_by_id(self, low: str, high: str) -> Iterator[Tuple[str, WorkflowRecord]]:
+        """
+        Iterate workflows with low <= workflow_id <= high, in ID order
+
+        Workflow IDs sort by creation time, so this doubles as a
+        created-between scan (see WorkflowIdAllocator.id_range).
+        """
+        for workflow_id, workflow in sorted(self.items(), key=lambda item: item[0]):
+            if low <= workflow_id <= high:
+                yield workflow_id, workflow
+
+    def lease_node_id(self, node_id: Optional[int] = None) -> Optional[int]:
+        """
+        Reserve a workflow ID node for this store's writer and return it
+
+        Backends that other processes can open (SQLite) hand out a node no
+        one else holds. A volatile backend is private to the process, so
+        there is nothing to coordinate and node_id comes back unchanged.
+        """
+        return node_id
+
+    def flush(self) -> None:
+        """Write any pending changes (no-op for volatile backends)"""
+
+    def close(self) -> None:
+        """Flush and release resources"""
+        self.flush()
+
+    def values(self) -> Iterator[WorkflowRecord]:
+        for _, workflow in self.items():
+            yield workflow
+
+    def __len__(self) -> int:
+        return self.aggregates.total
+
+    def __contains__(self, workflow_id: object) -> bool:
+        return isinstance(workflow_id, str) and self.get(workflow_id) is not None
+
+    def __getitem__(self, workflow_id: str) -> WorkflowRecord:
+        workflow = self.get(workflow_id)
+        if workflow is None:
+            raise KeyError(workflow_id)
+        return workflow
+
+    def __setitem__(self, workflow_id: str, workflow: WorkflowRecord) -> None:
+        self.put(workflow_id, workflow)
@@ -0,0 +1,325 @@
+"""
+Cold workflow archive
+
+Append-only storage for workflows that left the hot tier:
+- Segment files hold zlib-compressed blocks of JSON lines ("<id>\\t<json>"),
+  sorted by workflow ID within each block
+- A sparse index keeps (min ID, max ID, segment, offset, length) per block
+  in memory; lookups check blocks newest first and decompress only the
+  blocks whose ID range can contain the workflow
+- index.jsonl is the only metadata file: one line per block plus one
+  line per promoted workflow, replayed on open (aggregates included)
+- Nothing is rewritten in place. A promoted workflow is shadowed by a
+  promotion entry; archiving it again writes a newer copy
+- Writes are split so callers can keep the slow part off an event loop:
+  encode_block() snapshots records as JSON lines, write_block() compresses,
+  fsyncs and indexes them (may run on a worker thread) and add_block()
+  makes the written block visible, back on the caller's thread.
+  Promotions can be marked in memory and their index entries written
+  later in one batch (mark_promoted / write_entries)
+"""
+
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+from .aggregates import WorkflowAggregates
+from .record import WorkflowRecord
+
+
+INDEX_FILE = 'index.jsonl'
+SEGMENT_TEMPLATE = 'segment-{:06d}.jsonl.zz'
+
+
+class _Block:
+    __slots__ = ('min_id', 'max_id', 'segment', 'offset', 'length', 'count')
+
+    def __init__(self, min_id: str, max_id: str, segment: int, offset: int, length: int, count: int):
+        self.min_id = min_id
+        self.max_id = max_id
+        self.segment = segment
+        self.offset = offset
+        self.length = length
+        self.count = count
+
+
+class ColdArchive:
+    """
+    Compressed, append-only workflow archive with a sparse ID index
+
+    block_size workflows go into each compressed block; a new segment file
+    is started once the current one reaches segment_max_bytes.
+    """
+
+    def __init__(self, directory: str, block_size: int = 1024, segment_max_bytes: int = 64 * 1024 * 1024,
+                 compression_level: int = 6, block_cache_size: int = 8):
+        self.directory = directory
+        self.block_size = block_size
+        self.segment_max_bytes = segment_max_bytes
+        self.compression_level = compression_level
+        self.block_cache_size = block_cache_size
+
+        self.aggregates = WorkflowAggregates()
+        self._blocks: List[_Block] = []
+        # Promoted workflows - their archived copies are dead until archived again
+        self._promoted: Set[str] = set()
+        self._block_cache: 'OrderedDict[int, bytes]' = OrderedDict()
+        self._readers: Dict[int, BinaryIO] = {}
+        self._segment = 1
+        self._segment_bytes = 0
+        self.bytes_written = 0
+        self.raw_bytes_written = 0
+        # Serializes segment and index writes, which may come from a worker thread
+        self._write_lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._replay_index()
+        self._index = open(os.path.join(directory, INDEX_FILE), 'a', encoding='utf-8')
+
+    # -- index -------------------------------------------------------------
+
+    def _replay_index(self) -> None:
+        path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, encoding='utf-8') as index:
+            for line in index:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash - its block was never acknowledged
+                    continue
+                if 'promoted' in entry:
+                    self._promoted.add(entry['promoted'])
+                    self.aggregates.remove(entry['status'], entry['progress'])
+                    continue
+                self.add_block(entry)
+        for segment in {block.segment for block in self._blocks}:
+            self._segment = max(self._segment, segment)
+        segment_path = self._segment_path(self._segment)
+        self._segment_bytes = os.path.getsize(segment_path) if os.path.exists(segment_path) else 0
+
+    def add_block(self, entry: Dict[str, Any]) -> None:
+        """Make a block written by write_block() (or replayed) visible to reads and aggregates"""
+        self._blocks.append(_Block(
+            entry['min'], entry['max'], entry['segment'], entry['offset'], entry['length'], entry['count']
+        ))
+        for workflow_id in entry.get('revived', ()):
+            self._promoted.discard(workflow_id)
+        for status, progress, count in entry['stats']:
+            self.aggregates.add(status, progress, count)
+
+    def _write_index(self, entry: Dict[str, Any]) -> None:
+        self.write_entries([entry])
+
+    def write_entries(self, entries: List[Dict[str, Any]]) -> None:
+        """Append index entries (e.g. from mark_promoted) with a single fsync"""
+        if not entries:
+            return
+        with self._write_lock:
+            self._index.write(''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries))
+            self._index.flush()
+            os.fsync(self._index.fileno())
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, SEGMENT_TEMPLATE.format(segment))
+
+    # -- writes ------------------------------------------------------------
+
+    def append(self, workflows: List[Tuple[str, WorkflowRecord]]) -> int:
+        """
+        Archive workflows as new blocks; returns the number written
+
+        Each block is on disk (fsynced) and indexed before this returns, so
+        the caller may drop the workflows from the hot tier afterwards.
+        """
+        for block in self.encode_blocks(workflows):
+            self.add_block(self.write_block(block))
+        return len(workflows)
+
+    def encode_blocks(self, workflows: List[Tuple[str, WorkflowRecord]]) -> Iterator[Dict[str, Any]]:
+        """Yield workflows as encoded blocks of at most block_size, in ID order (see encode_block)"""
+        workflows = sorted(workflows, key=lambda item: item[0])
+        for start in range(0, len(workflows), self.block_size):
+            yield self.encode_block(workflows[start:start + self.block_size])
+
+    def encode_block(self, workflows: List[Tuple[str, WorkflowRecord]]) -> Dict[str, Any]:
+        """
+        Snapshot workflows (sorted by ID) as one block for write_block()
+
+        The records may change as soon as this returns; the block does not.
+        """
+        lines = []
+        stats: Dict[Tuple[str, float], int] = {}
+        for workflow_id, workflow in workflows:
+            document = [
+                workflow.description, workflow.status, workflow.progress,
+                workflow.created_at, workflow.last_updated, workflow.payload()
+            ]
+            lines.append(f"{workflow_id}\t{json.dumps(document, separators=(',', ':'), default=str)}\n")
+            key = (workflow.status, workflow.progress)
+            stats[key] = stats.get(key, 0) + 1
+        return {
+            'raw': ''.join(lines).encode(), 'ids': [workflow_id for workflow_id, _ in workflows],
+            'stats': [[status, progress, count] for (status, progress), count in stats.items()],
+        }
+
+    def write_block(self, block: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compress, write and index an encoded block; durable when this returns
+
+        Touches no in-memory state, so it can run on a worker thread. Pass
+        the returned entry to add_block() to make the block readable.
+        """
+        raw, workflow_ids = block['raw'], block['ids']
+        compressed = zlib.compress(raw, self.compression_level)
+        revived = [workflow_id for workflow_id in workflow_ids if workflow_id in self._promoted]
+        with self._write_lock:
+            segment, offset = self._write_segment(compressed)
+            self.bytes_written += len(compressed)
+            self.raw_bytes_written += len(raw)
+        entry = {
+            'segment': segment, 'offset': offset, 'length': len(compressed),
+            'min': workflow_ids[0], 'max': workflow_ids[-1], 'count': len(workflow_ids), 'stats': block['stats'],
+        }
+        if revived:
+            entry['revived'] = revived
+        self._write_index(entry)
+        return entry
+
+    def _write_segment(self, compressed: bytes) -> Tuple[int, int]:
+        if self._segment_bytes and self._segment_bytes + len(compressed) > self.segment_max_bytes:
+            self._segment += 1
+            self._segment_bytes = 0
+        with open(self._segment_path(self._segment), 'ab') as segment:
+            offset = segment.tell()
+            segment.write(compressed)
+            segment.flush()
+            os.fsync(segment.fileno())
+        self._segment_bytes = offset + len(compressed)
+        return self._segment, offset
+
+    def discard(self, workflow_id: str, workflow: WorkflowRecord) -> None:
+        """Mark the archived copy of a workflow dead (it was promoted to the hot tier)"""
+        self._write_index(self.mark_promoted(workflow_id, workflow.status, workflow.progress))
+
+    def mark_promoted(self, workflow_id: str, status: str, progress: float) -> Dict[str, Any]:
+        """
+        Mark the archived copy dead in memory only; returns its index entry
+
+        Until the entry is passed to write_entries() a restart sees the
+        archived copy as live again.
+        """
+        self._promoted.add(workflow_id)
+        self.aggregates.remove(status, progress)
+        return {'promoted': workflow_id, 'status': status, 'progress': progress}
+
+    # -- reads -------------------------------------------------------------
+
+    def _read_block(self, number: int) -> bytes:
+        """Decompressed block contents, prefixed with a newline for line searches"""
+        data = self._block_cache.get(number)
+        if data is not None:
+            self._block_cache.move_to_end(number)
+            return data
+
+        block = self._blocks[number]
+        reader = self._readers.get(block.segment)
+        if reader is None:
+            reader = self._readers[block.segment] = open(self._segment_path(block.segment), 'rb')
+        reader.seek(block.offset)
+        data = b'\n' + zlib.decompress(reader.read(block.length))
+
+        self._block_cache[number] = data
+        if len(self._block_cache) > self.block_cache_size:
+            self._block_cache.popitem(last=False)
+        return data
+
+    @staticmethod
+    def _decode(line: bytes) -> Tuple[str, WorkflowRecord]:
+        workflow_id, _, document = line.partition(b'\t')
+        description, status, progress, created_at, last_updated, payload = json.loads(document)
+        workflow = WorkflowRecord.from_columns(description, status, progress, created_at, last_updated, payload)
+        return workflow_id.decode(), workflow
+
+    def get(self, workflow_id: str) -> Optional[WorkflowRecord]:
+        """Newest live archived copy of a workflow, or None"""
+        if workflow_id in self._promoted:
+            return None
+        needle = b'\n' + workflow_id.encode() + b'\t'
+        for number in range(len(self._blocks) - 1, -1, -1):
+            block = self._blocks[number]
+            if not block.min_id <= workflow_id <= block.max_id:
+                continue
+            data = self._read_block(number)
+            start = data.find(needle)
+            if start < 0:
+                continue
+            end = data.find(b'\n', start + 1)
+            return self._decode(data[start + 1:end])[1]
+        return None
+
+    def _live_in(self, number: int, low: Optional[str] = None,
+                 high: Optional[str] = None) -> Iterator[Tuple[str, WorkflowRecord]]:
+        for line in self._read_block(number).split(b'\n'):
+            if not line:
+                continue
+            workflow_id = line[:line.index(b'\t')].decode()
+            if workflow_id in self._promoted:
+                continue
+            if low is not None and not low <= workflow_id <= high:
+                continue
+            yield self._decode(line)
+
+    def items(self) -> Iterator[Tuple[str, WorkflowRecord]]:
+        """All live archived workflows, newest copy of each (full scan)"""
+        seen = set()
+        for number in range(len(self._blocks) - 1, -1, -1):
+            for workflow_id, workflow in self._live_in(number):
+                if workflow_id not in seen:
+                    seen.add(workflow_id)
+                    yield workflow_id, workflow
+
+    def range_by_id(self, low: str, high: str) -> Iterator[Tuple[str, WorkflowRecord]]:
+        """Live archived workflows with low <= workflow_id <= high, in ID order"""
+        found: Dict[str, WorkflowRecord] = {}
+        for number in range(len(self._blocks) - 1, -1, -1):
+            block = self._blocks[number]
+            if block.max_id < low or block.min_id > high:
+                continue
+            for workflow_id, workflow in self._live_in(number, low, high):
+                found.setdefault(workflow_id, workflow)
+        for workflow_id in sorted(found):
+            yield workflow_id, found[workflow_id]
+
+    # -- housekeeping ------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self.aggregates.total
+
+    def stats(self) -> Dict[str, Any]:
+        bytes_on_disk = sum(
+            os.path.getsize(self._segment_path(segment))
+            for segment in {block.segment for block in self._blocks}
+        )
+        return {
+            'workflows': self.aggregates.total,
+            'blocks': len(self._blocks),
+            'segments': len({block.segment for block in self._blocks}),
+            'bytes_on_disk': bytes_on_disk,
+            'compression_ratio': (
+                round(self.raw_bytes_written / self.bytes_written, 2) if self.bytes_written else None
+            ),
+            'shadowed_by_promotion': len(self._promoted),
+        }
+
+    def close(self) -> None:
+        for reader in self._readers.values():
+            reader.close()
+        self._readers.clear()
+        with self._write_lock:
+            if not self._index.closed:
+                self._index.close()
@@ -0,0 +1,154 @@
+"""
+Workflow ID node leases in a shared SQLite file
+
+Processes that write the same database (or route into the same set of
+shard databases) must mint IDs from distinct nodes (see ids.py). Each one
+leases a node as a row in node_leases:
+
+- Taken inside one BEGIN IMMEDIATE transaction, so two processes opening
+  the file at once cannot get the same node
+- A lease is free again after release(), once its process has died (same
+  host), or after timeout_seconds without a heartbeat (other hosts)
+- The heartbeat is renewed by a daemon thread on its own connection, so an
+  idle or busy owner keeps its node either way
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from .ids import MAX_NODE_ID
+
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS node_leases (
+        node_id INTEGER PRIMARY KEY,
+        host TEXT NOT NULL,
+        pid INTEGER NOT NULL,
+        heartbeat REAL NOT NULL
+    )
+"""
+_SELECT_LEASES = "SELECT node_id, host, pid, heartbeat FROM node_leases"
+_DELETE_LEASE = "DELETE FROM node_leases WHERE node_id = ?"
+_INSERT_LEASE = "INSERT INTO node_leases (node_id, host, pid, heartbeat) VALUES (?, ?, ?, ?)"
+_RENEW_LEASE = "UPDATE node_leases SET heartbeat = ? WHERE node_id = ?"
+
+
+class NodeLeaseError(RuntimeError):
+    """No workflow ID node could be leased from the database"""
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name != 'posix':
+        return True  # No cheap probe - rely on the heartbeat timeout
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class NodeLease:
+    """
+    One process's lease on a workflow ID node in the database at path
+
+    The connection is opened on the first acquire() and shared with the
+    heartbeat thread under a lock; call release() when done.
+    """
+
+    def __init__(self, path: str, timeout_seconds: float = 3600):
+        self.path = path
+        self.timeout_seconds = timeout_seconds
+        self.node_id: Optional[int] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def acquire(self, node_id: Optional[int] = None) -> int:
+        """
+        Lease node_id, or the lowest free node if None, and return it
+
+        Raises NodeLeaseError if node_id is held by a live owner or every
+        node is taken; a refused request keeps the current lease.
+        """
+        with self._lock:
+            if self.node_id is not None and node_id in (None, self.node_id):
+                return self.node_id
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+                self._conn.execute(_SCHEMA)
+            node_id = self._claim(node_id)
+            self.node_id = node_id
+
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(target=self._renew_until_released, name='node-lease', daemon=True)
+            self._heartbeat.start()
+        return node_id
+
+    def _claim(self, node_id: Optional[int]) -> int:
+        conn = self._conn
+        host, now = socket.gethostname(), time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            held = set()
+            for leased, lease_host, pid, heartbeat in conn.execute(_SELECT_LEASES).fetchall():
+                if leased == self.node_id:
+                    continue
+                if lease_host == host:
+                    alive = _process_alive(pid)
+                else:
+                    alive = now - heartbeat < self.timeout_seconds
+                if alive:
+                    held.add(leased)
+                else:
+                    conn.execute(_DELETE_LEASE, (leased,))
+            if node_id is None:
+                node_id = next((candidate for candidate in range(MAX_NODE_ID + 1) if candidate not in held), None)
+                if node_id is None:
+                    raise NodeLeaseError(f"All {MAX_NODE_ID + 1} workflow ID nodes in {self.path} are leased")
+            elif node_id in held:
+                raise NodeLeaseError(f"Workflow ID node {node_id} in {self.path} is leased by another process")
+            if self.node_id is not None:
+                conn.execute(_DELETE_LEASE, (self.node_id,))
+            conn.execute(_INSERT_LEASE, (node_id, host, os.getpid(), now))
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return node_id
+
+    def renew(self) -> None:
+        """Refresh the heartbeat of the current lease (no-op without one)"""
+        with self._lock:
+            if self.node_id is not None and self._conn is not None:
+                self._conn.execute(_RENEW_LEASE, (time.time(), self.node_id))
+
+    def _renew_until_released(self) -> None:
+        # Several heartbeats per timeout, so one slow or failed renewal does not lose the node
+        interval = max(self.timeout_seconds / 4, 0.01)
+        while not self._stopped.wait(interval):
+            try:
+                self.renew()
+            except sqlite3.Error:
+                pass  # Database busy or locked - the next beat retries
+
+    def release(self) -> None:
+        """Give the node back and stop the heartbeat"""
+        self._stopped.set()
+        with self._lock:
+            if self._conn is None:
+                return
+            if self.node_id is not None:
+                try:
+                    self._conn.execute(_DELETE_LEASE, (self.node_id,))
+                except sqlite3.Error:
+                    pass  # Expires on its own once the heartbeat stops
+                self.node_id = None
+            self._conn.close()
+            self._conn = None
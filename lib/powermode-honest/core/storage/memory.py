@@ -0,0 +1,31 @@
+"""
+In-memory workflow store
+
+Same behaviour as the original active_workflows dict. Nothing survives a
+restart, so this backend is meant for tests and throwaway sessions.
+"""
+
+from typing import Dict, Optional, Iterator, Tuple
+
+from .base import WorkflowStore
+from .record import WorkflowRecord
+
+
+class InMemoryWorkflowStore(WorkflowStore):
+    """Dict-backed workflow store"""
+
+    def __init__(self):
+        super().__init__()
+        self._workflows: Dict[str, WorkflowRecord] = {}
+
+    def _load(self, workflow_id: str) -> Optional[WorkflowRecord]:
+        return self._workflows.get(workflow_id)
+
+    def _save(self, workflow_id: str, workflow: WorkflowRecord) -> None:
+        self._workflows[workflow_id] = workflow
+
+    def _delete(self, workflow_id: str) -> None:
+        del self._workflows[workflow_id]
+
+    def items(self) -> Iterator[Tuple[str, WorkflowRecord]]:
+        return iter(list(self._workflows.items()))
@@ -0,0 +1,96 @@
+"""
+Compact workflow record
+
+One slotted object per workflow instead of a dict holding two datetimes.
+Status strings are interned (every record shares the same few str objects)
+and timestamps are epoch milliseconds as plain ints.
+"""
+
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional
+
+
+STATUS_ORGANIZED = sys.intern('organized')
+STATUS_TASK_MANAGED = sys.intern('task_managed')
+
+
+def epoch_ms() -> int:
+    """Current time as integer epoch milliseconds"""
+    return time.time_ns() // 1_000_000
+
+
+def to_datetime(timestamp_ms: int) -> datetime:
+    return datetime.fromtimestamp(timestamp_ms / 1000)
+
+
+class WorkflowRecord:
+    """
+    State of one workflow
+
+    last_updated is 0 until the first progress update. completed_mask is
+    the task completion bitset (see core.progress). version starts at 1
+    and the store bumps it on every write (compare-and-set, see
+    WorkflowStore.update).
+    """
+
+    __slots__ = (
+        'description', 'structure', 'status', 'progress',
+        'created_at', 'last_updated', 'task_plan', 'completed_mask', 'version',
+    )
+
+    def __init__(self, description: str, structure: Mapping[str, Any], status: str = STATUS_ORGANIZED,
+                 progress: float = 0.0, created_at: Optional[int] = None, last_updated: int = 0,
+                 task_plan: Optional[Dict[str, Any]] = None, completed_mask: int = 0, version: int = 1):
+        self.description = description
+        self.structure = structure
+        self.status = sys.intern(status)
+        self.progress = progress
+        self.created_at = epoch_ms() if created_at is None else created_at
+        self.last_updated = last_updated
+        self.task_plan = task_plan
+        self.completed_mask = completed_mask
+        self.version = version
+
+    def apply(self, changes: Mapping[str, Any]) -> None:
+        """Set fields from changes (status values are interned)"""
+        for field, value in changes.items():
+            if field == 'status':
+                value = sys.intern(value)
+            setattr(self, field, value)
+
+    @property
+    def created_datetime(self) -> datetime:
+        return to_datetime(self.created_at)
+
+    @property
+    def last_updated_datetime(self) -> datetime:
+        return to_datetime(self.last_updated or self.created_at)
+
+    # -- serialization (used by persistent stores) ------------------------
+
+    def payload(self) -> Dict[str, Any]:
+        """Fields that persistent stores keep as a JSON document"""
+        payload = {'structure': self.structure, 'completed_mask': self.completed_mask, 'version': self.version}
+        if self.task_plan is not None:
+            payload['task_plan'] = self.task_plan
+        return payload
+
+    @classmethod
+    def from_columns(cls, description: str, status: str, progress: float, created_at: int,
+                     last_updated: int, payload: Mapping[str, Any]) -> 'WorkflowRecord':
+        completed_mask = payload.get('completed_mask')
+        if completed_mask is None and payload.get('completed_tasks'):
+            # Rows written before the bitset existed stored a list of task IDs
+            from core.progress import TaskIndex
+            completed_mask, _ = TaskIndex(payload['structure']).mask_for(payload['completed_tasks'])
+        return cls(
+            description, payload['structure'], status=status, progress=progress,
+            created_at=created_at, last_updated=last_updated,
+            task_plan=payload.get('task_plan'), completed_mask=completed_mask or 0,
+            version=payload.get('version', 1),
+        )
+
+    def __repr__(self) -> str:
+        return f"WorkflowRecord(status={self.status!r}, progress={self.progress:.1f}, description={self.description!r})"
@@ -0,0 +1,288 @@
+"""
+SQLite workflow store
+
+Durable backend for long-running sessions:
+- WAL journal so readers never block the writer
+- Writes are buffered and flushed in batches inside one transaction
+- Fixed SQL strings, so sqlite3's statement cache reuses prepared statements
+- Bounded LRU cache in front of the database instead of an unbounded dict
+- Indexes on status and progress for lookups and reports; creation-time
+  scans use the time-ordered primary key (see ids.py)
+- Running aggregates are seeded with two GROUP BY queries on open and then
+  maintained incrementally by the base class
+- Buffered writes are also flushed flush_interval_seconds after the first
+  one, so a crash loses at most that window rather than a whole batch
+- Processes sharing one database lease distinct workflow ID nodes from the
+  node_leases table, so their IDs cannot collide (see leases.py)
+"""
+
+import asyncio
+import atexit
+import json
+import sqlite3
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Iterator, Set, Tuple, List
+
+from .base import WorkflowStore
+from .leases import NodeLease
+from .record import WorkflowRecord
+
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS workflows (
+        workflow_id TEXT PRIMARY KEY,
+        description TEXT NOT NULL,
+        status TEXT NOT NULL,
+        progress REAL NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL,
+        last_updated REAL,
+        payload TEXT NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_workflows_status ON workflows (status)",
+    "CREATE INDEX IF NOT EXISTS idx_workflows_progress ON workflows (progress)",
+    # Workflow IDs sort by creation time, a separate timestamp index is redundant
+    "DROP INDEX IF EXISTS idx_workflows_created_at",
+)
+
+_COLUMNS = "workflow_id, description, status, progress, created_at, last_updated, payload"
+
+_UPSERT = f"INSERT OR REPLACE INTO workflows ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)"
+_DELETE = "DELETE FROM workflows WHERE workflow_id = ?"
+_SELECT_ONE = f"SELECT {_COLUMNS} FROM workflows WHERE workflow_id = ?"
+_SELECT_ALL = f"SELECT {_COLUMNS} FROM workflows"
+_SELECT_ACTIVITY = "SELECT workflow_id, progress, COALESCE(last_updated, created_at) FROM workflows"
+_SELECT_LIVE = f"SELECT {_COLUMNS} FROM workflows WHERE progress < 100 ORDER BY workflow_id DESC LIMIT ?"
+_SELECT_RANGE = f"SELECT {_COLUMNS} FROM workflows WHERE workflow_id BETWEEN ? AND ? ORDER BY workflow_id"
+_AGGREGATE_STATUS = "SELECT status, COUNT(*), TOTAL(progress), TOTAL(progress >= 100) FROM workflows GROUP BY status"
+_AGGREGATE_PROGRESS = (
+    "SELECT CASE WHEN progress >= 100 THEN 10 WHEN progress <= 0 THEN 0 "
+    "ELSE MIN(CAST(progress / 10 AS INTEGER), 9) END, COUNT(*) FROM workflows GROUP BY 1"
+)
+
+
+class SQLiteWorkflowStore(WorkflowStore):
+    """
+    SQLite-backed workflow store
+
+    Workflows are cached in memory (LRU, bounded by cache_size) and dirty
+    entries are written back in batches of batch_size, or after
+    flush_interval_seconds when written from a running event loop. Call
+    flush() to force pending writes and close() on shutdown.
+    """
+
+    def __init__(self, path: str = 'power_mode_honest.db', batch_size: int = 500,
+                 cache_size: int = 50_000, warm_on_open: bool = True, lease_timeout_seconds: float = 3600,
+                 flush_interval_seconds: float = 1.0):
+        super().__init__()
+        self.path = path
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.lease = NodeLease(path, timeout_seconds=lease_timeout_seconds)
+
+        self._conn = sqlite3.connect(path, isolation_level=None, cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+
+        self._cache: 'OrderedDict[str, WorkflowRecord]' = OrderedDict()
+        self._dirty: Dict[str, WorkflowRecord] = {}
+        self._deleted: Set[str] = set()
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._closed = False
+
+        # Pending batches must not be lost if the owner forgets close()
+        atexit.register(self.close)
+
+        self._seed_aggregates()
+        if warm_on_open:
+            self.warm()
+
+    # -- serialization -----------------------------------------------------
+    # Columns keep epoch seconds (readable from the sqlite3 shell); records keep epoch ms
+
+    @staticmethod
+    def _to_row(workflow_id: str, workflow: WorkflowRecord) -> Tuple[Any, ...]:
+        return (
+            workflow_id,
+            workflow.description,
+            workflow.status,
+            float(workflow.progress),
+            workflow.created_at / 1000,
+            workflow.last_updated / 1000 if workflow.last_updated else None,
+            json.dumps(workflow.payload(), separators=(',', ':'), default=str),
+        )
+
+    @staticmethod
+    def _from_row(row: Tuple[Any, ...]) -> Tuple[str, WorkflowRecord]:
+        workflow_id, description, status, progress, created_at, last_updated, payload = row
+        workflow = WorkflowRecord.from_columns(
+            description, status, progress,
+            round(created_at * 1000), round(last_updated * 1000) if last_updated is not None else 0,
+            json.loads(payload)
+        )
+        return workflow_id, workflow
+
+    # -- cache -------------------------------------------------------------
+
+    def _remember(self, workflow_id: str, workflow: WorkflowRecord) -> None:
+        self._cache[workflow_id] = workflow
+        self._cache.move_to_end(workflow_id)
+        while len(self._cache) > self.cache_size:
+            evicted_id, _ = self._cache.popitem(last=False)
+            if evicted_id in self._dirty:
+                # Never drop unsaved state - write the whole batch first
+                self.flush()
+
+    def _seed_aggregates(self) -> None:
+        """Initialize running aggregates from what is already on disk"""
+        aggregates = self.aggregates
+        for status, count, progress_sum, completed in self._conn.execute(_AGGREGATE_STATUS):
+            aggregates.total += count
+            aggregates.by_status[status] = count
+            aggregates.progress_sum += progress_sum
+            aggregates.completed += int(completed)
+        for bucket, count in self._conn.execute(_AGGREGATE_PROGRESS):
+            aggregates.progress_histogram[bucket] = count
+
+    def warm(self, limit: Optional[int] = None) -> int:
+        """
+        Preload the most recent live (progress < 100) workflows into the cache
+
+        Used on startup so a restarted process resumes without a cold cache.
+        Returns the number of workflows loaded.
+        """
+        limit = self.cache_size if limit is None else min(limit, self.cache_size)
+        loaded = 0
+        cursor = self._conn.execute(_SELECT_LIVE, (limit,))
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                break
+            for row in rows:
+                workflow_id, workflow = self._from_row(row)
+                self._cache[workflow_id] = workflow
+                loaded += 1
+        return loaded
+
+    # -- node leases --------------------------------------------------------
+
+    @property
+    def leased_node_id(self) -> Optional[int]:
+        return self.lease.node_id
+
+    def lease_node_id(self, node_id: Optional[int] = None) -> Optional[int]:
+        """
+        Lease a workflow ID node (the given one, or the lowest free one)
+
+        The lease is heartbeated in the background and released by close().
+        Raises NodeLeaseError if node_id is held by a live owner or every
+        node is taken.
+        """
+        return self.lease.acquire(node_id)
+
+    # -- WorkflowStore API -------------------------------------------------
+
+    def _load(self, workflow_id: str) -> Optional[WorkflowRecord]:
+        if workflow_id in self._deleted:
+            return None
+        workflow = self._cache.get(workflow_id)
+        if workflow is not None:
+            self._cache.move_to_end(workflow_id)
+            return workflow
+
+        row = self._conn.execute(_SELECT_ONE, (workflow_id,)).fetchone()
+        if row is None:
+            return None
+        _, workflow = self._from_row(row)
+        self._remember(workflow_id, workflow)
+        return workflow
+
+    def _save(self, workflow_id: str, workflow: WorkflowRecord) -> None:
+        self._deleted.discard(workflow_id)
+        self._dirty[workflow_id] = workflow
+        self._remember(workflow_id, workflow)
+        if len(self._dirty) >= self.batch_size:
+            self.flush()
+        else:
+            self._schedule_flush()
+
+    def _delete(self, workflow_id: str) -> None:
+        self._cache.pop(workflow_id, None)
+        self._dirty.pop(workflow_id, None)
+        self._deleted.add(workflow_id)
+        if len(self._deleted) >= self.batch_size:
+            self.flush()
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """Flush a partial batch flush_interval_seconds after its first write"""
+        if self._flush_timer is not None or not self.flush_interval_seconds:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Synchronous caller - batches, flush() and close() still apply
+        self._flush_timer = loop.call_later(self.flush_interval_seconds, self._timed_flush)
+
+    def _timed_flush(self) -> None:
+        self._flush_timer = None
+        if not self._closed:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._dirty and not self._deleted:
+            return
+        rows: List[Tuple[Any, ...]] = [self._to_row(wid, wf) for wid, wf in self._dirty.items()]
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(_DELETE, [(workflow_id,) for workflow_id in self._deleted])
+            self._conn.executemany(_UPSERT, rows)
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        self._dirty.clear()
+        self._deleted.clear()
+
+    def items(self) -> Iterator[Tuple[str, WorkflowRecord]]:
+        self.flush()
+        return self._iter_rows(self._conn.execute(_SELECT_ALL))
+
+    def activity(self) -> Iterator[Tuple[str, float, int]]:
+        self.flush()
+        # Columns only - no payload decoding
+        for workflow_id, progress, last_activity in self._conn.execute(_SELECT_ACTIVITY):
+            yield workflow_id, progress, round(last_activity * 1000)
+
+    def range_by_id(self, low: str, high: str) -> Iterator[Tuple[str, WorkflowRecord]]:
+        self.flush()
+        return self._iter_rows(self._conn.execute(_SELECT_RANGE, (low, high)))
+
+    def _iter_rows(self, cursor: sqlite3.Cursor) -> Iterator[Tuple[str, WorkflowRecord]]:
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for row in rows:
+                workflow_id = row[0]
+                cached = self._cache.get(workflow_id)
+                yield (workflow_id, cached) if cached is not None else self._from_row(row)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        self.lease.release()
+        self._conn.execute("PRAGMA optimize")
+        self._conn.close()
+        self._closed = True
+        atexit.unregister(self.close)
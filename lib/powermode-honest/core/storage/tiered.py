@@ -0,0 +1,352 @@
+"""
+Hot/cold tiered workflow store
+
+Wraps any WorkflowStore (the hot tier) and moves workflows that are done
+or idle into a ColdArchive:
+- Completed workflows are archived completed_after_seconds after their
+  last update, any workflow after idle_after_seconds without one
+- Every hot workflow has a due time (last activity plus the applicable
+  threshold) in a heap maintained by writes, so a sweep - started by a
+  write at most every sweep_interval_seconds - only touches the
+  workflows that are due. The hot tier is scanned once per process, for
+  activity columns only, to seed the heap
+- Under a running event loop the sweep is a background task: records are
+  encoded on the loop one block at a time, compression and fsyncs run in
+  a worker thread, and a workflow written meanwhile stays hot
+- Reads fall through to the cold tier and promote the workflow back to
+  the hot tier; a promoted workflow counts as fresh activity. Promotions
+  are made durable in batches by the same background task: one hot
+  flush, then one index fsync marking the archived copies dead. A crash
+  before that leaves the archived copy live, so nothing is lost
+- Aggregates cover both tiers, so system reports stay exact and O(1)
+"""
+
+import asyncio
+import heapq
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .base import WorkflowStore
+from .cold import ColdArchive
+from .record import WorkflowRecord, epoch_ms
+
+
+class TieredWorkflowStore(WorkflowStore):
+    """Hot store in front of a compressed append-only cold archive"""
+
+    def __init__(self, hot: WorkflowStore, cold: ColdArchive, completed_after_seconds: float = 3600,
+                 idle_after_seconds: float = 7 * 24 * 3600, sweep_interval_seconds: float = 60,
+                 on_archive: Optional[Callable[[List[str]], None]] = None):
+        super().__init__()
+        self.hot = hot
+        self.cold = cold
+        self.completed_after_ms = int(completed_after_seconds * 1000)
+        self.idle_after_ms = int(idle_after_seconds * 1000)
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.on_archive = on_archive
+
+        self.aggregates.merge(hot.aggregates)
+        self.aggregates.merge(cold.aggregates)
+
+        # (due_at, workflow_id) heap with stale entries skipped lazily; _due_at holds the current ones.
+        # Promotions and plan changes count as activity but do not touch last_updated
+        self._due: List[Tuple[int, str]] = []
+        self._due_at: Dict[str, int] = {}
+        self._seeded = False
+        self._next_sweep = time.monotonic() + sweep_interval_seconds
+        # Index entries of promotions not yet on disk, and the task that writes them and runs sweeps
+        self._unsynced: List[Dict[str, Any]] = []
+        self._maintenance: Optional[asyncio.Task] = None
+        self.maintenance_errors = 0
+        self.archived = 0
+        self.promoted = 0
+        self.sweeps = 0
+        self.last_sweep: Optional[Dict[str, Any]] = None
+
+    # -- WorkflowStore API -------------------------------------------------
+
+    def _load(self, workflow_id: str) -> Optional[WorkflowRecord]:
+        workflow = self.hot.get(workflow_id)
+        if workflow is None:
+            workflow = self._promote(workflow_id)
+        return workflow
+
+    def _save(self, workflow_id: str, workflow: WorkflowRecord) -> None:
+        self.hot.put(workflow_id, workflow)
+        self._track(workflow_id, workflow.progress, workflow.last_updated or workflow.created_at)
+        self._maybe_sweep()
+
+    def _delete(self, workflow_id: str) -> None:
+        # _load already promoted the workflow, so it is in the hot tier
+        self.hot.delete(workflow_id)
+        self._due_at.pop(workflow_id, None)
+
+    def update(self, workflow_id: str, expected_version: Optional[int] = None, **changes: Any) -> WorkflowRecord:
+        workflow = self._load(workflow_id)
+        if workflow is None:
+            raise KeyError(workflow_id)
+        self._check_version(workflow_id, workflow, expected_version)
+        # The hot store keeps its own aggregates (and bumps the version), so the change has to go through it
+        self.aggregates.remove_workflow(workflow)
+        workflow = self.hot.update(workflow_id, **changes)
+        self.aggregates.add_workflow(workflow)
+        self._notify_changed(workflow_id, workflow)
+        self._track(workflow_id, workflow.progress, epoch_ms())
+        self._maybe_sweep()
+        return workflow
+
+    def items(self) -> Iterator[Tuple[str, WorkflowRecord]]:
+        hot_ids = set()
+        for workflow_id, workflow in self.hot.items():
+            hot_ids.add(workflow_id)
+            yield workflow_id, workflow
+        for workflow_id, workflow in self.cold.items():
+            if workflow_id not in hot_ids:
+                yield workflow_id, workflow
+
+    def range_by_id(self, low: str, high: str) -> Iterator[Tuple[str, WorkflowRecord]]:
+        # Both tiers yield in ID order; on a duplicate ID the hot copy (tier 0) wins
+        merged = heapq.merge(
+            ((workflow_id, 0, workflow) for workflow_id, workflow in self.hot.range_by_id(low, high)),
+            ((workflow_id, 1, workflow) for workflow_id, workflow in self.cold.range_by_id(low, high)),
+            key=lambda item: (item[0], item[1])
+        )
+        previous = None
+        for workflow_id, _, workflow in merged:
+            if workflow_id != previous:
+                previous = workflow_id
+                yield workflow_id, workflow
+
+    def lease_node_id(self, node_id: Optional[int] = None) -> Optional[int]:
+        return self.hot.lease_node_id(node_id)
+
+    def flush(self) -> None:
+        self._sync_promotions()
+
+    def close(self) -> None:
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+        self._sync_promotions()
+        self.hot.close()
+        self.cold.close()
+
+    # -- tiering -----------------------------------------------------------
+
+    def _promote(self, workflow_id: str) -> Optional[WorkflowRecord]:
+        workflow = self.cold.get(workflow_id)
+        if workflow is None:
+            return None
+        # Total aggregates are unchanged - the workflow only changes tier.
+        # The archived copy is marked dead on disk only after the hot copy is committed
+        # (see _sync_promotions)
+        self.hot.put(workflow_id, workflow)
+        self._unsynced.append(self.cold.mark_promoted(workflow_id, workflow.status, workflow.progress))
+        self._track(workflow_id, workflow.progress, epoch_ms())
+        self.promoted += 1
+        if not self._schedule_maintenance():
+            self._sync_promotions()
+        return workflow
+
+    def _take_promotions(self) -> List[Dict[str, Any]]:
+        # A crash after this flush but before the index write leaves two copies (reads prefer the
+        # hot one, check_consistency repairs the counts), never none
+        entries, self._unsynced = self._unsynced, []
+        if entries:
+            self.hot.flush()
+        return entries
+
+    def _sync_promotions(self) -> None:
+        self.cold.write_entries(self._take_promotions())
+
+    async def _sync_promotions_async(self) -> None:
+        entries = self._take_promotions()
+        try:
+            await asyncio.to_thread(self.cold.write_entries, entries)
+        except BaseException:
+            self._unsynced[:0] = entries
+            raise
+
+    def _schedule_maintenance(self) -> bool:
+        """Start the background task for promotions and sweeps; False without a running event loop"""
+        if self._maintenance is not None:
+            return True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        self._maintenance = loop.create_task(self._maintain())
+        return True
+
+    async def _maintain(self) -> None:
+        swept = False
+        try:
+            while True:
+                if self._unsynced:
+                    await self._sync_promotions_async()
+                elif not swept and time.monotonic() >= self._next_sweep:
+                    swept = True
+                    await self.sweep_async()
+                else:
+                    break
+        except Exception as e:
+            # Unsynced promotions are retried by the next run; a failed sweep's workflows are rescheduled
+            self.maintenance_errors += 1
+            self.last_sweep = {'error': str(e)}
+        finally:
+            self._maintenance = None
+
+    def _track(self, workflow_id: str, progress: float, last_activity: int) -> None:
+        """(Re)schedule a hot workflow for archiving, counting from last_activity"""
+        threshold = self.idle_after_ms
+        if progress >= 100:
+            threshold = min(threshold, self.completed_after_ms)
+        due_at = last_activity + threshold
+        if self._due_at.get(workflow_id) == due_at:
+            return
+        self._due_at[workflow_id] = due_at
+        heapq.heappush(self._due, (due_at, workflow_id))
+        if len(self._due) > 2 * len(self._due_at) + 1024:
+            # Mostly superseded entries - rebuild from the current due times
+            self._due = [(due, wid) for wid, due in self._due_at.items()]
+            heapq.heapify(self._due)
+
+    def _seed(self) -> None:
+        """Schedule hot workflows from before this process (workflows tracked since keep their entry)"""
+        for workflow_id, progress, last_activity in self.hot.activity():
+            if workflow_id not in self._due_at:
+                self._track(workflow_id, progress, last_activity)
+        self._seeded = True
+
+    def _maybe_sweep(self) -> None:
+        if time.monotonic() >= self._next_sweep and not self._schedule_maintenance():
+            self.sweep()
+
+    def _collect_due(self, now: Optional[int]) -> List[Tuple[str, WorkflowRecord, int]]:
+        """Pop every workflow due at now (epoch ms), sorted by ID, with its due time"""
+        self._next_sweep = time.monotonic() + self.sweep_interval_seconds
+        now = epoch_ms() if now is None else now
+        if not self._seeded:
+            self._seed()
+        due = []
+        while self._due and self._due[0][0] <= now:
+            due_at, workflow_id = heapq.heappop(self._due)
+            if self._due_at.get(workflow_id) != due_at:
+                continue  # Superseded by a later write
+            del self._due_at[workflow_id]
+            workflow = self.hot.get(workflow_id)
+            if workflow is not None:
+                due.append((workflow_id, workflow, due_at))
+        due.sort(key=lambda item: item[0])
+        return due
+
+    def sweep(self, now: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Move every due workflow from the hot tier to the cold tier, blocking until done
+
+        now is epoch milliseconds (defaults to the current time). Returns
+        the number archived and the resulting tier sizes.
+        """
+        started = time.perf_counter()
+        due = self._collect_due(now)
+        self._sync_promotions()
+        archived, entries = [], []
+        for start in range(0, len(due), self.cold.block_size):
+            chunk = due[start:start + self.cold.block_size]
+            entries.append(self.cold.write_block(self.cold.encode_block([(wid, wf) for wid, wf, _ in chunk])))
+            archived.extend(self._snapshot(chunk))
+        stale = self._finish_sweep(archived, entries)
+        self.cold.write_entries(stale)
+        return self._sweep_result(started, len(archived) - len(stale))
+
+    async def sweep_async(self, now: Optional[int] = None) -> Dict[str, Any]:
+        """
+        sweep() that keeps the event loop responsive
+
+        Only JSON encoding (one block at a time) and the hot-tier updates run
+        on the loop; compression and fsyncs run in a worker thread.
+        """
+        started = time.perf_counter()
+        due = self._collect_due(now)
+        archived, entries = [], []
+        try:
+            if self._unsynced:
+                # Archived copies must be marked dead on disk before any block can revive them
+                await self._sync_promotions_async()
+            for start in range(0, len(due), self.cold.block_size):
+                chunk = due[start:start + self.cold.block_size]
+                block = self.cold.encode_block([(wid, wf) for wid, wf, _ in chunk])
+                snapshot = self._snapshot(chunk)
+                entries.append(await asyncio.to_thread(self.cold.write_block, block))
+                archived.extend(snapshot)
+        except BaseException:
+            # Reschedule what was not written; written blocks are still committed below
+            for workflow_id, _, due_at in due[len(archived):]:
+                if workflow_id not in self._due_at:
+                    self._due_at[workflow_id] = due_at
+                    heapq.heappush(self._due, (due_at, workflow_id))
+            self.cold.write_entries(self._finish_sweep(archived, entries))
+            raise
+        stale = self._finish_sweep(archived, entries)
+        if stale:
+            await asyncio.to_thread(self.cold.write_entries, stale)
+        return self._sweep_result(started, len(archived) - len(stale))
+
+    @staticmethod
+    def _snapshot(chunk: List[Tuple[str, WorkflowRecord, int]]) -> List[Tuple[str, int, str, float]]:
+        return [(workflow_id, workflow.version, workflow.status, workflow.progress)
+                for workflow_id, workflow, _ in chunk]
+
+    def _finish_sweep(self, archived: List[Tuple[str, int, str, float]],
+                      entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Publish written blocks and drop their workflows from the hot tier
+
+        A workflow written or deleted since its block was encoded stays as
+        it is; its archived copy is stale. Returns the index entries that
+        mark those copies dead - write them after this returns.
+        """
+        for entry in entries:
+            self.cold.add_block(entry)
+        moved, stale = [], []
+        for workflow_id, version, status, progress in archived:
+            current = self.hot.get(workflow_id)
+            if current is not None and current.version == version:
+                self.hot.delete(workflow_id)
+                moved.append(workflow_id)
+            else:
+                stale.append(self.cold.mark_promoted(workflow_id, status, progress))
+        if archived:
+            self.hot.flush()
+        if moved and self.on_archive is not None:
+            self.on_archive(moved)
+        self.archived += len(moved)
+        return stale
+
+    def _sweep_result(self, started: float, archived: int) -> Dict[str, Any]:
+        self.sweeps += 1
+        self.last_sweep = {
+            'archived': archived,
+            'hot_workflows': len(self.hot),
+            'cold_workflows': len(self.cold),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        }
+        return self.last_sweep
+
+    def tier_stats(self) -> Dict[str, Any]:
+        """Tier sizes, eviction policy and tiering counters for the metrics summary"""
+        return {
+            'policy': {
+                'completed_after_seconds': self.completed_after_ms / 1000,
+                'idle_after_seconds': self.idle_after_ms / 1000,
+                'sweep_interval_seconds': self.sweep_interval_seconds,
+                'promote_on_access': True,
+            },
+            'hot': {'workflows': len(self.hot), 'scheduled': len(self._due_at)},
+            'cold': self.cold.stats(),
+            'archived_total': self.archived,
+            'promoted_total': self.promoted,
+            'sweeps': self.sweeps,
+            'last_sweep': self.last_sweep,
+            'unsynced_promotions': len(self._unsynced),
+            'maintenance_errors': self.maintenance_errors,
+        }
@@ -0,0 +1,301 @@
+"""
+Workflow template registry
+
+Classifies task descriptions into a workflow_type using the keyword lists
+of the configured templates (templates/*.json).
+
+- Every template is read and validated once; its keywords are compiled
+  into a single token trie shared by all templates, so classifying costs
+  O(description tokens x longest keyword phrase) however many templates
+  are loaded
+- Template files are re-checked for mtime changes at most every
+  check_interval_seconds; a change rebuilds the matcher off to the side
+  and swaps it in with one assignment, so classify() never sees a
+  half-built state
+- classify_async() does those checks and reloads in a worker thread and
+  keeps classifying with the current matcher meanwhile, so no stat() or
+  file read runs on the event loop once the first load is done
+- A file that disappears or fails validation on reload keeps its last
+  good version instead of dropping out
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+
+_TOKEN = re.compile(r"\w+")
+
+
+class TemplateError(ValueError):
+    """A template file that cannot be used"""
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens - the same rule for keywords and descriptions"""
+    return _TOKEN.findall(text.lower())
+
+
+class WorkflowTemplate:
+    """One validated template: its workflow_type, phases and weighted keyword phrases"""
+
+    __slots__ = ('workflow_type', 'description', 'phases', 'keywords', 'priority', 'path', 'mtime')
+
+    def __init__(self, workflow_type: str, description: str, phases: Tuple[str, ...],
+                 keywords: Dict[Tuple[str, ...], float], priority: int, path: str, mtime: float):
+        self.workflow_type = workflow_type
+        self.description = description
+        self.phases = phases
+        self.keywords = keywords
+        self.priority = priority
+        self.path = path
+        self.mtime = mtime
+
+    @classmethod
+    def load(cls, path: str, expected_type: Optional[str] = None) -> 'WorkflowTemplate':
+        """Read and validate a template file (raises TemplateError)"""
+        try:
+            mtime = os.stat(path).st_mtime
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise TemplateError(f"{path}: {e}") from e
+        return cls.from_dict(data, path, mtime, expected_type)
+
+    @classmethod
+    def from_dict(cls, data: Any, path: str = '<dict>', mtime: float = 0.0,
+                  expected_type: Optional[str] = None) -> 'WorkflowTemplate':
+        if not isinstance(data, dict):
+            raise TemplateError(f"{path}: template must be a JSON object")
+
+        workflow_type = data.get('workflow_type', expected_type)
+        if not isinstance(workflow_type, str) or not workflow_type:
+            raise TemplateError(f"{path}: 'workflow_type' must be a non-empty string")
+        if expected_type is not None and workflow_type != expected_type:
+            raise TemplateError(f"{path}: workflow_type {workflow_type!r} does not match {expected_type!r}")
+
+        # Keywords are a list of phrases (weight 1) or a {phrase: weight} object
+        raw_keywords = data.get('keywords')
+        if isinstance(raw_keywords, list):
+            raw_keywords = {phrase: 1 for phrase in raw_keywords}
+        if not isinstance(raw_keywords, dict) or not raw_keywords:
+            raise TemplateError(f"{path}: 'keywords' must be a non-empty list or object")
+        keywords: Dict[Tuple[str, ...], float] = {}
+        for phrase, weight in raw_keywords.items():
+            tokens = tuple(tokenize(phrase)) if isinstance(phrase, str) else ()
+            if not tokens:
+                raise TemplateError(f"{path}: keyword {phrase!r} has no words")
+            if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight <= 0:
+                raise TemplateError(f"{path}: keyword {phrase!r} needs a positive weight")
+            keywords[tokens] = float(weight)
+
+        phases = data.get('phases', [])
+        if not isinstance(phases, list) or not all(isinstance(phase, str) for phase in phases):
+            raise TemplateError(f"{path}: 'phases' must be a list of strings")
+        priority = data.get('priority', 0)
+        if isinstance(priority, bool) or not isinstance(priority, int):
+            raise TemplateError(f"{path}: 'priority' must be an integer")
+
+        return cls(workflow_type, str(data.get('description', '')), tuple(phases), keywords, priority, path, mtime)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'workflow_type': self.workflow_type,
+            'description': self.description,
+            'phases': list(self.phases),
+            'keywords': {' '.join(tokens): weight for tokens, weight in self.keywords.items()},
+            'priority': self.priority,
+        }
+
+
+class _TrieNode:
+    __slots__ = ('children', 'hits')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.hits: List[Tuple[int, float]] = []  # (template index, weight) of phrases ending here
+
+
+class CompiledTemplates:
+    """Immutable matcher over a fixed set of templates"""
+
+    def __init__(self, templates: List[WorkflowTemplate]):
+        # Higher priority wins ties, then the order templates were configured in
+        self.templates = templates
+        self._rank = {
+            index: (template.priority, -index) for index, template in enumerate(templates)
+        }
+        self._root = _TrieNode()
+        self.max_phrase = 0
+        self.phrase_count = 0
+        for index, template in enumerate(templates):
+            for tokens, weight in template.keywords.items():
+                node = self._root
+                for token in tokens:
+                    node = node.children.setdefault(token, _TrieNode())
+                node.hits.append((index, weight))
+                self.max_phrase = max(self.max_phrase, len(tokens))
+                self.phrase_count += 1
+
+    def scores(self, description: str) -> Dict[int, float]:
+        """Summed keyword weights per template index (templates without hits are absent)"""
+        tokens = tokenize(description)
+        root = self._root.children
+        totals: Dict[int, float] = {}
+        for start in range(len(tokens)):
+            node = root.get(tokens[start])
+            position = start + 1
+            while node is not None:
+                for index, weight in node.hits:
+                    totals[index] = totals.get(index, 0.0) + weight
+                if position == len(tokens) or not node.children:
+                    break
+                node = node.children.get(tokens[position])
+                position += 1
+        return totals
+
+    def best(self, description: str) -> Optional[WorkflowTemplate]:
+        totals = self.scores(description)
+        if not totals:
+            return None
+        index = max(totals, key=lambda i: (totals[i], self._rank[i]))
+        return self.templates[index]
+
+
+class TemplateRegistry:
+    """
+    Loads the configured templates once and classifies descriptions
+
+    paths maps workflow_type to a JSON file; relative paths are resolved
+    against base_dir. Nothing is read until the first classify() call.
+    """
+
+    def __init__(self, paths: Mapping[str, str], base_dir: str = '.',
+                 check_interval_seconds: float = 2.0, default_type: Optional[str] = None):
+        self.paths = {
+            workflow_type: path if os.path.isabs(path) else os.path.join(base_dir, path)
+            for workflow_type, path in paths.items()
+        }
+        self.check_interval_seconds = check_interval_seconds
+        self.default_type = default_type
+        self.logger = logging.getLogger('PowerModeHonest.templates')
+
+        self._compiled: Optional[CompiledTemplates] = None
+        self._loaded: Dict[str, WorkflowTemplate] = {}
+        self._mtimes: Dict[str, Optional[float]] = {}
+        self._next_check = 0.0
+        self._reload_lock = threading.Lock()
+        self._refreshing: Optional[asyncio.Future] = None  # Reload running in a worker thread
+
+        self.reloads = 0
+        self.load_errors = 0
+        self.classified = 0
+        self.unmatched = 0
+
+    def classify(self, description: str) -> Optional[str]:
+        """workflow_type of the best-matching template, or default_type if none match"""
+        return self._classify(self._current(), description)
+
+    async def classify_async(self, description: str) -> Optional[str]:
+        """classify() for the event loop: file checks and reloads run in a worker thread"""
+        compiled = self._compiled
+        if compiled is None or time.monotonic() >= self._next_check:
+            refreshing = self._refresh()
+            if compiled is None:
+                # Nothing to classify with before the first load
+                compiled = await asyncio.shield(refreshing)
+        return self._classify(compiled, description)
+
+    def _refresh(self) -> asyncio.Future:
+        """The running background reload, started if there is none on this loop"""
+        refreshing = self._refreshing
+        if refreshing is None or refreshing.get_loop() is not asyncio.get_running_loop():
+            refreshing = self._refreshing = asyncio.ensure_future(asyncio.to_thread(self.reload))
+            refreshing.add_done_callback(self._refreshed)
+        return refreshing
+
+    def _refreshed(self, refreshing: asyncio.Future) -> None:
+        if self._refreshing is refreshing:
+            self._refreshing = None
+        if not refreshing.cancelled() and refreshing.exception() is not None:
+            self.logger.error(f"Reloading workflow templates failed: {refreshing.exception()}")
+
+    def _classify(self, compiled: CompiledTemplates, description: str) -> Optional[str]:
+        template = compiled.best(description)
+        self.classified += 1
+        if template is None:
+            self.unmatched += 1
+            return self.default_type
+        return template.workflow_type
+
+    def scores(self, description: str) -> Dict[str, float]:
+        """Keyword score per matching workflow_type (for diagnostics)"""
+        compiled = self._current()
+        return {
+            compiled.templates[index].workflow_type: score
+            for index, score in compiled.scores(description).items()
+        }
+
+    def get(self, workflow_type: str) -> Optional[WorkflowTemplate]:
+        self._current()
+        return self._loaded.get(workflow_type)
+
+    def _current(self) -> CompiledTemplates:
+        compiled = self._compiled
+        if compiled is None or time.monotonic() >= self._next_check:
+            compiled = self.reload()
+        return compiled
+
+    def reload(self, force: bool = False) -> CompiledTemplates:
+        """
+        Re-read templates whose file changed (all of them with force=True)
+
+        Cheap when nothing changed: one stat() per template file.
+        """
+        with self._reload_lock:
+            self._next_check = time.monotonic() + self.check_interval_seconds
+            changed = False
+            for workflow_type, path in self.paths.items():
+                try:
+                    mtime: Optional[float] = os.stat(path).st_mtime
+                except OSError:
+                    mtime = None
+                if not force and self._compiled is not None and mtime == self._mtimes.get(path):
+                    continue
+                self._mtimes[path] = mtime
+                if mtime is None:
+                    if workflow_type not in self._loaded:
+                        self.load_errors += 1
+                        self.logger.warning(f"Workflow template missing: {path}")
+                    continue
+                try:
+                    self._loaded[workflow_type] = WorkflowTemplate.load(path, workflow_type)
+                    changed = True
+                except TemplateError as e:
+                    self.load_errors += 1
+                    self.logger.error(f"Invalid workflow template, keeping previous version: {e}")
+
+            if changed or self._compiled is None:
+                templates = [self._loaded[t] for t in self.paths if t in self._loaded]
+                compiled = CompiledTemplates(templates)
+                if self._compiled is not None:
+                    self.reloads += 1
+                    self.logger.info(f"Reloaded {len(templates)} workflow templates")
+                self._compiled = compiled
+            return self._compiled
+
+    def stats(self) -> Dict[str, Any]:
+        compiled = self._compiled
+        return {
+            'templates': len(compiled.templates) if compiled else 0,
+            'keyword_phrases': compiled.phrase_count if compiled else 0,
+            'reloads': self.reloads,
+            'load_errors': self.load_errors,
+            'classified': self.classified,
+            'unmatched': self.unmatched,
+        }
@@ -0,0 +1,19 @@
+"""
+Minimal asyncio HTTP/1.1 server used for local endpoints (metrics, API, event stream)
+
+Standard library only - no outside services or frameworks needed.
+"""
+
+from .api import PROMETHEUS_CONTENT_TYPE, ApiServer
+from .http import HttpRequest, HttpResponse, start_http_server
+from .sse import serve_change_stream, stream_events
+
+__all__ = [
+    'ApiServer',
+    'PROMETHEUS_CONTENT_TYPE',
+    'HttpRequest',
+    'HttpResponse',
+    'start_http_server',
+    'serve_change_stream',
+    'stream_events',
+]
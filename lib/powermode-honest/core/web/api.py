@@ -0,0 +1,296 @@
+"""
+JSON HTTP API for the Power Mode engine
+
+Runs on the same event loop as the engine:
+- POST /organize, /manage-tasks, /track-progress and /batch
+- GET /report (optional ?workflow_id= or ?include_distributions=true), /metrics, /events (SSE) and /health
+- Admission control: at most max_pending requests are queued or running,
+  max_concurrency of them run at once; anything beyond gets 429 with
+  Retry-After instead of an ever-growing backlog
+- drain() stops accepting connections, answers new requests with 503,
+  waits for in-flight requests (cancelling any still running after
+  drain_timeout_seconds) and then closes idle keep-alive connections
+"""
+
+import asyncio
+import signal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .http import HttpError, HttpRequest, HttpResponse, start_http_server
+
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+OPERATIONS = ('organize', 'manage_tasks', 'track_progress', 'report')
+
+Endpoint = Callable[[HttpRequest], Awaitable[HttpResponse]]
+
+
+class ApiServer:
+    """
+    HTTP front end for a PowerModeHonest instance
+
+    The engine is used through its public coroutines (organize_workflow,
+    manage_tasks, ...) plus prometheus_metrics() and stream_changes().
+    """
+
+    def __init__(self, engine: Any, max_pending: int = 256, max_concurrency: int = 64,
+                 max_batch: int = 1000, drain_timeout_seconds: float = 30.0):
+        self.engine = engine
+        self.max_pending = max_pending
+        self.max_concurrency = max_concurrency
+        self.max_batch = max_batch
+        self.drain_timeout_seconds = drain_timeout_seconds
+
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self._in_flight: Set[asyncio.Task] = set()  # Connection tasks running an endpoint
+        self._stopping = asyncio.Event()
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.port: Optional[int] = None
+        self.draining = False
+        self.served = 0
+        self.rejected = 0
+
+        self._routes: Dict[str, Tuple[Tuple[str, ...], Endpoint]] = {
+            '/organize': (('POST',), self._organize),
+            '/manage-tasks': (('POST',), self._manage_tasks),
+            '/track-progress': (('POST',), self._track_progress),
+            '/report': (('GET', 'POST'), self._report),
+            '/batch': (('POST',), self._batch),
+        }
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765) -> int:
+        """Start listening; returns the bound port"""
+        self.server, self.port = await start_http_server(self.handle, host, port, self._connections)
+        return self.port
+
+    async def serve_forever(self, host: str = '127.0.0.1', port: int = 8765) -> None:
+        """Serve until SIGTERM/SIGINT (or stop()), then drain gracefully (starts if needed)"""
+        if self.server is None:
+            await self.start(host, port)
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # No signal support on this platform/thread - stop() still works
+                pass
+        try:
+            await self._stopping.wait()
+        finally:
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                try:
+                    loop.remove_signal_handler(signum)
+                except (NotImplementedError, RuntimeError):
+                    pass
+            await self.drain()
+
+    def stop(self) -> None:
+        """Ask serve_forever() to drain and return"""
+        self._stopping.set()
+
+    async def drain(self) -> bool:
+        """
+        Stop accepting work and wait for in-flight requests
+
+        Returns False if drain_timeout_seconds passed with requests still
+        running; those are cancelled and awaited, so none outlives drain().
+        """
+        self.draining = True
+        if self.server is not None:
+            self.server.close()
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.drain_timeout_seconds)
+            drained = True
+        except asyncio.TimeoutError:
+            drained = False
+            stragglers = list(self._in_flight)
+            for task in stragglers:
+                task.cancel()
+            await asyncio.gather(*stragglers, return_exceptions=True)
+        # Ends Server-Sent Event streams; idle keep-alive connections are closed directly
+        self.engine.change_feed.close()
+        for writer in list(self._connections):
+            writer.close()
+        return drained
+
+    # -- request handling --------------------------------------------------
+
+    async def handle(self, request: HttpRequest, writer: asyncio.StreamWriter) -> Optional[HttpResponse]:
+        if self.draining:
+            return self._error('Server is shutting down', 503, {'Connection': 'close'})
+
+        if request.path == '/health':
+            return HttpResponse.json({'status': 'ok', 'pending': self._pending, 'honest_assessment': True})
+        if request.path == '/metrics':
+            return HttpResponse(200, self.engine.prometheus_metrics().encode(), PROMETHEUS_CONTENT_TYPE)
+        if request.path == '/events':
+            # Long-lived stream - not counted against the request queue
+            return await self.engine.stream_changes(request, writer)
+
+        route = self._routes.get(request.path)
+        if route is None:
+            return self._error('Not found', 404)
+        methods, endpoint = route
+        if request.method not in methods:
+            return self._error('Method not allowed', 405, {'Allow': ', '.join(methods)})
+
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            return self._error('Too many pending requests', 429, {'Retry-After': '1'})
+
+        self._pending += 1
+        self._idle.clear()
+        task = asyncio.current_task()
+        self._in_flight.add(task)
+        try:
+            async with self._slots:
+                response = await endpoint(request)
+            self.served += 1
+            return response
+        except HttpError as e:
+            return self._error(str(e), e.status)
+        finally:
+            self._in_flight.discard(task)
+            self._pending -= 1
+            if not self._pending:
+                self._idle.set()
+
+    @staticmethod
+    def _error(message: str, status: int, headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+        response = HttpResponse.json({'error': message, 'honest_assessment': True}, status)
+        if headers:
+            response.headers.update(headers)
+        return response
+
+    @staticmethod
+    def _body(request: HttpRequest) -> Dict[str, Any]:
+        try:
+            body = request.json()
+        except ValueError:
+            raise HttpError(400, 'Request body is not valid JSON')
+        if body is None:
+            return {}
+        if not isinstance(body, dict):
+            raise HttpError(400, 'Request body must be a JSON object')
+        return body
+
+    @staticmethod
+    def _task_ids(params: Dict[str, Any], field: str) -> List[str]:
+        """params[field] (default []) if it is a list of task ID strings, else HttpError"""
+        task_ids = params.get(field, [])
+        if not isinstance(task_ids, list) or not all(isinstance(task_id, str) for task_id in task_ids):
+            raise HttpError(400, f"'{field}' must be a list of task ID strings")
+        return task_ids
+
+    @staticmethod
+    def _respond(result: Dict[str, Any]) -> HttpResponse:
+        if 'error' not in result:
+            return HttpResponse.json(result)
+        return HttpResponse.json(result, 404 if result['error'] == 'Workflow not found' else 422)
+
+    # -- operations --------------------------------------------------------
+
+    async def _run(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one operation with parameters from a request body or batch entry"""
+        try:
+            if operation == 'organize':
+                return await self.engine.organize_workflow(params['description'], params.get('context'))
+            if operation == 'manage_tasks':
+                return await self.engine.manage_tasks(params['workflow_id'])
+            if operation == 'track_progress':
+                # Either the full completed set, or deltas via 'complete' / 'reopen' applied as one update
+                workflow_id = params['workflow_id']
+                if 'complete' not in params and 'reopen' not in params:
+                    return await self.engine.track_progress(workflow_id, self._task_ids(params, 'completed_tasks'))
+                complete, reopen = self._task_ids(params, 'complete'), self._task_ids(params, 'reopen')
+                return await self.engine.update_progress(workflow_id, complete, reopen)
+            if operation == 'report':
+                # From a query string the flag arrives as text
+                include_distributions = params.get('include_distributions') in (True, 'true', '1')
+                return await self.engine.generate_report(params.get('workflow_id'), include_distributions)
+        except KeyError as e:
+            raise HttpError(400, f"Missing field: {e.args[0]}")
+        raise HttpError(400, f"Unknown operation: {operation} (expected one of {OPERATIONS})")
+
+    async def _organize(self, request: HttpRequest) -> HttpResponse:
+        return self._respond(await self._run('organize', self._body(request)))
+
+    async def _manage_tasks(self, request: HttpRequest) -> HttpResponse:
+        return self._respond(await self._run('manage_tasks', self._body(request)))
+
+    async def _track_progress(self, request: HttpRequest) -> HttpResponse:
+        return self._respond(await self._run('track_progress', self._body(request)))
+
+    async def _report(self, request: HttpRequest) -> HttpResponse:
+        params = self._body(request) if request.method == 'POST' else request.query
+        return self._respond(await self._run('report', params))
+
+    async def _batch(self, request: HttpRequest) -> HttpResponse:
+        """
+        Run {"operations": [{"op": ..., ...}, ...]} in order
+
+        Consecutive organize operations are organized together with bounded
+        concurrency; every other operation runs after the ones before it.
+        Failures are reported per operation.
+        """
+        operations = self._body(request).get('operations')
+        if not isinstance(operations, list):
+            raise HttpError(400, "Body must contain an 'operations' list")
+        if len(operations) > self.max_batch:
+            raise HttpError(413, f"At most {self.max_batch} operations per batch")
+
+        results: List[Dict[str, Any]] = []
+        position = 0
+        while position < len(operations):
+            run_end = position
+            while run_end < len(operations) and self._is_organize(operations[run_end]):
+                run_end += 1
+            if run_end > position + 1:
+                results.extend(await self._organize_run(operations[position:run_end]))
+                position = run_end
+                continue
+            results.append(await self._batch_operation(operations[position]))
+            position += 1
+
+        failed = sum(1 for result in results if 'error' in result)
+        return HttpResponse.json({
+            'results': results,
+            'count': len(results),
+            'failed': failed,
+            'honest_assessment': True
+        })
+
+    @staticmethod
+    def _is_organize(operation: Any) -> bool:
+        return isinstance(operation, dict) and operation.get('op') == 'organize' and 'description' in operation
+
+    async def _organize_run(self, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        items = [(operation['description'], operation.get('context')) for operation in operations]
+        results = await self.engine.organize_workflows(items, max_concurrency=self.max_concurrency)
+        for result in results:
+            result.pop('index', None)
+        return results
+
+    async def _batch_operation(self, operation: Any) -> Dict[str, Any]:
+        if not isinstance(operation, dict):
+            return {'error': 'Operation must be a JSON object', 'honest_assessment': True}
+        try:
+            return await self._run(operation.get('op', ''), operation)
+        except HttpError as e:
+            return {'error': str(e), 'honest_assessment': True}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pending': self._pending,
+            'served': self.served,
+            'rejected': self.rejected,
+            'connections': len(self._connections),
+            'draining': self.draining,
+        }
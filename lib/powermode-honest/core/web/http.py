@@ -0,0 +1,184 @@
+"""
+HTTP/1.1 on asyncio streams
+
+Deliberately small: request line + headers + Content-Length bodies,
+keep-alive by default (HTTP/1.1), no chunked request bodies. Requests on
+one connection are answered in order.
+"""
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+REASONS = {
+    200: 'OK', 202: 'Accepted', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 413: 'Payload Too Large', 429: 'Too Many Requests',
+    500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+
+class HttpRequest:
+    """Parsed request"""
+
+    __slots__ = ('method', 'path', 'query', 'version', 'headers', 'body')
+
+    def __init__(self, method: str, target: str, version: str, headers: Dict[str, str], body: bytes):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def json(self) -> Any:
+        return json.loads(self.body or b'null')
+
+
+class HttpResponse:
+    """Response with a fully buffered body"""
+
+    __slots__ = ('status', 'headers', 'body')
+
+    def __init__(self, status: int = 200, body: bytes = b'', content_type: str = 'text/plain; charset=utf-8',
+                 headers: Optional[Dict[str, str]] = None):
+        self.status = status
+        self.body = body
+        self.headers = {'Content-Type': content_type}
+        if headers:
+            self.headers.update(headers)
+
+    @classmethod
+    def json(cls, payload: Any, status: int = 200) -> 'HttpResponse':
+        body = json.dumps(payload, separators=(',', ':'), default=str).encode()
+        return cls(status, body, 'application/json')
+
+    def encode(self, keep_alive: bool) -> bytes:
+        head = [f"HTTP/1.1 {self.status} {REASONS.get(self.status, 'Unknown')}"]
+        headers = dict(self.headers)
+        headers['Content-Length'] = str(len(self.body))
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        head.extend(f"{name}: {value}" for name, value in headers.items())
+        return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + self.body
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+Handler = Callable[[HttpRequest, asyncio.StreamWriter], Awaitable[Optional[HttpResponse]]]
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[HttpRequest]:
+    """Read one request; None on a clean EOF between requests"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise HttpError(400, 'Incomplete request head')
+    except asyncio.LimitOverrunError:
+        raise HttpError(413, 'Request head too large')
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ', 2)
+    except ValueError:
+        raise HttpError(400, 'Malformed request line')
+
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HttpError(400, 'Chunked request bodies are not supported')
+    length = _content_length(headers.get('content-length', ''))
+    body = await reader.readexactly(length) if length else b''
+    return HttpRequest(method.upper(), target, version, headers, body)
+
+
+def _content_length(value: str) -> int:
+    """Content-Length as a non-negative int within MAX_BODY_BYTES, else HttpError"""
+    value = value.strip()
+    if not value:
+        return 0
+    # int() alone would accept '-1', '+1', ' 1' and '1_000'
+    if not (value.isascii() and value.isdigit()):
+        raise HttpError(400, 'Invalid Content-Length')
+    length = int(value)
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, 'Request body too large')
+    return length
+
+
+async def serve_connection(handler: Handler, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                           connections: Optional[Set[asyncio.StreamWriter]] = None) -> None:
+    """
+    Answer requests on one connection until it closes (keep-alive aware)
+
+    Pipelined requests are read one at a time and answered in order. A
+    response with a 'Connection: close' header ends the connection.
+    """
+    if connections is not None:
+        connections.add(writer)
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except HttpError as e:
+                writer.write(HttpResponse.json({'error': str(e)}, e.status).encode(keep_alive=False))
+                break
+            if request is None:
+                break
+
+            try:
+                response = await handler(request, writer)
+            except Exception as e:
+                response = HttpResponse.json({'error': str(e)}, 500)
+            if response is None:
+                # Handler took over the stream (e.g. Server-Sent Events)
+                break
+            keep_alive = request.keep_alive and response.headers.get('Connection') != 'close'
+            writer.write(response.encode(keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        if connections is not None:
+            connections.discard(writer)
+        writer.close()
+
+
+async def start_http_server(handler: Handler, host: str = '127.0.0.1', port: int = 0,
+                            connections: Optional[Set[asyncio.StreamWriter]] = None) -> Tuple[asyncio.AbstractServer, int]:
+    """
+    Start serving; returns the server and the bound port (port=0 picks a free one)
+
+    If connections is given, open connections are kept in it so the caller
+    can close idle keep-alive connections on shutdown.
+    """
+    server = await asyncio.start_server(
+        lambda reader, writer: serve_connection(handler, reader, writer, connections),
+        host, port, limit=MAX_HEADER_BYTES
+    )
+    bound_port = server.sockets[0].getsockname()[1]
+    return server, bound_port
@@ -0,0 +1,69 @@
+"""
+Server-Sent Events
+
+Streams a change-feed subscription over an HTTP response that stays open.
+A comment line is sent when nothing happened for heartbeat_seconds, so
+dead connections are noticed and proxies keep the stream open.
+"""
+
+import asyncio
+from typing import Any, Callable, Optional
+
+from .http import HttpRequest, HttpResponse
+
+
+SSE_HEADERS = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: text/event-stream\r\n"
+    b"Cache-Control: no-cache\r\n"
+    b"Connection: keep-alive\r\n"
+    b"X-Accel-Buffering: no\r\n"
+    b"\r\n"
+)
+
+
+async def stream_events(writer: asyncio.StreamWriter, subscription: Any, heartbeat_seconds: float = 15.0) -> None:
+    """
+    Write events from subscription until it closes or the client goes away
+
+    subscription is a core.feed.Subscription (anything with get(timeout),
+    closed and close() works); it is closed on return.
+    """
+    try:
+        writer.write(SSE_HEADERS)
+        await writer.drain()
+        while True:
+            event = await subscription.get(timeout=heartbeat_seconds)
+            if event is None:
+                if subscription.closed:
+                    break
+                writer.write(b": heartbeat\n\n")
+            else:
+                writer.write(f"id: {event.seq}\nevent: {event.type}\ndata: {event.to_json()}\n\n".encode())
+            # Only this consumer waits here - publishers never see a slow socket
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        subscription.close()
+
+
+async def serve_change_stream(request: HttpRequest, writer: asyncio.StreamWriter,
+                              subscribe: Callable[..., Any]) -> Optional[HttpResponse]:
+    """
+    GET /events for anything with a subscribe_changes()-style subscribe
+
+    Query parameters: workflow_id (comma-separated), max_queue, overflow.
+    Returns a 400 response for bad parameters, else None once the stream ends.
+    """
+    workflow_ids = request.query.get('workflow_id')
+    try:
+        subscription = subscribe(
+            max_queue=int(request.query['max_queue']) if 'max_queue' in request.query else None,
+            overflow=request.query.get('overflow'),
+            workflow_ids=workflow_ids.split(',') if workflow_ids else None
+        )
+    except ValueError as e:
+        return HttpResponse.json({'error': str(e), 'honest_assessment': True}, 400)
+    await stream_events(writer, subscription)
+    return None
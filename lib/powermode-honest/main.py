@@ -6,15 +6,47 @@ Fokuserar på verklig nytta genom struktur och systematik
 
 import asyncio
 import json
-from typing import Dict, Any, Optional, List
+import os
+import sys
+import time
+from typing import (
+    TYPE_CHECKING, Dict, Any, Optional, List, Iterator, Iterable, AsyncIterable, AsyncIterator, Awaitable, Callable,
+    TextIO, Tuple, Union
+)
 from datetime import datetime
-import argparse
 import logging
 
-from core.workflow import WorkflowOrganizer
-from core.config import ConfigurationManager
-from core.tasks import TaskLoadManager
-from core.metrics import HonestMetricsFramework
+from core.lazy import LazyComponent
+from core.observability import (
+    OperationMetrics, SamplingProfiler, TracedComponent, Tracer, configure_logging, instrumented, shutdown_logging,
+    traced
+)
+from core.storage import (
+    STATUS_TASK_MANAGED, ColdArchive, TieredWorkflowStore, VersionConflict, WorkflowAggregates, WorkflowRecord,
+    WorkflowStore, WorkflowIdAllocator, create_store, epoch_ms
+)
+from core.batch import bounded_as_completed, create_structure_in_worker, parse_batch_line, read_lines
+from core.cache import StructureCache, thaw
+from core.progress import TaskIndexCache, bit_positions, with_task_ids
+from core.graph import CycleError, TaskGraph, TaskGraphCache
+from core.feed import ChangeFeed, Subscription
+from core.templates import TemplateRegistry
+from core.concurrency import WorkflowConcurrency
+
+if TYPE_CHECKING:
+    # Only needed by the process pool, shards, analytics, task execution and the HTTP endpoints - imported where used
+    from concurrent.futures import ProcessPoolExecutor
+    from core.analytics import ProgressColumns
+    from core.executor import TaskExecutor
+    from core.shard import ShardRouter
+    from core.web import HttpRequest, HttpResponse
+
+
+# Task plan fields that need a full graph pass - left out of per-update plans, filled in by reports
+ON_DEMAND_PLAN_FIELDS = ('critical_path', 'critical_path_effort', 'execution_order')
+
+# A batch item is a description or a (description, context) pair
+BatchItem = Union[str, Tuple[str, Dict[str, Any]]]
 
 
 class PowerModeHonest:
@@ -30,41 +62,191 @@ class PowerModeHonest:
     INGA falska påståenden eller simulerade resultat!
     """
     
+    # Core components (ärliga versioner) - imported and built on first use
+    workflow_organizer = LazyComponent('core.workflow', 'WorkflowOrganizer')
+    config_manager = LazyComponent('core.config', 'ConfigurationManager')
+    task_manager = LazyComponent('core.tasks', 'TaskLoadManager')
+    metrics = LazyComponent('core.metrics', 'HonestMetricsFramework')
+    
+    # Components whose method calls become spans when tracing is enabled
+    TRACED_COMPONENTS = (
+        'workflow_organizer', 'config_manager', 'task_manager', 'metrics',
+        'templates', 'structure_cache', 'logger', 'operation_logger'
+    )
+    
+    _shared_instance: Optional['PowerModeHonest'] = None
+    
+    @classmethod
+    def shared(cls, config: Dict[str, Any] = None) -> 'PowerModeHonest':
+        """
+        Process-wide instance, created on first call
+        
+        config only applies to that first call. close() releases it, and
+        the next call creates a fresh one.
+        """
+        if cls._shared_instance is None:
+            cls._shared_instance = cls(config)
+        return cls._shared_instance
+    
+    @classmethod
+    def sharded(cls, shards: int, config: Dict[str, Any] = None, **router_options) -> 'ShardRouter':
+        """
+        Router over `shards` worker processes, each running its own engine
+        
+        Workflows are partitioned by workflow ID hash (see core.shard).
+        Await start() on the router before use and close() when done.
+        """
+        from core.shard import ShardRouter
+        return ShardRouter(cls, shards, config or cls._default_config(), **router_options)
+    
     def __init__(self, config: Dict[str, Any] = None):
         self.config = config or self._default_config()
+        # Spans and profile samples - both cost an attribute check per call while disabled
+        self.tracer = Tracer(**self.config.get('tracing', {}))
+        profiling_config = dict(self.config.get('profiling', {}))
+        if 'directory' in profiling_config:
+            profiling_config['directory'] = self._data_path(profiling_config['directory'])
+        self.profiler = SamplingProfiler(**profiling_config)
         
         # Setup logging för transparens
         self._setup_logging()
         
-        # Initialize core components (ärliga versioner)
-        self.workflow_organizer = WorkflowOrganizer()
-        self.config_manager = ConfigurationManager()
-        self.task_manager = TaskLoadManager()
-        self.metrics = HonestMetricsFramework()
-        
-        # System state
-        self.active_workflows: Dict[str, Dict[str, Any]] = {}
+        # System state - workflows live in a pluggable store, not a bare dict
+        self.active_workflows: WorkflowStore = self._create_store()
+        # Per-workflow locks and compare-and-set writes for read-await-write operations
+        self.concurrency = WorkflowConcurrency(self.active_workflows, **self.config.get('concurrency', {}))
+        # A shared database hands out the node, so processes on one file never mint the same IDs
+        self.id_allocator = WorkflowIdAllocator(node_id=self.active_workflows.lease_node_id(self.config.get('node_id')))
         self.task_history: List[Dict[str, Any]] = []
         self.session_start = datetime.now()
+        self._process_pool: Optional['ProcessPoolExecutor'] = None
+        self._task_executor: Optional['TaskExecutor'] = None  # Created on first use
+        self.structure_cache = self._create_structure_cache()
+        self.templates = self._create_template_registry()
+        self._analytics: Optional['ProgressColumns'] = None  # Built on the first distributions report
+        self.task_indexes = TaskIndexCache()
+        self.task_graphs = TaskGraphCache()
+        self.operation_metrics = OperationMetrics()
+        self.change_feed = ChangeFeed(**self.config.get('change_feed', {}))
+        self._metrics_server: Optional[asyncio.AbstractServer] = None
+        if self.tracer.enabled:
+            self._trace_components()
         
         self.logger.info("Power Mode 3.0 Honest Edition initialized")
         self.logger.info("Focus: Real utility through structure and systematization")
     
     def _setup_logging(self):
-        """Setup transparent logging"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('power_mode_honest.log'),
-                logging.StreamHandler()
-            ]
-        )
+        """Setup transparent logging - queued, written by a background thread, once per process"""
+        logging_config = dict(self.config.get('logging', {}))
+        if logging_config.get('file'):
+            logging_config['file'] = self._data_path(logging_config['file'])
+        configure_logging(**logging_config)
         self.logger = logging.getLogger('PowerModeHonest')
+        # Per-operation messages get their own logger so they can be sampled
+        self.operation_logger = logging.getLogger('PowerModeHonest.operations')
+    
+    def _trace_components(self):
+        """Wrap the components built so far; lazy ones are wrapped by _wrap_component when built"""
+        for name in self.TRACED_COMPONENTS:
+            component = self.__dict__.get(name)
+            if component is not None and not isinstance(component, TracedComponent):
+                setattr(self, name, TracedComponent(component, name, self.tracer))
+    
+    def _wrap_component(self, name: str, component: Any) -> Any:
+        """Hook for LazyComponent: traced proxy for freshly built components while tracing"""
+        if self.tracer.enabled and name in self.TRACED_COMPONENTS:
+            return TracedComponent(component, name, self.tracer)
+        return component
+    
+    def _create_store(self) -> WorkflowStore:
+        """Create the workflow store configured under 'storage' (tiered if 'tiering' is enabled)"""
+        storage_config = dict(self.config.get('storage', {'backend': 'memory'}))
+        backend = storage_config.pop('backend', 'memory')
+        if backend == 'memory':
+            store = create_store(backend)
+        else:
+            storage_config['path'] = self._data_path(storage_config.get('path', 'power_mode_honest.db'))
+            store = create_store(backend, **storage_config)
+        
+        tiering_config = dict(self.config.get('tiering', {'enabled': False}))
+        if not tiering_config.pop('enabled', True):
+            return store
+        cold = ColdArchive(
+            self._data_path(tiering_config.pop('directory', 'power_mode_honest_cold')),
+            block_size=tiering_config.pop('block_size', 1024)
+        )
+        return TieredWorkflowStore(store, cold, on_archive=self._forget_workflows, **tiering_config)
+    
+    def _data_path(self, path: str) -> str:
+        """path under the configured data_dir (created on first use); absolute paths are kept"""
+        data_dir = self.config.get('data_dir')
+        if data_dir is None or os.path.isabs(path):
+            return path
+        os.makedirs(data_dir, exist_ok=True)
+        return os.path.join(data_dir, path)
+    
+    def _forget_workflows(self, workflow_ids: List[str]):
+        """Drop per-workflow caches for workflows that moved to the cold tier"""
+        for workflow_id in workflow_ids:
+            self.task_indexes.discard(workflow_id)
+            self.task_graphs.discard(workflow_id)
+    
+    def _create_structure_cache(self) -> Optional[StructureCache]:
+        """Structure cache configured under 'structure_cache', or None if disabled"""
+        cache_config = dict(self.config.get('structure_cache', {'enabled': False}))
+        if not cache_config.pop('enabled', True):
+            return None
+        return StructureCache(**cache_config)
     
-    def _default_config(self) -> Dict[str, Any]:
-        """Default configuration - honest and transparent"""
+    def _create_template_registry(self) -> Optional[TemplateRegistry]:
+        """Classifier over 'workflow_templates' (paths relative to this file), or None if disabled"""
+        registry_config = dict(self.config.get('template_registry', {'enabled': False}))
+        if not registry_config.pop('enabled', True):
+            return None
+        return TemplateRegistry(
+            self.config.get('workflow_templates', {}),
+            base_dir=os.path.dirname(os.path.abspath(__file__)),
+            **registry_config
+        )
+    
+    def close(self):
+        """Flush pending workflow state and release the store, worker processes and endpoints"""
+        self.change_feed.close()
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+            self._metrics_server = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
+        if self._task_executor is not None:
+            self._task_executor.close()
+        self.active_workflows.close()
+        self._export_observability()
+        if PowerModeHonest._shared_instance is self:
+            PowerModeHonest._shared_instance = None
+    
+    def _export_observability(self):
+        """Write buffered spans to the configured trace file and pending profile samples to disk"""
+        if self.tracer.enabled and self.tracer.export_path:
+            spans = self.tracer.export()
+            self.logger.info(f"Wrote {spans} spans to {self.tracer.export_path} ({self.tracer.export_format})")
+            self.tracer.clear()
+        if self.profiler.samples:
+            self.profiler.flush()
+            self.logger.info(f"Profile samples {self.profiler.samples} in {self.profiler.directory}")
+    
+    @staticmethod
+    def _default_config(data_dir: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Default configuration - honest and transparent
+        
+        Without data_dir nothing is written to disk: workflows live in memory
+        and logs go to the console. With data_dir, workflows are kept in
+        SQLite with a cold archive, and the log file goes there too.
+        """
+        persistent = data_dir is not None
         return {
+            'data_dir': data_dir,  # Relative database, archive, log and profile paths resolve against this
             'enable_workflow_organization': True,
             'enable_task_management': True,
             'enable_honest_metrics': True,
@@ -74,70 +256,394 @@ class PowerModeHonest:
                 'research': 'templates/research_workflow.json',
                 'planning': 'templates/planning_workflow.json'
             },
+            'template_registry': {
+                'enabled': True,
+                'check_interval_seconds': 2,  # How often template files are checked for changes
+                'default_type': None  # workflow_type when no template keyword matches
+            },
+            'logging': {
+                'level': 'INFO',
+                'file': 'power_mode_honest.log' if persistent else None,
+                'json_lines': False,
+                'max_bytes': 10 * 1024 * 1024,  # Rotate on size ...
+                'when': 'midnight',  # ... or on time, whichever comes first
+                'backup_count': 7,
+                'sample_rates': {}  # e.g. {'PowerModeHonest.operations': 100}
+            },
+            'storage': {
+                'backend': 'sqlite' if persistent else 'memory',
+                'path': 'power_mode_honest.db',  # Used by the sqlite backend
+                'batch_size': 500,
+                'flush_interval_seconds': 1.0,  # Partial batches are written at least this often
+                'cache_size': 50_000
+            },
+            'tiering': {
+                'enabled': persistent,
+                'directory': 'power_mode_honest_cold',
+                'completed_after_seconds': 3600,  # Completed workflows leave the hot tier after an hour ...
+                'idle_after_seconds': 7 * 24 * 3600,  # ... any workflow after a week without updates
+                'sweep_interval_seconds': 60,
+                'block_size': 1024
+            },
+            'structure_cache': {
+                'enabled': True,
+                'max_entries': 10_000,
+                'ttl_seconds': 3600,
+                'max_bytes': 64 * 1024 * 1024
+            },
+            'concurrency': {
+                'lock_stripes': 1024,
+                'max_retries': 8  # Compare-and-set retries before an update gives up
+            },
+            'executor': {
+                'resource_limits': {},  # Concurrent tasks per cpu/memory/network/storage, e.g. {'network': 64}
+                'max_concurrency': 64,  # Running tasks across all resource types
+                'thread_workers': None,
+                'process_workers': None  # None = one worker per CPU core
+            },
+            'change_feed': {
+                'max_queue': 1000,  # Per subscriber
+                'overflow': 'drop_oldest'  # or 'coalesce' (newest pending event per workflow)
+            },
+            'api': {
+                'max_pending': 256,  # Queued + running requests before 429
+                'max_concurrency': 64,
+                'max_batch': 1000,
+                'drain_timeout_seconds': 30
+            },
+            'tracing': {
+                'enabled': False,
+                'max_spans': 100_000,  # Ring buffer - the oldest spans are dropped first
+                'export_path': None,  # Written on close()
+                'export_format': 'chrome'  # or 'otlp' (OpenTelemetry JSON, one request per line)
+            },
+            'profiling': {
+                'sample_rate': 0.0,  # Fraction of operation calls run under cProfile
+                'directory': 'power_mode_honest_profiles',  # <operation>.pstats per operation type
+                'flush_every': 100  # Samples per operation between writes
+            },
+            'process_pool_workers': None,  # None = one worker per CPU core
+            'shards': 1,  # Engine worker processes behind a ShardRouter when serving the API (see core.shard)
+            'node_id': None,  # Workflow ID node (0-1023); leased from a SQLite store, else derived from host/pid
             'honest_mode': True,  # Always true in this version
             'transparency_level': 'full'
         }
     
-    async def organize_workflow(self, task_description: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    @instrumented('organize')
+    async def organize_workflow(self, task_description: str, context: Dict[str, Any] = None,
+                                workflow_id: str = None) -> Dict[str, Any]:
         """
         Organize a workflow systematically
         
-        Returns honest breakdown of tasks and structure, no fake optimizations
+        Returns honest breakdown of tasks and structure, no fake optimizations.
+        workflow_id is normally allocated here; a shard router passes the
+        ID it already used to pick this shard.
         """
-        self.logger.info(f"Organizing workflow for: {task_description}")
+        self.operation_logger.info(f"Organizing workflow for: {task_description}")
         
         try:
             # Use workflow organizer to break down task
-            workflow_structure = await self.workflow_organizer.create_structure(
-                task_description, context or {}
-            )
+            context = await self._with_workflow_type(task_description, context or {})
+            workflow_structure = await self._create_structure(task_description, context)
             
-            # Track this workflow honestly
-            workflow_id = f"workflow_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            self.active_workflows[workflow_id] = {
-                'description': task_description,
-                'structure': workflow_structure,
-                'created_at': datetime.now(),
-                'status': 'organized',
-                'progress': 0.0  # Honest progress tracking
-            }
+            workflow_id = self._register_workflow(task_description, workflow_structure, workflow_id)
             
             # Log honest metrics
             self.metrics.log_workflow_created(workflow_id, task_description)
             
-            return {
-                'workflow_id': workflow_id,
-                'structure': workflow_structure,
-                'estimated_tasks': len(workflow_structure.get('tasks', [])),
-                'organization_method': 'systematic_breakdown',
-                'honest_assessment': True
-            }
+            return self._organized_result(workflow_id, workflow_structure)
             
         except Exception as e:
             self.logger.error(f"Error organizing workflow: {e}")
             return {'error': str(e), 'honest_assessment': True}
     
+    async def _create_structure(self, task_description: str, context: Dict[str, Any],
+                                factory: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+        """
+        Break down a task, going through the structure cache when enabled
+        
+        Cached structures are read-only and shared between workflows.
+        """
+        if factory is None:
+            async def factory() -> Dict[str, Any]:
+                return await self.workflow_organizer.create_structure(task_description, context)
+        
+        async def identified() -> Dict[str, Any]:
+            # Tasks without an ID get their position as one, so progress updates can name them
+            return with_task_ids(await factory())
+        
+        if self.structure_cache is None:
+            return await identified()
+        return await self.structure_cache.get_or_create(task_description, context, identified)
+    
+    async def _with_workflow_type(self, task_description: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Context plus the workflow_type classified from the templates (an explicit one wins)"""
+        if self.templates is None or 'workflow_type' in context:
+            return context
+        workflow_type = await self.templates.classify_async(task_description)
+        if workflow_type is None:
+            return context
+        return {**context, 'workflow_type': workflow_type}
+    
+    def _register_workflow(self, task_description: str, workflow_structure: Dict[str, Any],
+                           workflow_id: str = None) -> str:
+        """
+        Track a freshly organized workflow and return its ID
+        
+        A caller-supplied workflow_id must be new - replacing a workflow
+        would leave its task index and graph caches describing the old one.
+        """
+        if workflow_id is None:
+            workflow_id = self.id_allocator.allocate()
+        elif workflow_id in self.active_workflows:
+            raise ValueError(f"Workflow ID already in use: {workflow_id}")
+        # Honest progress tracking starts at 0.0
+        workflow = WorkflowRecord(task_description, workflow_structure)
+        self.active_workflows.put(workflow_id, workflow)
+        self.change_feed.publish(
+            'workflow_organized', workflow_id,
+            status=workflow.status, progress=0.0, estimated_tasks=len(workflow_structure.get('tasks', []))
+        )
+        return workflow_id
+    
+    def _organized_result(self, workflow_id: str, workflow_structure: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'workflow_id': workflow_id,
+            # Stored structures may be shared, read-only cache entries - callers get plain lists and dicts
+            'structure': thaw(workflow_structure),
+            'estimated_tasks': len(workflow_structure.get('tasks', [])),
+            'organization_method': 'systematic_breakdown',
+            'honest_assessment': True
+        }
+    
+    @traced()
+    async def organize_workflows(self, task_descriptions: Iterable[BatchItem],
+                                 max_concurrency: int = 32, ordered: bool = True,
+                                 use_processes: bool = False) -> List[Dict[str, Any]]:
+        """
+        Organize many workflows with bounded concurrency
+        
+        Items are descriptions or (description, context) tuples. Results come
+        back in input order (ordered=True) or in completion order, each with
+        an 'index' key; a failing item gets an error result instead of
+        aborting the batch.
+        """
+        results = [
+            result async for result in self.iter_organize_workflows(
+                task_descriptions, max_concurrency=max_concurrency, use_processes=use_processes
+            )
+        ]
+        if ordered:
+            results.sort(key=lambda result: result['index'])
+        return results
+    
+    async def iter_organize_workflows(self, task_descriptions: Union[Iterable[BatchItem], AsyncIterable[BatchItem]],
+                                      max_concurrency: int = 32, use_processes: bool = False,
+                                      metrics_batch_size: int = 256) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Organize many workflows, yielding each result as soon as it is done
+        
+        With use_processes=True the CPU-bound breakdown runs in a process
+        pool so it can use every core. Metrics events are buffered and
+        flushed in batches of metrics_batch_size instead of once per item.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._get_process_pool() if use_processes else None
+        
+        async def build(item: BatchItem) -> Tuple[str, Dict[str, Any]]:
+            task_description, context = (item, {}) if isinstance(item, str) else (item[0], item[1] or {})
+            context = await self._with_workflow_type(task_description, context)
+            with self.operation_metrics.track('organize'):
+                if pool is None:
+                    return task_description, await self._create_structure(task_description, context)
+                
+                async def in_worker() -> Dict[str, Any]:
+                    return await loop.run_in_executor(pool, create_structure_in_worker, task_description, context)
+                
+                return task_description, await self._create_structure(task_description, context, in_worker)
+        
+        self.logger.info(f"Organizing workflow batch (max_concurrency={max_concurrency}, processes={use_processes})")
+        created: List[Tuple[str, str]] = []
+        organized = failed = 0
+        
+        try:
+            async for index, outcome in bounded_as_completed(task_descriptions, build, max_concurrency):
+                if isinstance(outcome, Exception):
+                    failed += 1
+                    self.logger.error(f"Error organizing workflow #{index}: {outcome}")
+                    yield {'index': index, 'error': str(outcome), 'honest_assessment': True}
+                    continue
+                
+                task_description, workflow_structure = outcome
+                workflow_id = self._register_workflow(task_description, workflow_structure)
+                created.append((workflow_id, task_description))
+                organized += 1
+                if len(created) >= metrics_batch_size:
+                    self._log_workflows_created(created)
+                    created = []
+                
+                result = self._organized_result(workflow_id, workflow_structure)
+                result['index'] = index
+                yield result
+        finally:
+            self._log_workflows_created(created)
+            self.logger.info(f"Workflow batch done: {organized} organized, {failed} failed")
+    
+    def _log_workflows_created(self, created: List[Tuple[str, str]]):
+        """Flush buffered workflow-created events to the metrics framework in one pass"""
+        if not created:
+            return
+        log_many = getattr(self.metrics, 'log_workflows_created', None)
+        if log_many is not None:
+            log_many(created)
+        else:
+            for workflow_id, task_description in created:
+                self.metrics.log_workflow_created(workflow_id, task_description)
+    
+    @traced()
+    async def run_batch(self, source: str = '-', output: TextIO = None, manage: bool = False,
+                        max_concurrency: int = 32, use_processes: bool = False) -> Dict[str, Any]:
+        """
+        Stream a JSON-lines batch through organize (and optionally manage_tasks)
+        
+        source is a file path or '-' for stdin; each line is a JSON string
+        or {"description": ..., "context": ..., "id": ...}. One compact JSON
+        result per line is written to output as soon as the item is done
+        (completion order - use 'line' or 'id' to match inputs). Only the
+        in-flight window is held in memory. Returns a throughput summary.
+        """
+        output = output or sys.stdout
+        started = time.perf_counter()
+        counts = {'items': 0, 'organized': 0, 'managed': 0, 'failed': 0}
+        inputs: Dict[int, Tuple[int, Any]] = {}  # batch index -> (line number, client id), in flight only
+        last_flush = started
+        
+        def emit(result: Dict[str, Any]):
+            nonlocal last_flush
+            output.write(json.dumps(result, separators=(',', ':'), default=str) + '\n')
+            now = time.perf_counter()
+            if now - last_flush >= 0.1:
+                output.flush()
+                last_flush = now
+        
+        async def items() -> AsyncIterator[BatchItem]:
+            line_number = index = 0
+            async for line in read_lines(source):
+                line_number += 1
+                if not line.strip():
+                    continue
+                counts['items'] += 1
+                try:
+                    task_description, context, item_id = parse_batch_line(line)
+                except ValueError as e:
+                    counts['failed'] += 1
+                    emit({'line': line_number, 'error': str(e), 'honest_assessment': True})
+                    continue
+                # bounded_as_completed numbers items in the order they are yielded
+                inputs[index] = (line_number, item_id)
+                index += 1
+                yield task_description, context
+        
+        async def manage_and_emit(result: Dict[str, Any]):
+            try:
+                plan = await self.manage_tasks(result['workflow_id'])
+                if 'error' in plan:
+                    counts['failed'] += 1
+                    result['manage_error'] = plan['error']
+                else:
+                    counts['managed'] += 1
+                    result['task_plan'] = plan['task_plan']
+                emit(result)
+            finally:
+                manage_slots.release()
+        
+        manage_slots = asyncio.Semaphore(max_concurrency)
+        managing = set()
+        try:
+            async for result in self.iter_organize_workflows(
+                items(), max_concurrency=max_concurrency, use_processes=use_processes
+            ):
+                line_number, item_id = inputs.pop(result.pop('index'))
+                result['line'] = line_number
+                if item_id is not None:
+                    result['id'] = item_id
+                if 'error' in result:
+                    counts['failed'] += 1
+                    emit(result)
+                    continue
+                
+                counts['organized'] += 1
+                if not manage:
+                    emit(result)
+                    continue
+                # Blocks here once max_concurrency plans are being built - keeps memory flat
+                await manage_slots.acquire()
+                task = asyncio.ensure_future(manage_and_emit(result))
+                managing.add(task)
+                task.add_done_callback(managing.discard)
+            if managing:
+                await asyncio.gather(*managing)
+        finally:
+            output.flush()
+        
+        elapsed = time.perf_counter() - started
+        return {
+            **counts,
+            'elapsed_seconds': round(elapsed, 3),
+            'items_per_second': round(counts['items'] / elapsed, 1) if elapsed > 0 else 0.0,
+            'max_concurrency': max_concurrency,
+            'honest_assessment': True
+        }
+    
+    def _get_process_pool(self) -> 'ProcessPoolExecutor':
+        """Process pool for CPU-heavy breakdowns, created on first use"""
+        if self._process_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._process_pool = ProcessPoolExecutor(max_workers=self.config.get('process_pool_workers'))
+        return self._process_pool
+    
+    @instrumented('manage')
     async def manage_tasks(self, workflow_id: str) -> Dict[str, Any]:
         """
         Manage tasks within a workflow
         
         Provides honest task prioritization and load management
         """
-        if workflow_id not in self.active_workflows:
+        workflow = self.active_workflows.get(workflow_id)
+        if workflow is None:
             return {'error': 'Workflow not found', 'honest_assessment': True}
         
-        workflow = self.active_workflows[workflow_id]
-        
         try:
-            # Use task manager for honest prioritization
-            task_plan = await self.task_manager.prioritize_tasks(
-                workflow['structure'].get('tasks', [])
+            # Concurrent manage_tasks calls for one workflow run one at a time
+            async with self.concurrency.lock(workflow_id):
+                # Use task manager for honest prioritization
+                prioritized = await self.task_manager.prioritize_tasks(
+                    thaw(workflow.structure.get('tasks', []))
+                )
+                
+                def with_task_plan(current: WorkflowRecord) -> Dict[str, Any]:
+                    # Planned from the record as it is now - progress may have moved during the await
+                    # Dependency graph gives the real critical path and stays live as tasks complete
+                    graph = self._build_task_graph(workflow_id, current)
+                    return {
+                        'task_plan': {**prioritized, **self._graph_plan(graph)},
+                        'status': STATUS_TASK_MANAGED
+                    }
+                
+                try:
+                    workflow = await self.concurrency.update(workflow_id, with_task_plan)
+                except KeyError:
+                    # Deleted while the task manager was working
+                    return {'error': 'Workflow not found', 'honest_assessment': True}
+            task_plan = workflow.task_plan
+            self.change_feed.publish(
+                'tasks_managed', workflow_id,
+                status=STATUS_TASK_MANAGED,
+                critical_path_effort=task_plan['critical_path_effort'],
+                remaining_effort=task_plan['remaining_effort'],
+                ready_tasks=len(task_plan['ready_tasks'])
             )
             
-            # Update workflow with task plan
-            workflow['task_plan'] = task_plan
-            workflow['status'] = 'task_managed'
-            
             # Honest metrics
             self.metrics.log_tasks_organized(workflow_id, len(task_plan.get('tasks', [])))
             
@@ -148,24 +654,177 @@ class PowerModeHonest:
                 'honest_assessment': True
             }
             
+        except CycleError as e:
+            self.logger.error(f"Error managing tasks: {e}")
+            return {'error': str(e), 'cycle': e.cycle, 'honest_assessment': True}
+        except VersionConflict as e:
+            self.logger.warning(f"Gave up managing tasks after repeated concurrent updates: {e}")
+            return {'error': str(e), 'conflict': True, 'honest_assessment': True}
         except Exception as e:
             self.logger.error(f"Error managing tasks: {e}")
             return {'error': str(e), 'honest_assessment': True}
     
+    def _build_task_graph(self, workflow_id: str, workflow: WorkflowRecord) -> TaskGraph:
+        """Build the dependency graph for a workflow, including its completed tasks"""
+        graph = TaskGraph.from_tasks(workflow.structure.get('tasks', []))
+        graph.set_completed(bit_positions(workflow.completed_mask))
+        self.task_graphs.put(workflow_id, graph)
+        return graph
+    
+    @staticmethod
+    def _graph_progress(graph: TaskGraph) -> Dict[str, Any]:
+        """Plan fields the graph maintains per change - cheap enough for every progress update"""
+        return {'ready_tasks': graph.ready_tasks(), 'remaining_effort': graph.remaining_effort()}
+    
+    def _full_task_plan(self, workflow_id: str, workflow: WorkflowRecord) -> Dict[str, Any]:
+        """Stored task plan plus the order and critical path, computed now from the live graph"""
+        graph = self.task_graphs.get(workflow_id)
+        if graph is None:
+            graph = self._build_task_graph(workflow_id, workflow)
+        return {**workflow.task_plan, **self._graph_plan(graph)}
+    
+    @staticmethod
+    def _graph_plan(graph: TaskGraph) -> Dict[str, Any]:
+        """Every graph-derived plan field, including the O(N log N) order and critical path"""
+        return {
+            'critical_path': graph.critical_path(),
+            'critical_path_effort': graph.critical_path_effort(),
+            'remaining_effort': graph.remaining_effort(),
+            'execution_order': graph.topological_order(),
+            'ready_tasks': graph.ready_tasks()
+        }
+    
+    @property
+    def task_executor(self) -> 'TaskExecutor':
+        """Executor configured under 'executor', created on first use"""
+        if self._task_executor is None:
+            from core.executor import TaskExecutor
+            self._task_executor = TaskExecutor(**self.config.get('executor', {}))
+        return self._task_executor
+    
+    def register_task_handler(self, name: str, func: Callable[[Dict[str, Any]], Any],
+                              mode: Optional[str] = None, resource: str = 'cpu') -> None:
+        """
+        Register the callable that executes matching tasks
+        
+        name is a task ID, a task 'handler' or 'type' value, or '*' for
+        any other task. func gets the task dict; coroutine functions run
+        on the event loop, sync functions in a thread pool (or a process
+        pool with mode='process'). resource picks the concurrency limit
+        the task counts against - 'cpu', 'memory', 'network' or 'storage'.
+        """
+        self.task_executor.register(name, func, mode, resource)
+    
+    @traced()
+    async def execute_workflow(self, workflow_id: str, stop_on_failure: bool = False) -> Dict[str, Any]:
+        """
+        Run the open tasks of a workflow with the registered handlers
+        
+        Tasks start once their dependencies are done, most critical first,
+        within the per-resource limits. Every completed task goes through
+        mark_completed, so progress, task plan and change feed stay live.
+        A failed task blocks only its dependents unless stop_on_failure.
+        """
+        workflow = self.active_workflows.get(workflow_id)
+        if workflow is None:
+            return {'error': 'Workflow not found', 'honest_assessment': True}
+        
+        # Prefer the prioritized plan from manage_tasks; it carries the same tasks
+        tasks = thaw((workflow.task_plan or {}).get('tasks') or workflow.structure.get('tasks', []))
+        completed = self.task_indexes.get(workflow_id, workflow.structure).ids_in(workflow.completed_mask)
+        
+        async def on_complete(task_id: str):
+            result = await self.mark_completed(workflow_id, [task_id])
+            if 'error' in result:
+                raise RuntimeError(f"Could not record completion of {task_id}: {result['error']}")
+        
+        try:
+            execution = await self.task_executor.run(
+                tasks, completed=completed, on_complete=on_complete, stop_on_failure=stop_on_failure
+            )
+        except CycleError as e:
+            return {'error': str(e), 'cycle': e.cycle, 'honest_assessment': True}
+        except (KeyError, ValueError) as e:
+            return {'error': str(e.args[0]) if e.args else str(e), 'honest_assessment': True}
+        except Exception as e:
+            self.logger.error(f"Error executing workflow {workflow_id}: {e}")
+            return {'error': str(e), 'honest_assessment': True}
+        
+        workflow = self.active_workflows.get(workflow_id)
+        self.logger.info(
+            f"Executed workflow {workflow_id}: {len(execution['completed'])} completed, "
+            f"{len(execution['failed'])} failed, {len(execution['blocked'])} blocked"
+        )
+        return {
+            'workflow_id': workflow_id,
+            **execution,
+            'progress_percent': round(workflow.progress, 1) if workflow is not None else None,
+            'honest_assessment': True
+        }
+    
+    @traced()
     async def track_progress(self, workflow_id: str, completed_tasks: List[str] = None) -> Dict[str, Any]:
         """
         Track progress honestly - no fake improvements
+        
+        Takes the full list of completed tasks and sets the workflow to
+        exactly that state. Thin wrapper over the delta API - prefer
+        mark_completed / mark_reopened for incremental updates.
         """
-        if workflow_id not in self.active_workflows:
-            return {'error': 'Workflow not found', 'honest_assessment': True}
+        return await self._update_completion(workflow_id, completed_tasks or [], replace=True)
+    
+    @traced()
+    async def mark_completed(self, workflow_id: str, task_ids: Iterable[str]) -> Dict[str, Any]:
+        """
+        Mark tasks as completed - cost depends on len(task_ids), not the workflow size
+        
+        Already completed and duplicate IDs are ignored; IDs that are not
+        tasks of the workflow reject the whole update.
+        """
+        return await self._update_completion(workflow_id, complete=task_ids)
+    
+    @traced()
+    async def mark_reopened(self, workflow_id: str, task_ids: Iterable[str]) -> Dict[str, Any]:
+        """Mark completed tasks as open again (same rules as mark_completed)"""
+        return await self._update_completion(workflow_id, reopen=task_ids)
+    
+    @traced()
+    async def update_progress(self, workflow_id: str, complete: Iterable[str] = (),
+                              reopen: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Complete some tasks and reopen others as one update
         
-        workflow = self.active_workflows[workflow_id]
-        completed_tasks = completed_tasks or []
+        Both apply or neither does (an unknown ID rejects the whole update);
+        an ID in both lists ends up open.
+        """
+        return await self._update_completion(workflow_id, complete=complete, reopen=reopen)
+    
+    @instrumented('track')
+    async def _update_completion(self, workflow_id: str, complete: Iterable[str] = (), reopen: Iterable[str] = (),
+                                 replace: bool = False) -> Dict[str, Any]:
+        workflow = self.active_workflows.get(workflow_id)
+        if workflow is None:
+            return {'error': 'Workflow not found', 'honest_assessment': True}
         
         try:
+            task_index = self.task_indexes.get(workflow_id, workflow.structure)
+            completed, unknown = task_index.mask_for(complete)
+            reopened, unknown_reopened = task_index.mask_for(reopen)
+            unknown.extend(task_id for task_id in unknown_reopened if task_id not in unknown)
+            if unknown:
+                return {
+                    'error': 'Unknown task IDs for this workflow',
+                    'unknown_tasks': unknown,
+                    'honest_assessment': True
+                }
+            
+            # replace sets exactly the given tasks (track_progress); otherwise they are deltas
+            previous = workflow.completed_mask
+            mask = (completed if replace else previous | completed) & ~reopened
+            
             # Calculate honest progress
-            total_tasks = len(workflow['structure'].get('tasks', []))
-            completed_count = len(completed_tasks)
+            total_tasks = len(task_index)
+            completed_count = mask.bit_count()
             
             if total_tasks > 0:
                 progress_percent = (completed_count / total_tasks) * 100
@@ -173,12 +832,37 @@ class PowerModeHonest:
                 progress_percent = 0.0
             
             # Update workflow
-            workflow['progress'] = progress_percent
-            workflow['completed_tasks'] = completed_tasks
-            workflow['last_updated'] = datetime.now()
-            
-            # Honest metrics
-            self.metrics.log_progress_update(workflow_id, progress_percent)
+            if mask != previous:
+                changes = {
+                    'progress': progress_percent,
+                    'completed_mask': mask,
+                    'last_updated': epoch_ms()
+                }
+                
+                # Keep a managed plan current - only the changed tasks and their neighbours are
+                # re-evaluated. Order and critical path would cost a full pass, so they are dropped
+                # here and recomputed when a report asks for them (_full_task_plan)
+                if workflow.task_plan is not None:
+                    graph = self.task_graphs.get(workflow_id)
+                    if graph is None:
+                        graph = self._build_task_graph(workflow_id, workflow)
+                    graph.set_completed(bit_positions(mask & ~previous), True)
+                    graph.set_completed(bit_positions(previous & ~mask), False)
+                    plan = {
+                        key: value for key, value in workflow.task_plan.items() if key not in ON_DEMAND_PLAN_FIELDS
+                    }
+                    changes['task_plan'] = {**plan, **self._graph_progress(graph)}
+                
+                # Nothing awaited since the read, so this cannot conflict - the version check keeps it so
+                workflow = self.active_workflows.update(workflow_id, expected_version=workflow.version, **changes)
+                self.change_feed.publish(
+                    'progress_updated', workflow_id,
+                    status=workflow.status, progress=round(progress_percent, 1),
+                    completed_tasks=completed_count, total_tasks=total_tasks
+                )
+                
+                # Honest metrics
+                self.metrics.log_progress_update(workflow_id, progress_percent)
             
             return {
                 'workflow_id': workflow_id,
@@ -186,6 +870,7 @@ class PowerModeHonest:
                 'completed_tasks': completed_count,
                 'total_tasks': total_tasks,
                 'remaining_tasks': total_tasks - completed_count,
+                'changed_tasks': (mask ^ previous).bit_count(),
                 'honest_assessment': True,
                 'no_fake_improvements': True
             }
@@ -194,47 +879,49 @@ class PowerModeHonest:
             self.logger.error(f"Error tracking progress: {e}")
             return {'error': str(e), 'honest_assessment': True}
     
-    async def generate_report(self, workflow_id: str = None) -> Dict[str, Any]:
+    def workflows_created_between(self, start: datetime, end: datetime) -> Iterator[Tuple[str, WorkflowRecord]]:
+        """
+        Iterate workflows created in [start, end], oldest first
+
+        Uses the time-ordered workflow IDs, so no timestamp index is needed.
+        """
+        low, high = self.id_allocator.id_range(start, end)
+        return self.active_workflows.range_by_id(low, high)
+
+    @instrumented('report')
+    async def generate_report(self, workflow_id: str = None, include_distributions: bool = False) -> Dict[str, Any]:
         """
         Generate honest report - no fabricated metrics
+        
+        include_distributions adds percentiles, histograms and per-status
+        and per-age breakdowns to the system report (needs numpy).
         """
         try:
             if workflow_id:
-                # Single workflow report
-                if workflow_id not in self.active_workflows:
+                # Single workflow report (an archived workflow is promoted back to the hot tier)
+                workflow = self.active_workflows.get(workflow_id)
+                if workflow is None:
                     return {'error': 'Workflow not found', 'honest_assessment': True}
                 
-                workflow = self.active_workflows[workflow_id]
                 report = {
                     'workflow_id': workflow_id,
-                    'description': workflow['description'],
-                    'status': workflow['status'],
-                    'progress_percent': workflow.get('progress', 0.0),
-                    'created_at': workflow['created_at'].isoformat(),
-                    'last_updated': workflow.get('last_updated', workflow['created_at']).isoformat(),
+                    'description': workflow.description,
+                    'status': workflow.status,
+                    'progress_percent': workflow.progress,
+                    'created_at': workflow.created_datetime.isoformat(),
+                    'last_updated': workflow.last_updated_datetime.isoformat(),
                     'honest_assessment': True
                 }
+                if workflow.task_plan is not None:
+                    report['task_plan'] = self._full_task_plan(workflow_id, workflow)
             else:
-                # Overall system report
-                total_workflows = len(self.active_workflows)
-                completed_workflows = len([w for w in self.active_workflows.values() if w.get('progress', 0) >= 100])
-                
-                session_duration = datetime.now() - self.session_start
-                
-                report = {
-                    'session_duration_minutes': round(session_duration.total_seconds() / 60, 1),
-                    'total_workflows': total_workflows,
-                    'completed_workflows': completed_workflows,
-                    'active_workflows': total_workflows - completed_workflows,
-                    'system_status': 'running_honestly',
-                    'honest_assessment': True,
-                    'no_fake_metrics': True,
-                    'transparency_note': 'All metrics are based on actual usage, no simulated improvements'
-                }
+                # Overall system report - constant time, read from running aggregates
+                report = self.system_report(self.active_workflows.aggregates, self.session_start)
+                if include_distributions:
+                    report['distributions'] = self._distributions()
             
             # Get honest metrics from framework
-            metrics_data = self.metrics.get_honest_summary()
-            report['metrics'] = metrics_data
+            report['metrics'] = self._metrics_summary()
             
             return report
             
@@ -242,6 +929,119 @@ class PowerModeHonest:
             self.logger.error(f"Error generating report: {e}")
             return {'error': str(e), 'honest_assessment': True}
     
+    def _distributions(self) -> Dict[str, Any]:
+        """Vectorized distributions over every workflow (columns attached on first use)"""
+        if self._analytics is None:
+            try:
+                from core.analytics import ProgressColumns
+            except ImportError:
+                return {'error': 'Distributions require numpy (pip install numpy)', 'honest_assessment': True}
+            self._analytics = ProgressColumns.attach(self.active_workflows)
+        return self._analytics.summary()
+    
+    @staticmethod
+    def system_report(aggregates: WorkflowAggregates, session_start: datetime) -> Dict[str, Any]:
+        """Overall report from workflow aggregates (also used to merge shard aggregates)"""
+        session_duration = datetime.now() - session_start
+        return {
+            'session_duration_minutes': round(session_duration.total_seconds() / 60, 1),
+            'total_workflows': aggregates.total,
+            'completed_workflows': aggregates.completed,
+            'active_workflows': aggregates.active,
+            'workflows_by_status': dict(aggregates.by_status),
+            'average_progress_percent': round(aggregates.average_progress, 1),
+            'progress_distribution': aggregates.summary()['progress_distribution'],
+            'system_status': 'running_honestly',
+            'honest_assessment': True,
+            'no_fake_metrics': True,
+            'transparency_note': 'All metrics are based on actual usage, no simulated improvements'
+        }
+    
+    @traced()
+    async def check_consistency(self, repair: bool = False) -> Dict[str, Any]:
+        """
+        Recompute workflow aggregates from scratch and report drift
+        
+        Full scan - meant for diagnostics, not for the dashboard poll.
+        """
+        result = self.active_workflows.verify_aggregates(repair=repair)
+        if not result['consistent']:
+            self.logger.warning(f"Workflow aggregates drifted: {result['drift']}")
+        result['honest_assessment'] = True
+        return result
+    
+    def _metrics_summary(self) -> Dict[str, Any]:
+        """Metrics framework summary plus counters from the engine's own components"""
+        metrics_data = self.metrics.get_honest_summary()
+        if self.structure_cache is not None:
+            metrics_data['structure_cache'] = self.structure_cache.stats()
+        if isinstance(self.active_workflows, TieredWorkflowStore):
+            metrics_data['storage_tiers'] = self.active_workflows.tier_stats()
+        if self.templates is not None:
+            metrics_data['templates'] = self.templates.stats()
+        metrics_data['change_feed'] = self.change_feed.stats()
+        metrics_data['concurrency'] = self.concurrency.stats()
+        metrics_data['operations'] = self.operation_metrics.summary()
+        if self.tracer.enabled:
+            metrics_data['tracing'] = self.tracer.stats()
+        if self.profiler.enabled:
+            metrics_data['profiling'] = self.profiler.stats()
+        return metrics_data
+    
+    def prometheus_metrics(self) -> str:
+        """Operation latency histograms and counters in Prometheus text format"""
+        return self.operation_metrics.render_prometheus()
+    
+    def subscribe_changes(self, max_queue: int = None, overflow: str = None,
+                          workflow_ids: Iterable[str] = None) -> Subscription:
+        """
+        Subscribe to workflow change events (see core.feed)
+        
+        Use as `async for event in subscription`; close() the subscription
+        when done.
+        """
+        return self.change_feed.subscribe(max_queue=max_queue, overflow=overflow, workflow_ids=workflow_ids)
+    
+    async def stream_changes(self, request: 'HttpRequest', writer: asyncio.StreamWriter) -> Optional['HttpResponse']:
+        """GET /events - Server-Sent Events stream of the change feed"""
+        from core.web import serve_change_stream
+        
+        return await serve_change_stream(request, writer, self.subscribe_changes)
+    
+    async def start_metrics_server(self, host: str = '127.0.0.1', port: int = 9464) -> int:
+        """
+        Serve GET /metrics and GET /events (change feed) on a local port
+        
+        Runs while the event loop runs; returns the bound port.
+        """
+        from core.web import PROMETHEUS_CONTENT_TYPE, HttpResponse, start_http_server
+        
+        async def handle(request: 'HttpRequest', writer: asyncio.StreamWriter) -> Optional['HttpResponse']:
+            if request.path == '/metrics':
+                return HttpResponse(200, self.prometheus_metrics().encode(), PROMETHEUS_CONTENT_TYPE)
+            if request.path == '/events':
+                return await self.stream_changes(request, writer)
+            return HttpResponse(404, b'Not found')
+        
+        self._metrics_server, bound_port = await start_http_server(handle, host, port)
+        self.logger.info(f"Metrics endpoint on http://{host}:{bound_port}/metrics, change feed on /events")
+        return bound_port
+    
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765) -> None:
+        """
+        Run the JSON HTTP API (see core.web.api) until SIGTERM/SIGINT
+        
+        Drains in-flight requests before returning; close() is still up to
+        the caller.
+        """
+        from core.web import ApiServer
+        
+        api = ApiServer(self, **self.config.get('api', {}))
+        bound_port = await api.start(host, port)
+        self.logger.info(f"API listening on http://{host}:{bound_port}")
+        await api.serve_forever()
+        self.logger.info(f"API stopped: {api.stats()}")
+    
     async def run_interactive_session(self):
         """
         Run interactive session for workflow organization
@@ -302,7 +1102,7 @@ class PowerModeHonest:
             elif choice == '5':
                 print(f"\n📋 Aktiva workflows ({len(self.active_workflows)}):")
                 for wf_id, wf_data in self.active_workflows.items():
-                    print(f"- {wf_id}: {wf_data['description']} ({wf_data.get('progress', 0):.1f}%)")
+                    print(f"- {wf_id}: {wf_data.description} ({wf_data.progress:.1f}%)")
             
             elif choice == '6':
                 print("\n👋 Tack för att du använde Power Mode 3.0 Honest Edition!")
@@ -315,29 +1115,116 @@ class PowerModeHonest:
 
 async def main():
     """Main entry point"""
+    import argparse
+    
     parser = argparse.ArgumentParser(description='Power Mode 3.0 Honest Edition')
-    parser.add_argument('--task', type=str, help='Task description to organize')
+    parser.add_argument('--task', type=str, action='append', help='Task description to organize (repeatable)')
     parser.add_argument('--interactive', action='store_true', help='Run interactive session')
+    parser.add_argument('--max-concurrency', type=int, default=32, help='Max workflows organized at once')
+    parser.add_argument('--processes', action='store_true', help='Break down tasks in a process pool')
+    parser.add_argument('--check-consistency', action='store_true',
+                        help='Recompute workflow aggregates and report drift, then exit')
+    parser.add_argument('--batch', type=str, metavar='PATH',
+                        help="Organize JSON lines from PATH ('-' for stdin), one JSON result per line")
+    parser.add_argument('--manage', action='store_true', help='With --batch: also run manage_tasks per item')
+    parser.add_argument('--serve', action='store_true', help='Run the JSON HTTP API until SIGTERM')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address for --serve')
+    parser.add_argument('--port', type=int, default=8765, help='Port for --serve')
+    parser.add_argument('--metrics-port', type=int, help='Also serve /metrics and /events on this port')
+    parser.add_argument('--shards', type=int, metavar='N',
+                        help='With --serve: partition workflows across N engine processes (default: 1)')
+    parser.add_argument('--distributions', action='store_true',
+                        help='Include progress distributions in the report (requires numpy)')
+    parser.add_argument('--trace', type=str, metavar='PATH',
+                        help='Record spans for every operation and component call, written to PATH on exit')
+    parser.add_argument('--trace-format', choices=('chrome', 'otlp'), default='chrome',
+                        help="Trace file format: Chrome trace events or OpenTelemetry JSON (default: chrome)")
+    parser.add_argument('--profile', type=float, nargs='?', const=0.1, metavar='RATE',
+                        help='Run this fraction of operations under cProfile (default 0.1 when given without RATE)')
+    parser.add_argument('--profile-dir', type=str, help='Directory for the <operation>.pstats files')
+    parser.add_argument('--data-dir', type=str, metavar='PATH',
+                        help='Keep workflows (SQLite + cold archive) and the log file in PATH (default: in memory)')
     
     args = parser.parse_args()
+    if args.profile is not None and not 0 < args.profile <= 1:
+        parser.error('--profile RATE must be in (0, 1]')
+    if args.shards is not None:
+        if args.shards < 1:
+            parser.error('--shards N must be at least 1')
+        if args.shards > 1 and not args.serve:
+            parser.error('--shards requires --serve')
+        if args.shards > 1 and args.metrics_port is not None:
+            parser.error('--metrics-port is not available with --shards (the API serves /metrics and /events)')
+    
+    # Initialize system - one-shot runs skip preloading the workflow cache
+    config = PowerModeHonest._default_config(args.data_dir)
+    one_shot = bool(args.task or args.batch or args.check_consistency) and not (args.serve or args.interactive)
+    if one_shot and config['storage']['backend'] == 'sqlite':
+        config['storage']['warm_on_open'] = False
+    if args.trace:
+        config['tracing'].update(enabled=True, export_path=args.trace, export_format=args.trace_format)
+    if args.profile:
+        config['profiling']['sample_rate'] = args.profile
+    if args.profile_dir:
+        config['profiling']['directory'] = os.path.abspath(args.profile_dir)
+    if args.shards is not None:
+        config['shards'] = args.shards
+    
+    if args.serve and config['shards'] > 1:
+        # Every shard runs its own engine and log file - the parent only routes
+        configure_logging(**dict(config['logging'], file=None))
+        router = PowerModeHonest.sharded(config['shards'], config)
+        await router.start()
+        try:
+            await router.serve(args.host, args.port)
+        finally:
+            await router.close()
+            shutdown_logging()
+        return
+    
+    power_mode = PowerModeHonest(config)
     
-    # Initialize system
-    power_mode = PowerModeHonest()
-    
-    if args.interactive or not args.task:
-        # Run interactive session
-        await power_mode.run_interactive_session()
-    else:
-        # Process single task
-        print(f"🎯 Organiserar workflow för: {args.task}")
-        result = await power_mode.organize_workflow(args.task)
-        print("\n📊 Resultat:")
-        print(json.dumps(result, indent=2, default=str))
-        
-        # Generate report
-        report = await power_mode.generate_report()
-        print("\n📋 Ärlig rapport:")
-        print(json.dumps(report, indent=2, default=str))
+    try:
+        if args.metrics_port is not None:
+            await power_mode.start_metrics_server(args.host, args.metrics_port)
+        
+        if args.serve:
+            await power_mode.serve(args.host, args.port)
+        elif args.batch:
+            summary = await power_mode.run_batch(
+                args.batch, manage=args.manage, max_concurrency=args.max_concurrency, use_processes=args.processes
+            )
+            # stdout carries only results, so the summary goes to stderr
+            print(json.dumps({'summary': summary}, default=str), file=sys.stderr)
+        elif args.check_consistency:
+            result = await power_mode.check_consistency()
+            print(json.dumps(result, indent=2, default=str))
+        elif args.interactive or not args.task:
+            # Run interactive session
+            await power_mode.run_interactive_session()
+        elif len(args.task) == 1:
+            # Process single task
+            print(f"🎯 Organiserar workflow för: {args.task[0]}")
+            result = await power_mode.organize_workflow(args.task[0])
+            print("\n📊 Resultat:")
+            print(json.dumps(result, indent=2, default=str))
+        else:
+            # Process several tasks as one batch
+            print(f"🎯 Organiserar {len(args.task)} workflows")
+            results = await power_mode.organize_workflows(
+                args.task, max_concurrency=args.max_concurrency, use_processes=args.processes
+            )
+            print("\n📊 Resultat:")
+            print(json.dumps(results, indent=2, default=str))
+        
+        if args.task and not (args.serve or args.batch or args.interactive or args.check_consistency):
+            # Generate report
+            report = await power_mode.generate_report(include_distributions=args.distributions)
+            print("\n📋 Ärlig rapport:")
+            print(json.dumps(report, indent=2, default=str))
+    finally:
+        power_mode.close()
+        shutdown_logging()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+"""
+Shared fixtures: engines wired to test doubles
+
+core.workflow, core.tasks and core.metrics are not part of this package,
+so every engine built here gets stand-ins for them. Engines keep their
+files (SQLite, logs, cold archive) under pytest's tmp_path.
+"""
+
+import asyncio
+import os
+import random
+import sys
+from typing import Any, Callable, Dict, List
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from main import PowerModeHonest  # noqa: E402
+
+
+class ChainOrganizer:
+    """Organizer double: tasks t0..tN-1 where each task depends on the previous one"""
+
+    def __init__(self, tasks: int = 5):
+        self.tasks = tasks
+
+    async def create_structure(self, task_description: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'workflow_type': 'development',
+            'tasks': [
+                {'id': f"t{i}", 'name': f"Step {i}", 'dependencies': [f"t{i - 1}"] if i else [],
+                 'estimated_effort': 1 + i % 3}
+                for i in range(self.tasks)
+            ]
+        }
+
+
+class SlowTaskManager:
+    """Task manager double that yields to the event loop a random number of times"""
+
+    async def prioritize_tasks(self, tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        for _ in range(random.randint(0, 5)):
+            await asyncio.sleep(0)
+        return {'tasks': list(tasks)}
+
+
+class RecordingMetrics:
+    """Metrics double: records every call, answers each with an empty dict"""
+
+    def __init__(self):
+        self.calls: List[tuple] = []
+
+    def __getattr__(self, name: str) -> Callable[..., Dict[str, Any]]:
+        def record(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+            self.calls.append((name, args))
+            return {}
+        return record
+
+
+class StubEngine(PowerModeHonest):
+    """Engine with the doubles built in, for worker processes that construct their own engine"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+        self.workflow_organizer = ChainOrganizer()
+        self.task_manager = SlowTaskManager()
+        self.metrics = RecordingMetrics()
+
+
+def engine_config(directory: str, storage: Dict[str, Any] = None) -> Dict[str, Any]:
+    config = PowerModeHonest._default_config()
+    config['storage'] = storage or {'backend': 'memory'}
+    config['tiering'] = {'enabled': False}
+    config['structure_cache'] = {'enabled': False}
+    config['logging'] = {'level': 'WARNING', 'file': os.path.join(directory, 'engine.log'), 'console': False}
+    config['profiling']['directory'] = os.path.join(directory, 'profiles')
+    return config
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    """Build engines with doubles injected; all of them are closed after the test"""
+    engines = []
+
+    def build(config: Dict[str, Any] = None, tasks: int = 5) -> PowerModeHonest:
+        engine = PowerModeHonest(config or engine_config(str(tmp_path)))
+        engine.workflow_organizer = ChainOrganizer(tasks)
+        engine.task_manager = SlowTaskManager()
+        engine.metrics = RecordingMetrics()
+        engines.append(engine)
+        return engine
+
+    yield build
+    for engine in engines:
+        engine.close()
@@ -0,0 +1,81 @@
+"""
+Running aggregates: every write keeps them equal to a full recount, and
+check_consistency finds (and repairs) drift
+"""
+
+import os
+
+import pytest
+
+from core.storage import InMemoryWorkflowStore, SQLiteWorkflowStore, WorkflowRecord
+from core.storage.aggregates import WorkflowAggregates
+
+
+def _store(backend: str, directory: str):
+    if backend == 'sqlite':
+        return SQLiteWorkflowStore(os.path.join(directory, 'aggregates.db'), batch_size=3, cache_size=2)
+    return InMemoryWorkflowStore()
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_aggregates_follow_puts_updates_and_deletes(tmp_path, backend):
+    store = _store(backend, str(tmp_path))
+    for i in range(10):
+        store.put(f"w{i}", WorkflowRecord(f"Workflow {i}", {'tasks': []}))
+    store.update('w0', progress=100.0)
+    store.update('w1', progress=45.0, status='task_managed')
+    store.update('w2', progress=100.0)
+    store.update('w2', progress=30.0)
+    store.delete('w3')
+
+    summary = store.aggregates.summary()
+
+    assert (summary['total'], summary['completed'], summary['active']) == (9, 1, 8)
+    assert summary['by_status'] == {'organized': 8, 'task_managed': 1}
+    assert summary['average_progress_percent'] == round(175 / 9, 1)
+    assert summary['progress_distribution']['100'] == 1
+    assert summary['progress_distribution']['40-50'] == 1
+    assert store.verify_aggregates() == {'consistent': True, 'drift': {}, 'repaired': False}
+    store.close()
+
+
+def test_sqlite_aggregates_survive_a_reopen(tmp_path):
+    store = _store('sqlite', str(tmp_path))
+    for i in range(5):
+        store.put(f"w{i}", WorkflowRecord(f"Workflow {i}", {'tasks': []}, progress=i * 25.0))
+    store.close()
+
+    reopened = _store('sqlite', str(tmp_path))
+
+    assert reopened.count_completed() == 1
+    assert reopened.aggregates.summary()['average_progress_percent'] == 50.0
+    assert reopened.verify_aggregates()['consistent']
+    reopened.close()
+
+
+def test_merge_adds_tiers_together():
+    hot = WorkflowAggregates.from_workflows([WorkflowRecord('Open', {}, progress=20.0)])
+    cold = WorkflowAggregates.from_workflows([WorkflowRecord('Done', {}, progress=100.0)] * 3)
+
+    hot.merge(cold)
+
+    assert (hot.total, hot.completed, hot.average_progress) == (4, 3, 80.0)
+
+
+@pytest.mark.asyncio
+async def test_check_consistency_reports_and_repairs_drift(make_engine):
+    engine = make_engine(tasks=2)
+    workflow_id = (await engine.organize_workflow('Release'))['workflow_id']
+    await engine.mark_completed(workflow_id, ['t0', 't1'])
+    assert (await engine.check_consistency())['consistent']
+
+    engine.active_workflows.aggregates.add('organized', 0.0)  # A write the store never saw
+
+    result = await engine.check_consistency()
+    assert not result['consistent'] and not result['repaired']
+    assert result['drift']['total'] == {'running': 2, 'recomputed': 1}
+
+    assert (await engine.check_consistency(repair=True))['repaired']
+    assert (await engine.check_consistency())['consistent']
+    report = await engine.generate_report()
+    assert (report['total_workflows'], report['completed_workflows']) == (1, 1)
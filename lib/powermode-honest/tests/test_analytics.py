@@ -0,0 +1,96 @@
+"""
+Columnar analytics: binned percentiles agree with exact ones, and the
+columns follow every store write
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from core.analytics import DAY_MS, HOUR_MS, ProgressColumns
+from core.storage import InMemoryWorkflowStore, WorkflowRecord
+
+
+def _record(progress: float = 0.0, status: str = 'organized', created_at: int = 0, last_updated: int = 0,
+            tasks: int = 0) -> WorkflowRecord:
+    return WorkflowRecord('Workflow', {'tasks': [{}] * tasks}, status=status, progress=progress,
+                          created_at=created_at, last_updated=last_updated)
+
+
+def test_percentiles_match_nearest_rank_on_the_bin_grid():
+    random.seed(5)
+    store = InMemoryWorkflowStore()
+    # Progress on the 0.1-point grid, so binning loses nothing
+    values = [random.randint(0, 1000) / 10 for _ in range(20_000)]
+    for i, progress in enumerate(values):
+        store.put(f"w{i}", _record(progress))
+    columns = ProgressColumns.attach(store)
+
+    percentiles = columns.progress_percentiles((1, 50, 90, 99, 100))
+
+    for percent in (1, 50, 90, 99, 100):
+        exact = np.percentile(values, percent, method='inverted_cdf')
+        assert percentiles[f"p{percent}"] == pytest.approx(exact, abs=0.1)
+    histogram = columns.progress_histogram()
+    assert sum(histogram.values()) == len(values)
+    assert histogram['100'] == values.count(100.0)
+
+
+def test_columns_follow_updates_and_deletes():
+    store = InMemoryWorkflowStore()
+    columns = ProgressColumns.attach(store)
+    for i in range(3000):  # Past the initial capacity
+        store.put(f"w{i}", _record(tasks=i % 4))
+    for i in range(0, 3000, 2):
+        store.update(f"w{i}", progress=100.0, status='task_managed')
+    for i in range(1, 1001, 2):
+        store.delete(f"w{i}")
+    store.put('new', _record(progress=50.0))  # Reuses a deleted row
+
+    assert len(columns) == 2501
+    assert columns._size == 3000
+    by_status = columns.by_status()
+    assert by_status['task_managed'] == {'count': 1500, 'average_progress_percent': 100.0, 'average_tasks': 1.0}
+    assert by_status['organized']['count'] == 1001
+    assert columns.progress_percentiles((50,)) == {'p50': 100.0}
+    assert columns.task_count_distribution()['max'] == 3
+
+
+def test_age_curve_and_staleness():
+    now = 100 * DAY_MS
+    store = InMemoryWorkflowStore()
+    store.put('fresh', _record(created_at=now - HOUR_MS // 2))
+    store.put('day_old', _record(progress=50.0, created_at=now - 2 * DAY_MS, last_updated=now - 3 * HOUR_MS))
+    store.put('done', _record(progress=100.0, created_at=now - 60 * DAY_MS))
+    columns = ProgressColumns.attach(store)
+
+    curve = columns.progress_by_age(now)
+    staleness = columns.staleness_hours((50, 100), now=now)
+
+    assert (curve['<1h']['count'], curve['1-7d']['average_progress_percent'], curve['>30d']['completed_percent']) == (
+        1, 50.0, 100.0
+    )
+    assert sum(bucket['count'] for bucket in curve.values()) == 3
+    assert staleness == {'p50': 0.0, 'p100': 3.0}  # The finished workflow is left out
+
+
+def test_empty_columns():
+    columns = ProgressColumns.attach(InMemoryWorkflowStore())
+
+    assert columns.progress_percentiles() == {}
+    assert columns.summary()['workflows'] == 0
+
+
+@pytest.mark.asyncio
+async def test_report_distributions_stay_current(make_engine):
+    engine = make_engine(tasks=2)
+    workflow_ids = [result['workflow_id'] for result in await engine.organize_workflows(['One', 'Two'])]
+    first = (await engine.generate_report(include_distributions=True))['distributions']
+
+    await engine.mark_completed(workflow_ids[0], ['t0', 't1'])
+    second = (await engine.generate_report(include_distributions=True))['distributions']
+
+    assert first['progress_histogram']['100'] == 0
+    assert second['progress_histogram']['100'] == 1
+    assert second['progress_percentiles']['p99'] == 100.0
@@ -0,0 +1,103 @@
+"""
+JSON API: progress deltas apply as one update, bad input is a 400 and
+drain() leaves no request running
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Tuple
+
+import pytest
+import pytest_asyncio
+
+from core.web.api import ApiServer
+
+
+async def _post(port: int, path: str, payload: Any) -> Tuple[int, Dict[str, Any]]:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode()
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+    )
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split(b' ')[1]), json.loads(body)
+
+
+@pytest_asyncio.fixture
+async def api(make_engine):
+    server = ApiServer(make_engine(tasks=4), drain_timeout_seconds=0.1)
+    await server.start(port=0)
+    yield server
+    await server.drain()
+
+
+@pytest.mark.asyncio
+async def test_complete_and_reopen_are_one_update(api):
+    workflow_id = (await api.engine.organize_workflow('Release'))['workflow_id']
+    await api.engine.mark_completed(workflow_id, ['t0'])
+    version = api.engine.active_workflows.get(workflow_id).version
+
+    status, result = await _post(api.port, '/track-progress', {
+        'workflow_id': workflow_id, 'complete': ['t1', 't2'], 'reopen': ['t0']
+    })
+
+    assert status == 200
+    assert (result['completed_tasks'], result['changed_tasks']) == (2, 3)
+    assert api.engine.active_workflows.get(workflow_id).version == version + 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_reopen_id_rejects_the_completions_too(api):
+    workflow_id = (await api.engine.organize_workflow('Release'))['workflow_id']
+
+    status, result = await _post(api.port, '/track-progress', {
+        'workflow_id': workflow_id, 'complete': ['t1'], 'reopen': ['nope']
+    })
+
+    assert status == 422
+    assert result['unknown_tasks'] == ['nope']
+    assert api.engine.active_workflows.get(workflow_id).completed_mask == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fields', [
+    {'complete': 't1'},
+    {'complete': ['t1'], 'reopen': [0]},
+    {'reopen': None},
+    {'completed_tasks': {'t1': True}},
+])
+async def test_task_lists_must_be_lists_of_strings(api, fields):
+    workflow_id = (await api.engine.organize_workflow('Release'))['workflow_id']
+
+    status, result = await _post(api.port, '/track-progress', {'workflow_id': workflow_id, **fields})
+
+    assert status == 400
+    assert 'list of task ID strings' in result['error']
+    assert api.engine.active_workflows.get(workflow_id).version == 1
+
+
+@pytest.mark.asyncio
+async def test_drain_timeout_cancels_running_requests(api):
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    class HangingOrganizer:
+        async def create_structure(self, task_description: str, context: Dict[str, Any]) -> Dict[str, Any]:
+            started.set()
+            try:
+                await asyncio.Event().wait()
+            finally:
+                cancelled.set()
+
+    api.engine.workflow_organizer = HangingOrganizer()
+    reader, writer = await asyncio.open_connection('127.0.0.1', api.port)
+    body = b'{"description": "Never ends"}'
+    writer.write(f"POST /organize HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await asyncio.wait_for(started.wait(), 5)
+
+    assert not await api.drain()
+    assert cancelled.is_set()
+    assert api.stats()['pending'] == 0
+    assert await reader.read() == b''  # Closed without a response
+    writer.close()
@@ -0,0 +1,85 @@
+"""
+Batch organize: bounded fan-out, input order and per-item failures
+"""
+
+import asyncio
+from typing import Any, Dict
+
+import pytest
+
+from core.batch import bounded_as_completed
+
+
+class CountingOrganizer:
+    """Organizer double that records how many breakdowns run at once"""
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+
+    async def create_structure(self, task_description: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        if 'fail' in task_description:
+            raise RuntimeError(f"cannot break down {task_description!r}")
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.001)
+        self.running -= 1
+        return {'workflow_type': 'development', 'tasks': [{'id': 't0', 'dependencies': []}]}
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded_and_results_keep_input_order(make_engine):
+    engine = make_engine()
+    engine.workflow_organizer = organizer = CountingOrganizer()
+
+    results = await engine.organize_workflows([f"Workflow {i}" for i in range(50)], max_concurrency=4)
+
+    assert organizer.peak == 4
+    assert [result['index'] for result in results] == list(range(50))
+    assert len({result['workflow_id'] for result in results}) == 50
+    assert len(engine.active_workflows) == 50
+
+
+@pytest.mark.asyncio
+async def test_failing_item_does_not_abort_the_batch(make_engine):
+    engine = make_engine()
+    engine.workflow_organizer = CountingOrganizer()
+
+    results = await engine.organize_workflows(['first', ('please fail', {}), 'third'], max_concurrency=2)
+
+    assert 'error' in results[1] and results[1]['index'] == 1
+    assert [('workflow_id' in result) for result in results] == [True, False, True]
+    assert len(engine.active_workflows) == 2
+
+
+@pytest.mark.asyncio
+async def test_input_is_consumed_lazily():
+    pulled = 0
+
+    def items():
+        nonlocal pulled
+        for i in range(100):
+            pulled += 1
+            yield i
+
+    async def worker(item: int) -> int:
+        await asyncio.sleep(0)
+        return item * 2
+
+    seen = []
+    async for index, result in bounded_as_completed(items(), worker, max_concurrency=3):
+        # Never more than the window ahead of what has been handed back
+        assert pulled <= len(seen) + 3
+        seen.append((index, result))
+
+    assert sorted(seen) == [(i, i * 2) for i in range(100)]
+
+
+@pytest.mark.asyncio
+async def test_zero_concurrency_is_rejected():
+    async def worker(item: Any) -> Any:
+        return item
+
+    with pytest.raises(ValueError):
+        async for _ in bounded_as_completed([1], worker, max_concurrency=0):
+            pass
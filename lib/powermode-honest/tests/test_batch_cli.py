@@ -0,0 +1,75 @@
+"""
+--batch: JSON-lines in, one result line per item out
+"""
+
+import io
+import json
+import os
+
+import pytest
+
+from core.batch import parse_batch_line, read_lines
+
+
+def _write_lines(path: str, lines) -> str:
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return path
+
+
+def test_parse_batch_line():
+    assert parse_batch_line('"Ship release"') == ('Ship release', {}, None)
+    assert parse_batch_line('{"description": "Ship", "context": {"team": 2}, "id": 7}') == ('Ship', {'team': 2}, 7)
+    for bad in ('[1, 2]', '{"context": {}}', '{"description": 5}'):
+        with pytest.raises(ValueError):
+            parse_batch_line(bad)
+    with pytest.raises(ValueError):
+        parse_batch_line('not json')
+
+
+@pytest.mark.asyncio
+async def test_read_lines_streams_a_large_file(tmp_path):
+    path = _write_lines(os.path.join(tmp_path, 'big.jsonl'), (f'"item {i}"' for i in range(5000)))
+
+    lines = [line async for line in read_lines(path, max_buffered=8)]
+
+    assert len(lines) == 5000 and lines[-1] == '"item 4999"\n'
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_every_line(make_engine, tmp_path):
+    engine = make_engine(tasks=3)
+    path = _write_lines(os.path.join(tmp_path, 'batch.jsonl'), [
+        '"Plain description"',
+        '',
+        '{"description": "With id", "id": "client-1"}',
+        '{broken',
+        '{"description": "Another", "context": {"priority": "high"}}',
+    ])
+    output = io.StringIO()
+
+    summary = await engine.run_batch(path, output, manage=True, max_concurrency=2)
+
+    results = {result['line']: result for result in map(json.loads, output.getvalue().splitlines())}
+    assert sorted(results) == [1, 3, 4, 5]
+    assert results[3]['id'] == 'client-1'
+    assert 'error' in results[4]
+    assert all(results[line]['task_plan']['ready_tasks'] == ['t0'] for line in (1, 3, 5))
+    assert {key: summary[key] for key in ('items', 'organized', 'managed', 'failed')} == {
+        'items': 4, 'organized': 3, 'managed': 3, 'failed': 1
+    }
+    assert len(engine.active_workflows) == 3
+
+
+@pytest.mark.asyncio
+async def test_batch_without_manage_only_organizes(make_engine, tmp_path):
+    engine = make_engine()
+    path = _write_lines(os.path.join(tmp_path, 'batch.jsonl'), [f'"Workflow {i}"' for i in range(200)])
+    output = io.StringIO()
+
+    summary = await engine.run_batch(path, output, max_concurrency=8)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(result['line'] for result in results) == list(range(1, 201))
+    assert all('task_plan' not in result for result in results)
+    assert (summary['organized'], summary['managed'], summary['failed']) == (200, 0, 0)
@@ -0,0 +1,116 @@
+"""
+Structure cache: LRU, TTL and byte budget eviction, and single-flight loading
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from core import cache as cache_module
+from core.cache import StructureCache
+
+
+def _size(structure) -> int:
+    return len(json.dumps(structure, separators=(',', ':')))
+
+
+async def _load(cache: StructureCache, description: str, structure=None):
+    async def factory():
+        return structure if structure is not None else {'tasks': [description]}
+    return await cache.get_or_create(description, None, factory)
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entry_is_evicted():
+    cache = StructureCache(max_entries=2)
+    await _load(cache, 'first')
+    await _load(cache, 'second')
+    await _load(cache, 'first')  # Now 'second' is the oldest
+
+    await _load(cache, 'third')
+
+    assert cache.evictions['lru'] == 1
+    assert cache.make_key('second', None) not in cache._entries
+    assert cache.make_key('first', None) in cache._entries
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+@pytest.mark.asyncio
+async def test_expired_entry_is_rebuilt(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    cache = StructureCache(ttl_seconds=10)
+    await _load(cache, 'release')
+
+    now[0] += 9
+    await _load(cache, 'release')
+    now[0] += 2
+    await _load(cache, 'release')
+
+    assert (cache.hits, cache.misses, cache.evictions['ttl']) == (1, 2, 1)
+    assert cache.stats()['bytes'] == _size({'tasks': ['release']})
+
+
+@pytest.mark.asyncio
+async def test_byte_budget_evicts_oldest_and_skips_oversized():
+    structure = {'tasks': ['x' * 40]}
+    cache = StructureCache(max_bytes=_size(structure) * 2)
+    for description in ('one', 'two', 'three'):
+        await _load(cache, description, structure)
+
+    assert (len(cache._entries), cache.evictions['size']) == (2, 1)
+    assert cache.stats()['bytes'] == _size(structure) * 2
+
+    await _load(cache, 'huge', {'tasks': ['x' * 1000]})
+    assert cache.make_key('huge', None) not in cache._entries
+
+
+def test_overwrite_releases_the_old_size():
+    cache = StructureCache()
+    key = cache.make_key('release', None)
+
+    cache._store(key, {'tasks': ['a' * 100]})
+    cache._store(key, {'tasks': ['b']})
+
+    assert cache.stats()['bytes'] == _size({'tasks': ['b']})
+    assert cache.stats()['entries'] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_breakdown():
+    cache = StructureCache()
+    calls = 0
+    release = asyncio.Event()
+
+    async def factory():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {'tasks': [{'id': 't0'}]}
+
+    callers = [asyncio.create_task(cache.get_or_create('Release v2', None, factory)) for _ in range(10)]
+    await asyncio.sleep(0)
+    callers[0].cancel()  # One caller leaving does not abort the shared breakdown
+    release.set()
+    results = await asyncio.gather(*callers[1:])
+
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert (cache.misses, cache.coalesced) == (1, 9)
+    with pytest.raises(TypeError):
+        results[0]['tasks'] = []
+
+
+@pytest.mark.asyncio
+async def test_failed_breakdown_is_not_cached():
+    cache = StructureCache()
+
+    async def failing():
+        raise RuntimeError('organizer down')
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_create('Release', None, failing)
+
+    assert await _load(cache, 'Release') == {'tasks': ('Release',)}
+    assert cache.misses == 2
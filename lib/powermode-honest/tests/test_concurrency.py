@@ -0,0 +1,124 @@
+"""
+Concurrent updates must not lose writes
+
+Thousands of coroutines complete tasks of the same workflows in random
+order while manage_tasks awaits the task manager on them. Every write has
+to land and bump the version exactly once, against the in-memory store
+and against SQLite with a cache far smaller than the working set (records
+are reloaded as new objects between reads and writes).
+"""
+
+import asyncio
+import os
+import random
+from typing import Any, Dict
+
+import pytest
+
+from conftest import engine_config
+from core.concurrency import WorkflowConcurrency
+from core.storage import InMemoryWorkflowStore, VersionConflict, WorkflowRecord
+
+WORKFLOWS = 40
+TASKS = 10
+MANAGE_CALLS = 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+async def test_concurrent_engine_updates_are_not_lost(make_engine, tmp_path, backend):
+    random.seed(1)
+    storage = {'backend': 'memory'}
+    if backend == 'sqlite':
+        storage = {'backend': 'sqlite', 'path': os.path.join(tmp_path, 'stress.db'),
+                   'batch_size': 16, 'cache_size': WORKFLOWS // 4}
+    engine = make_engine(engine_config(str(tmp_path), storage), tasks=TASKS)
+
+    results = await engine.organize_workflows([f"Stress workflow {i}" for i in range(WORKFLOWS)])
+    workflow_ids = [result['workflow_id'] for result in results]
+    operations = []
+    for workflow_id in workflow_ids:
+        operations += [engine.mark_completed(workflow_id, [f"t{i}"]) for i in range(TASKS)]
+        operations += [engine.manage_tasks(workflow_id) for _ in range(MANAGE_CALLS)]
+    random.shuffle(operations)
+
+    outcomes = await asyncio.gather(*operations)
+
+    assert [outcome for outcome in outcomes if 'error' in outcome] == []
+    assert engine.concurrency.stats()['retries_exhausted'] == 0
+    for workflow_id in workflow_ids:
+        workflow = engine.active_workflows.get(workflow_id)
+        assert workflow.progress == 100
+        # One write for organize, one per completed task and one per manage_tasks call
+        assert workflow.version == 1 + TASKS + MANAGE_CALLS
+        assert workflow.task_plan['ready_tasks'] == []
+        assert workflow.task_plan['remaining_effort'] == 0
+
+
+async def _increment_naively(store: InMemoryWorkflowStore, workflow_id: str) -> None:
+    value = store.get(workflow_id).progress
+    await asyncio.sleep(0)
+    store.update(workflow_id, progress=value + 1)
+
+
+def _counters(records: int):
+    store = InMemoryWorkflowStore()
+    workflow_ids = [f"counter_{i}" for i in range(records)]
+    for workflow_id in workflow_ids:
+        store.put(workflow_id, WorkflowRecord(workflow_id, {'tasks': []}))
+    return store, workflow_ids
+
+
+@pytest.mark.asyncio
+async def test_read_await_write_without_control_loses_updates():
+    store, workflow_ids = _counters(5)
+
+    await asyncio.gather(*(_increment_naively(store, workflow_ids[i % 5]) for i in range(500)))
+
+    assert sum(store.get(workflow_id).progress for workflow_id in workflow_ids) < 500
+
+
+@pytest.mark.asyncio
+async def test_optimistic_updates_retry_conflicts_and_lose_nothing():
+    store, workflow_ids = _counters(5)
+    concurrency = WorkflowConcurrency(store)
+
+    async def increment(workflow: WorkflowRecord) -> Dict[str, Any]:
+        value = workflow.progress
+        await asyncio.sleep(0)
+        return {'progress': value + 1}
+
+    await asyncio.gather(*(
+        concurrency.update(workflow_ids[i % 5], increment, max_retries=500) for i in range(500)
+    ))
+
+    assert sum(store.get(workflow_id).progress for workflow_id in workflow_ids) == 500
+    assert concurrency.conflicts > 0
+    assert concurrency.exhausted == 0
+    assert all(store.get(workflow_id).version == 1 + 100 for workflow_id in workflow_ids)
+
+
+@pytest.mark.asyncio
+async def test_striped_lock_serializes_read_await_write():
+    store, workflow_ids = _counters(5)
+    concurrency = WorkflowConcurrency(store, lock_stripes=2)
+
+    async def locked(workflow_id: str) -> None:
+        async with concurrency.lock(workflow_id):
+            await _increment_naively(store, workflow_id)
+
+    await asyncio.gather(*(locked(workflow_ids[i % 5]) for i in range(500)))
+
+    assert sum(store.get(workflow_id).progress for workflow_id in workflow_ids) == 500
+
+
+def test_stale_expected_version_raises_conflict():
+    store, (workflow_id, *_) = _counters(1)
+    version = store.get(workflow_id).version
+    store.update(workflow_id, expected_version=version, progress=10)
+
+    with pytest.raises(VersionConflict) as conflict:
+        store.update(workflow_id, expected_version=version, progress=20)
+
+    assert conflict.value.actual_version == version + 1
+    assert store.get(workflow_id).progress == 10
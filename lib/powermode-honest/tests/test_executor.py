@@ -0,0 +1,156 @@
+"""
+Task executor: dependency and critical-path order, per-resource limits,
+and failures that block only their dependents
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.executor import TaskExecutor
+from core.graph import CycleError
+
+
+def _task(task_id: str, dependencies=(), effort: float = 1, **fields):
+    return {'id': task_id, 'dependencies': list(dependencies), 'estimated_effort': effort, **fields}
+
+
+@pytest.mark.asyncio
+async def test_dependencies_first_then_longest_chain():
+    executor = TaskExecutor(resource_limits={'cpu': 1})
+    started = []
+
+    async def record(task):
+        started.append(task['id'])
+
+    executor.register('*', record)
+    tasks = [
+        _task('short'),
+        _task('head'),
+        _task('tail', ['head'], effort=5),
+        _task('after_all', ['short', 'tail']),
+    ]
+
+    result = await executor.run(tasks)
+
+    assert started == ['head', 'tail', 'short', 'after_all']
+    assert result['completed'] == started
+    assert result['failed'] == {} and result['blocked'] == []
+
+
+@pytest.mark.asyncio
+async def test_each_resource_has_its_own_limit():
+    executor = TaskExecutor(resource_limits={'cpu': 1, 'network': 3})
+    running = {'cpu': 0, 'network': 0}
+    overlapped = False
+
+    async def work(task):
+        nonlocal overlapped
+        running[task['resource']] += 1
+        overlapped = overlapped or all(running.values())
+        await asyncio.sleep(0.005)
+        running[task['resource']] -= 1
+        return task['id']
+
+    executor.register('*', work)
+    tasks = [_task(f"n{i}", resource='network') for i in range(9)] + [_task(f"c{i}", resource='cpu') for i in range(3)]
+
+    result = await executor.run(tasks)
+
+    assert result['peak_concurrency'] == {'cpu': 1, 'memory': 0, 'network': 3, 'storage': 0}
+    assert overlapped  # A busy network pool does not hold back the cpu tasks
+    assert result['results'] == {task['id']: task['id'] for task in tasks}
+
+
+@pytest.mark.asyncio
+async def test_failure_blocks_only_dependents():
+    executor = TaskExecutor()
+
+    async def work(task):
+        if task['id'] == 'broken':
+            raise RuntimeError('disk full')
+
+    executor.register('*', work)
+    tasks = [_task('broken'), _task('needs_broken', ['broken']), _task('later', ['needs_broken']), _task('other')]
+
+    result = await executor.run(tasks)
+
+    assert result['failed'] == {'broken': 'RuntimeError: disk full'}
+    assert result['blocked'] == ['needs_broken', 'later']
+    assert result['completed'] == ['other']
+
+
+@pytest.mark.asyncio
+async def test_stop_on_failure_dispatches_nothing_more():
+    executor = TaskExecutor(resource_limits={'cpu': 1})
+
+    async def work(task):
+        if task['id'] == 'first':
+            raise RuntimeError('boom')
+
+    executor.register('*', work)
+
+    result = await executor.run([_task('first', effort=5), _task('second')], stop_on_failure=True)
+
+    assert (result['completed'], result['blocked']) == ([], ['second'])
+
+
+@pytest.mark.asyncio
+async def test_handler_lookup_and_thread_mode():
+    executor = TaskExecutor()
+    threads = {}
+
+    def blocking(task):
+        threads[task['id']] = threading.current_thread().name
+        time.sleep(0.001)
+
+    async def specific(task):
+        threads[task['id']] = 'loop'
+
+    executor.register('build', blocking)
+    executor.register('t2', specific)
+    try:
+        await executor.run([_task('t1', type='build'), _task('t2', type='build')])
+    finally:
+        executor.close()
+
+    assert threads['t1'].startswith('task-executor')
+    assert threads['t2'] == 'loop'
+
+
+@pytest.mark.asyncio
+async def test_plan_errors_are_raised_before_anything_runs():
+    executor = TaskExecutor()
+    ran = []
+
+    async def work(task):
+        ran.append(task['id'])
+
+    executor.register('known', work)
+    with pytest.raises(KeyError):
+        await executor.run([_task('a', handler='known'), _task('b')])
+    executor.register('*', work)
+    with pytest.raises(CycleError):
+        await executor.run([_task('a', ['b']), _task('b', ['a'])])
+    assert ran == []
+
+
+@pytest.mark.asyncio
+async def test_execute_workflow_records_progress(make_engine):
+    engine = make_engine(tasks=4)
+    workflow_id = (await engine.organize_workflow('Release'))['workflow_id']
+    await engine.mark_completed(workflow_id, ['t0'])
+    seen = []
+
+    async def work(task):
+        seen.append(task['id'])
+
+    engine.register_task_handler('*', work)
+
+    result = await engine.execute_workflow(workflow_id)
+
+    assert seen == ['t1', 't2', 't3']
+    assert result['progress_percent'] == 100.0
+    assert engine.active_workflows.get(workflow_id).progress == 100.0
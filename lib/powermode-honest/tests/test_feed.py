@@ -0,0 +1,128 @@
+"""
+Change feed: bounded per-subscriber queues, filters, and SSE framing
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from core.feed import ChangeFeed
+from core.web.api import ApiServer
+from core.web.sse import stream_events
+
+
+def _drain(subscription):
+    events = []
+    while (event := subscription.get_nowait()) is not None:
+        events.append(event)
+    return events
+
+
+def test_publish_without_subscribers_is_free():
+    feed = ChangeFeed()
+    feed.publish('workflow_organized', 'w1')
+    assert feed.seq == 0
+
+
+def test_drop_oldest_keeps_the_newest_events():
+    feed = ChangeFeed(max_queue=3)
+    slow, fast = feed.subscribe(), feed.subscribe(max_queue=100)
+    for i in range(5):
+        feed.publish('progress_updated', f"w{i}", progress=i * 10.0)
+
+    assert [event.seq for event in _drain(slow)] == [3, 4, 5]
+    assert slow.dropped == 2
+    assert len(_drain(fast)) == 5 and fast.dropped == 0
+    assert feed.stats()['dropped'] == 2
+
+
+def test_coalesce_keeps_the_latest_event_per_workflow():
+    feed = ChangeFeed(max_queue=2, overflow='coalesce')
+    subscription = feed.subscribe()
+    for progress in (10.0, 20.0, 30.0):
+        feed.publish('progress_updated', 'w1', progress=progress)
+    feed.publish('progress_updated', 'w2', progress=5.0)
+    feed.publish('progress_updated', 'w3', progress=5.0)  # Pushes out w1
+
+    events = _drain(subscription)
+
+    assert [(event.workflow_id, event.data['progress']) for event in events] == [('w2', 5.0), ('w3', 5.0)]
+    assert (subscription.coalesced, subscription.dropped) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_filter_and_close_end_iteration():
+    feed = ChangeFeed()
+    subscription = feed.subscribe(workflow_ids=['w2'])
+    feed.publish('workflow_organized', 'w1')
+    feed.publish('workflow_organized', 'w2')
+    asyncio.get_running_loop().call_soon(feed.close)
+
+    events = [event async for event in subscription]
+
+    assert [event.workflow_id for event in events] == ['w2']
+    assert len(feed) == 0
+    with pytest.raises(ValueError):
+        feed.subscribe(overflow='block')
+
+
+class BufferWriter:
+    def __init__(self):
+        self.data = b''
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    async def drain(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_sse_frames_and_heartbeat():
+    feed = ChangeFeed()
+    subscription = feed.subscribe()
+    writer = BufferWriter()
+    stream = asyncio.create_task(stream_events(writer, subscription, heartbeat_seconds=0.01))
+    await asyncio.sleep(0.05)
+    feed.publish('progress_updated', 'w1', progress=50.0)
+    feed.close()  # Queued events are still written before the stream ends
+    await stream
+
+    head, _, body = writer.data.partition(b'\r\n\r\n')
+    assert b'Content-Type: text/event-stream' in head
+    frames = body.decode().split('\n\n')
+    assert frames[0] == ': heartbeat'
+    event = next(frame for frame in frames if frame.startswith('id: '))
+    lines = event.split('\n')
+    assert lines[:2] == ['id: 1', 'event: progress_updated']
+    data = json.loads(lines[2][len('data: '):])
+    assert data.pop('ts') > 0
+    assert data == {'seq': 1, 'type': 'progress_updated', 'workflow_id': 'w1', 'progress': 50.0}
+
+
+@pytest.mark.asyncio
+async def test_events_endpoint_streams_engine_changes(make_engine):
+    api = ApiServer(make_engine(tasks=2))
+    port = await api.start(port=0)
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b"GET /events?overflow=nope HTTP/1.1\r\n\r\n")
+        assert (await reader.readuntil(b'\r\n')).startswith(b'HTTP/1.1 400')
+        writer.close()
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b"GET /events HTTP/1.1\r\n\r\n")
+        await reader.readuntil(b'\r\n\r\n')
+        while not len(api.engine.change_feed):
+            await asyncio.sleep(0)
+        workflow_id = (await api.engine.organize_workflow('Release'))['workflow_id']
+        await api.engine.mark_completed(workflow_id, ['t0'])
+
+        frames = [(await reader.readuntil(b'\n\n')).decode() for _ in range(2)]
+        writer.close()
+    finally:
+        await api.drain()
+
+    assert [frame.split('\n')[1] for frame in frames] == ['event: workflow_organized', 'event: progress_updated']
+    assert json.loads(frames[1].split('\n')[2][6:])['progress'] == 50.0
@@ -0,0 +1,130 @@
+"""
+TaskGraph: incremental propagation agrees with a full recomputation, and
+cycles are rejected
+"""
+
+import random
+
+import pytest
+
+from core.graph import CycleError, TaskGraph
+
+
+def _tasks(*edges, effort=None):
+    """Tasks a..z with dependencies given as 'parent>child' strings"""
+    ids = sorted({task_id for edge in edges for task_id in edge.split('>')})
+    dependencies = {task_id: [] for task_id in ids}
+    for edge in edges:
+        parent, child = edge.split('>')
+        dependencies[child].append(parent)
+    effort = effort or {}
+    return [{'id': task_id, 'dependencies': dependencies[task_id], 'estimated_effort': effort.get(task_id, 1)}
+            for task_id in ids]
+
+
+def test_diamond_plan():
+    graph = TaskGraph.from_tasks(_tasks('a>b', 'a>c', 'b>d', 'c>d', effort={'b': 5}))
+
+    assert graph.topological_order()[0] == 'a'
+    assert graph.topological_order()[-1] == 'd'
+    assert graph.ready_tasks() == ['a']
+    assert graph.critical_path() == ['a', 'b', 'd']
+    assert graph.critical_path_effort() == 7
+    assert graph.remaining_effort() == 8
+
+
+def test_completion_propagates_downstream():
+    graph = TaskGraph.from_tasks(_tasks('a>b', 'a>c', 'b>d', 'c>d', effort={'b': 5}))
+
+    graph.complete(['a'])
+    assert graph.ready_tasks() == ['b', 'c']  # Largest planned downstream effort first
+    graph.complete(['b'])
+    assert graph.ready_tasks() == ['c']
+    assert graph.critical_path() == ['c', 'd']
+    assert graph.critical_path_effort() == 2
+    assert graph.remaining_effort() == 2
+
+    graph.reopen(['a'])
+    assert graph.ready_tasks() == ['a']  # c waits for a again
+    assert graph.critical_path_effort() == 3
+
+    graph.complete(['a', 'b', 'c', 'd'])
+    assert graph.ready_tasks() == []
+    assert graph.critical_path() == []
+    assert graph.remaining_effort() == 0
+
+
+def test_incremental_updates_match_a_fresh_graph():
+    rng = random.Random(7)
+    tasks = []
+    for i in range(60):
+        parents = rng.sample(range(i), min(i, rng.randint(0, 3)))
+        tasks.append({'id': f"t{i}", 'dependencies': [f"t{p}" for p in parents], 'estimated_effort': rng.randint(1, 9)})
+    graph = TaskGraph.from_tasks(tasks)
+    completed = set()
+
+    for _ in range(200):
+        task_id = f"t{rng.randrange(60)}"
+        if task_id in completed:
+            graph.reopen([task_id])
+            completed.discard(task_id)
+        else:
+            graph.complete([task_id])
+            completed.add(task_id)
+
+        fresh = TaskGraph.from_tasks(tasks)
+        fresh.complete(completed)
+        assert sorted(graph.ready_tasks()) == sorted(fresh.ready_tasks())
+        assert graph.remaining_effort() == pytest.approx(fresh.remaining_effort())
+        assert graph.critical_path_effort() == pytest.approx(fresh.critical_path_effort())
+        assert graph.downstream_effort() == pytest.approx(fresh.downstream_effort())
+
+
+def test_added_tasks_and_edges_extend_the_plan():
+    graph = TaskGraph.from_tasks(_tasks('a>b'))
+    graph.add_task('c', dependencies=['b'], effort=4)
+    graph.add_task('z', effort=1)
+    graph.add_dependency('z', 'c')
+
+    assert graph.topological_order() == ['a', 'b', 'c', 'z']
+    assert graph.critical_path() == ['a', 'b', 'c', 'z']
+    assert graph.critical_path_effort() == 7
+    assert graph.dependencies('z') == ['c']
+
+
+def test_cycle_in_structure_is_reported():
+    with pytest.raises(CycleError) as error:
+        TaskGraph.from_tasks(_tasks('a>b', 'b>c', 'c>a', 'c>d'))
+
+    assert set(error.value.cycle) >= {'a', 'b', 'c'}
+    assert 'd' not in error.value.cycle
+
+
+def test_self_dependency_is_a_cycle():
+    with pytest.raises(CycleError) as error:
+        TaskGraph.from_tasks([{'id': 'a'}, {'id': 'b', 'dependencies': ['a', 'b']}])
+
+    assert error.value.cycle == ['b', 'b']
+
+    graph = TaskGraph.from_tasks(_tasks('a>b'))
+    with pytest.raises(CycleError):
+        graph.add_dependency('b', 'b')
+    assert graph.dependencies('b') == ['a']
+
+
+def test_edge_closing_a_cycle_is_rejected_and_graph_unchanged():
+    graph = TaskGraph.from_tasks(_tasks('a>b', 'b>c'))
+
+    with pytest.raises(CycleError):
+        graph.add_dependency('a', 'c')
+
+    assert graph.dependencies('a') == []
+    assert graph.topological_order() == ['a', 'b', 'c']
+    assert graph.ready_tasks() == ['a']
+
+
+def test_missing_dependencies_are_kept_aside():
+    graph = TaskGraph.from_tasks([{'id': 'a', 'dependencies': ['ghost']}, {'id': 'b', 'dependencies': ['a']}])
+
+    assert graph.missing_dependencies == {'a': ['ghost']}
+    assert graph.ready_tasks() == ['a']
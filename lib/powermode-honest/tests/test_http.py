@@ -0,0 +1,87 @@
+"""
+HTTP parser: bad requests get an error status, never a crashed connection
+"""
+
+import asyncio
+
+import pytest
+
+from core.web.http import MAX_BODY_BYTES, HttpError, HttpResponse, read_request, start_http_server
+
+
+def _reader(data: bytes, eof: bool = True) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    if eof:
+        reader.feed_eof()
+    return reader
+
+
+@pytest.mark.asyncio
+async def test_request_with_body():
+    request = await read_request(_reader(
+        b"post /organize?x=1&x=2 HTTP/1.1\r\nContent-Length: 5\r\nConnection: close\r\n\r\nhello"
+    ))
+
+    assert (request.method, request.path, request.query) == ('POST', '/organize', {'x': '2'})
+    assert request.body == b'hello'
+    assert not request.keep_alive
+
+
+@pytest.mark.asyncio
+async def test_clean_eof_between_requests():
+    assert await read_request(_reader(b'')) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('head, status', [
+    (b"GET / HTTP/1.1\r\nHost: x", 400),  # Connection closed mid-head
+    (b"GARBAGE\r\n\r\n", 400),
+    (b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n", 400),
+    (b"POST / HTTP/1.1\r\nContent-Length: abc\r\n\r\n", 400),
+    (b"POST / HTTP/1.1\r\nContent-Length: -5\r\n\r\n", 400),
+    (b"POST / HTTP/1.1\r\nContent-Length: +5\r\n\r\n", 400),
+    (b"POST / HTTP/1.1\r\nContent-Length: 1_0\r\n\r\n", 400),
+    (f"POST / HTTP/1.1\r\nContent-Length: {MAX_BODY_BYTES + 1}\r\n\r\n".encode(), 413),
+])
+async def test_bad_requests_raise_http_errors(head, status):
+    with pytest.raises(HttpError) as error:
+        await read_request(_reader(head))
+
+    assert error.value.status == status
+
+
+@pytest.mark.asyncio
+async def test_oversized_head_is_rejected():
+    reader = asyncio.StreamReader(limit=64)
+    reader.feed_data(b"GET /" + b"a" * 200 + b" HTTP/1.1\r\n\r\n")
+
+    with pytest.raises(HttpError) as error:
+        await read_request(reader)
+
+    assert error.value.status == 413
+
+
+@pytest.mark.asyncio
+async def test_server_answers_bad_request_and_keeps_serving():
+    async def handler(request, writer):
+        return HttpResponse.json({'path': request.path})
+
+    server, port = await start_http_server(handler)
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b"POST / HTTP/1.1\r\nContent-Length: -1\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        assert response.startswith(b"HTTP/1.1 400 Bad Request")
+        assert b'Invalid Content-Length' in response
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b"GET /report HTTP/1.1\r\nConnection: close\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        assert response.startswith(b"HTTP/1.1 200 OK")
+        assert response.endswith(b'{"path":"/report"}')
+    finally:
+        server.close()
+        await server.wait_closed()
@@ -0,0 +1,49 @@
+"""
+Workflow IDs: unique, time-ordered, and never reused for a second workflow
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.storage import WorkflowIdAllocator
+
+
+def test_ids_are_unique_and_sort_by_creation():
+    allocator = WorkflowIdAllocator(node_id=5)
+
+    workflow_ids = allocator.allocate_many(10_000) + [allocator.allocate() for _ in range(100)]
+
+    assert len(set(workflow_ids)) == len(workflow_ids)
+    assert workflow_ids == sorted(workflow_ids)
+    assert len({len(workflow_id) for workflow_id in workflow_ids}) == 1
+
+
+def test_id_range_covers_ids_created_in_the_window():
+    allocator = WorkflowIdAllocator(node_id=1)
+    workflow_id = allocator.allocate()
+    created = allocator.timestamp_of(workflow_id)
+
+    low, high = allocator.id_range(created - timedelta(seconds=1), created + timedelta(seconds=1))
+    assert low <= workflow_id <= high
+    low, high = allocator.id_range(created + timedelta(seconds=1), created + timedelta(seconds=2))
+    assert not low <= workflow_id <= high
+    assert abs(created - datetime.now()) < timedelta(minutes=1)
+
+
+def test_invalid_node_is_rejected():
+    with pytest.raises(ValueError):
+        WorkflowIdAllocator(node_id=1024)
+
+
+@pytest.mark.asyncio
+async def test_caller_supplied_id_cannot_replace_a_workflow(make_engine):
+    engine = make_engine(tasks=2)
+    workflow_id = (await engine.organize_workflow('First', workflow_id='workflow_fixed'))['workflow_id']
+    await engine.mark_completed(workflow_id, ['t0'])
+
+    result = await engine.organize_workflow('Second', workflow_id=workflow_id)
+
+    assert 'already in use' in result['error']
+    assert engine.active_workflows.get(workflow_id).description == 'First'
+    assert (await engine.mark_completed(workflow_id, ['t1']))['completed_tasks'] == 2
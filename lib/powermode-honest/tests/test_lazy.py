@@ -0,0 +1,66 @@
+"""
+Lazy components and the process-wide shared engine
+"""
+
+from collections import Counter
+
+from conftest import engine_config
+from core.lazy import LazyComponent
+from main import PowerModeHonest
+
+
+class Owner:
+    counter = LazyComponent('collections', 'Counter')
+
+    def __init__(self):
+        self.wrapped = []
+
+    def _wrap_component(self, name, component):
+        self.wrapped.append(name)
+        return component
+
+
+def test_component_is_built_once_on_first_access():
+    owner = Owner()
+    assert not LazyComponent.is_built(owner, 'counter')
+
+    counter = owner.counter
+
+    assert isinstance(counter, Counter)
+    assert owner.counter is counter
+    assert LazyComponent.is_built(owner, 'counter')
+    assert owner.wrapped == ['counter']
+    assert Owner().counter is not counter
+
+
+def test_assignment_replaces_the_component():
+    owner = Owner()
+    owner.counter = 'double'
+
+    assert owner.counter == 'double'
+    assert owner.wrapped == []
+
+
+def test_engine_builds_no_component_up_front(tmp_path):
+    engine = PowerModeHonest(engine_config(str(tmp_path)))
+    try:
+        for name in ('workflow_organizer', 'config_manager', 'task_manager', 'metrics'):
+            assert not LazyComponent.is_built(engine, name)
+    finally:
+        engine.close()
+
+
+def test_shared_engine_is_reused_until_closed(tmp_path):
+    config = engine_config(str(tmp_path))
+    shared = PowerModeHonest.shared(config)
+    try:
+        assert PowerModeHonest.shared() is shared
+    finally:
+        shared.close()
+
+    fresh = PowerModeHonest.shared(config)
+    try:
+        assert fresh is not shared
+    finally:
+        fresh.close()
+    assert PowerModeHonest._shared_instance is None
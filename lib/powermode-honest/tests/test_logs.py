@@ -0,0 +1,64 @@
+"""
+Logging pipeline: size rotation, JSON lines and sampling
+"""
+
+import json
+import logging
+import os
+
+from core.observability import JsonLinesFormatter, SamplingFilter
+from core.observability.logs import SizeAndTimeRotatingFileHandler
+
+
+class CountingFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(message)s')
+        self.calls = 0
+
+    def format(self, record: logging.LogRecord) -> str:
+        self.calls += 1
+        return super().format(record)
+
+
+def _record(message: str, level: int = logging.INFO, name: str = 'PowerModeHonest') -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 0, message, None, None)
+
+
+def test_size_rotation_keeps_every_record_and_formats_each_once(tmp_path):
+    path = os.path.join(tmp_path, 'engine.log')
+    handler = SizeAndTimeRotatingFileHandler(path, max_bytes=100, when='midnight', backupCount=50, encoding='utf-8')
+    formatter = CountingFormatter()
+    handler.setFormatter(formatter)
+
+    for i in range(20):
+        handler.emit(_record(f"record {i:02d} " + 'x' * 20))
+    handler.close()
+
+    assert formatter.calls == 20
+    files = sorted(os.listdir(tmp_path))
+    assert len(files) > 5
+    lines = []
+    for name in files:
+        with open(os.path.join(tmp_path, name), encoding='utf-8') as f:
+            content = f.read()
+        assert len(content) < 100
+        lines += content.splitlines()
+    assert sorted(lines) == [f"record {i:02d} " + 'x' * 20 for i in range(20)]
+
+
+def test_json_lines_formatter():
+    line = JsonLinesFormatter().format(_record('organized "release"', logging.WARNING))
+
+    entry = json.loads(line)
+    assert (entry['level'], entry['logger'], entry['message']) == ('WARNING', 'PowerModeHonest', 'organized "release"')
+    assert 'ts' in entry and '\n' not in line
+
+
+def test_sampling_keeps_one_in_n_below_warning():
+    sampling = SamplingFilter({'PowerModeHonest': 10})
+
+    kept = sum(sampling.filter(_record('tick', name='PowerModeHonest.operations')) for _ in range(100))
+    warnings = sum(sampling.filter(_record('slow', logging.WARNING)) for _ in range(5))
+    other = sum(sampling.filter(_record('tick', name='asyncio')) for _ in range(5))
+
+    assert (kept, warnings, other) == (10, 5, 5)
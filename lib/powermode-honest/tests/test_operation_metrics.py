@@ -0,0 +1,98 @@
+"""
+Latency histograms: percentiles within the bucket error bound, and a
+well-formed Prometheus exposition
+"""
+
+import random
+import re
+
+import numpy as np
+import pytest
+
+from core.observability import LogLinearHistogram, OperationMetrics
+from core.observability.operations import PROMETHEUS_BUCKETS_US
+
+
+def test_percentiles_stay_within_the_relative_error_bound():
+    random.seed(3)
+    values = [int(random.lognormvariate(8, 2)) for _ in range(50_000)]
+    histogram = LogLinearHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for percent in (50, 90, 99, 99.9):
+        exact = np.percentile(values, percent, method='inverted_cdf')
+        assert abs(histogram.percentile(percent) - exact) <= exact * 2 ** -6 + 1
+
+    assert (histogram.count, histogram.min, histogram.max) == (len(values), min(values), max(values))
+    assert histogram.percentile(100) == max(values)
+
+
+def test_small_values_are_exact_and_large_ones_are_capped():
+    histogram = LogLinearHistogram(max_value=10_000)
+    for value in (0, 1, 2, 3, 50_000):
+        histogram.record(value)
+
+    assert [histogram.percentile(p) for p in (20, 40, 60, 80, 100)] == [0, 1, 2, 3, 10_000]
+    assert LogLinearHistogram().percentile(99) == 0
+
+
+def test_cumulative_counts_never_overcount():
+    histogram = LogLinearHistogram()
+    values = list(range(0, 200_000, 37))
+    for value in values:
+        histogram.record(value)
+
+    counts = histogram.cumulative_counts([100, 1_000, 99_999, 10 ** 9])
+
+    # A bucket straddling a bound is left out of it, so counts may lag but never exceed
+    for bound, count in counts:
+        assert count <= sum(1 for value in values if value <= bound)
+    assert counts[:2] == [(100, 3), (1_000, 28)]
+    assert [count for _, count in counts] == sorted(count for _, count in counts)
+    assert counts[-1] == (10 ** 9, len(values))
+
+
+def test_prometheus_exposition():
+    metrics = OperationMetrics()
+    for _ in range(10):
+        with metrics.track('organize'):
+            pass
+    with pytest.raises(RuntimeError):
+        with metrics.track('track'):
+            raise RuntimeError('boom')
+    with metrics.track('report') as outcome:
+        outcome['failed'] = True
+
+    text = metrics.render_prometheus()
+
+    assert text.endswith('\n')
+    sample = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? -?[0-9.e+-]+$')
+    for line in text.splitlines():
+        assert line.startswith('# HELP ') or line.startswith('# TYPE ') or sample.match(line), line
+
+    buckets = [
+        int(line.rsplit(' ', 1)[1]) for line in text.splitlines()
+        if line.startswith('powermode_operation_duration_seconds_bucket{operation="organize"')
+    ]
+    assert len(buckets) == len(PROMETHEUS_BUCKETS_US) + 1
+    assert buckets == sorted(buckets) and buckets[-1] == 10
+    assert 'powermode_operation_duration_seconds_count{operation="organize"} 10' in text
+    assert 'powermode_operations_failed_total{operation="track"} 1' in text
+    assert 'powermode_operations_failed_total{operation="report"} 1' in text
+    assert 'powermode_operations_in_flight{operation="organize"} 0' in text
+
+
+@pytest.mark.asyncio
+async def test_engine_counts_error_results_as_failures(make_engine):
+    engine = make_engine()
+    workflow_id = (await engine.organize_workflow('Release'))['workflow_id']
+    await engine.mark_completed(workflow_id, ['t0'])
+    await engine.mark_completed('missing', ['t0'])
+
+    operations = engine.operation_metrics.summary()['operations']
+
+    assert (operations['organize']['calls'], operations['organize']['failed']) == (1, 0)
+    assert (operations['track']['calls'], operations['track']['failed']) == (2, 1)
+    assert set(operations['track']['latency_ms']) == {'p50', 'p90', 'p99', 'p999', 'mean', 'max'}
+    assert 'powermode_operations_started_total{operation="track"} 2' in engine.prometheus_metrics()
@@ -0,0 +1,69 @@
+"""
+Task completion: validated, idempotent updates and IDs for tasks without one
+"""
+
+from typing import Any, Dict
+
+import pytest
+
+from core.progress import TaskIndex, task_id_of, with_task_ids
+
+
+@pytest.mark.asyncio
+async def test_unknown_task_ids_are_rejected_without_a_write(make_engine):
+    engine = make_engine(tasks=3)
+    workflow_id = (await engine.organize_workflow('Ship it'))['workflow_id']
+    version = engine.active_workflows.get(workflow_id).version
+
+    result = await engine.mark_completed(workflow_id, ['t0', 'ghost'])
+
+    assert result['unknown_tasks'] == ['ghost'] and 'error' in result
+    assert engine.active_workflows.get(workflow_id).version == version
+    assert engine.active_workflows.get(workflow_id).completed_mask == 0
+
+
+@pytest.mark.asyncio
+async def test_completion_is_idempotent_and_reopen_undoes_it(make_engine):
+    engine = make_engine(tasks=4)
+    workflow_id = (await engine.organize_workflow('Ship it'))['workflow_id']
+
+    first = await engine.mark_completed(workflow_id, ['t0', 't1', 't1'])
+    version = engine.active_workflows.get(workflow_id).version
+    again = await engine.mark_completed(workflow_id, ['t1'])
+    reopened = await engine.mark_reopened(workflow_id, ['t0'])
+
+    assert (first['completed_tasks'], first['changed_tasks'], first['progress_percent']) == (2, 2, 50.0)
+    assert again['changed_tasks'] == 0
+    assert engine.active_workflows.get(workflow_id).version == version + 1  # Only the reopen wrote
+    assert (reopened['completed_tasks'], reopened['progress_percent']) == (1, 25.0)
+    assert (await engine.mark_completed('workflow_missing', ['t0']))['error'] == 'Workflow not found'
+
+
+class AnonymousTaskOrganizer:
+    """Organizer double whose tasks carry no 'id' or 'name'"""
+
+    async def create_structure(self, task_description: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        return {'tasks': [{'estimated_effort': 1}, {'id': 'review'}, {'estimated_effort': 2}]}
+
+
+@pytest.mark.asyncio
+async def test_tasks_without_ids_get_positional_ids(make_engine):
+    engine = make_engine()
+    engine.workflow_organizer = AnonymousTaskOrganizer()
+
+    organized = await engine.organize_workflow('Anonymous steps')
+    task_ids = [task['id'] for task in organized['structure']['tasks']]
+    result = await engine.mark_completed(organized['workflow_id'], ['task-2'])
+
+    assert task_ids == ['task-0', 'review', 'task-2']
+    assert 'error' not in result and result['completed_tasks'] == 1
+    assert 'None' not in TaskIndex(engine.active_workflows.get(organized['workflow_id']).structure).positions
+
+
+def test_task_id_of_needs_a_position_for_anonymous_tasks():
+    structure = {'tasks': [{'id': 'a'}, {'name': 'b'}]}
+
+    assert with_task_ids(structure) is structure
+    assert task_id_of({}, 3) == 'task-3'
+    with pytest.raises(ValueError):
+        task_id_of({'id': None})
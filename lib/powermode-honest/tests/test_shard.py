@@ -0,0 +1,72 @@
+"""
+Sharded engine: routing, relayed change events, router metrics and ID node leases
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from conftest import StubEngine, engine_config
+from core.shard import ShardRouter, shard_for
+from core.storage import WorkflowIdAllocator
+
+
+@pytest.mark.asyncio
+async def test_router_routes_to_owning_shards_and_relays_their_changes(tmp_path):
+    router = ShardRouter(StubEngine, 2, engine_config(str(tmp_path)))
+    await router.start()
+    try:
+        subscription = router.subscribe_changes()
+        await router._relay  # Every shard relays from here on
+
+        results = await router.organize_workflows([f"Workflow {i}" for i in range(20)], max_concurrency=4)
+        assert [result['index'] for result in results] == list(range(20))
+        workflow_ids = [result['workflow_id'] for result in results]
+        assert len(set(workflow_ids)) == 20
+        assert {router.shard_for(workflow_id) for workflow_id in workflow_ids} == {0, 1}
+
+        # Found on the shard that owns it, so the update lands
+        progress = await router.mark_completed(workflow_ids[0], ['t0'])
+        assert 'error' not in progress and progress['completed_tasks'] == 1
+
+        events = []
+        while len(events) < 21:
+            events.append(await asyncio.wait_for(subscription.get(), 5))
+        organized = [event for event in events if event.type == 'workflow_organized']
+        assert len(organized) == 20
+        assert all(event.data['shard'] == router.shard_for(event.workflow_id) for event in events)
+        assert events[-1].type == 'progress_updated' and events[-1].workflow_id == workflow_ids[0]
+
+        report = await router.generate_report()
+        assert report['total_workflows'] == 20
+        assert 'powermode_operations_started_total{operation="organize"} 20' in router.prometheus_metrics()
+
+        combined = await router.update_progress(workflow_ids[1], complete=['t1', 't2'], reopen=['t1'])
+        assert (combined['completed_tasks'], combined['changed_tasks']) == (1, 1)
+    finally:
+        await router.close()
+    assert subscription.closed
+
+
+@pytest.mark.asyncio
+async def test_routers_sharing_a_data_dir_lease_distinct_nodes(tmp_path):
+    config = engine_config(str(tmp_path), {'backend': 'sqlite', 'path': 'workflows.db'})
+    config['data_dir'] = str(tmp_path / 'data')
+    first = ShardRouter(StubEngine, 2, config)
+    second = ShardRouter(StubEngine, 2, config)
+
+    assert os.path.exists(tmp_path / 'data' / 'workflows.db')
+    assert first.id_allocator.node_id != second.id_allocator.node_id
+    await first.close()
+    await second.close()
+    assert first.lease.node_id is None and second.lease.node_id is None
+
+
+def test_sequential_ids_spread_evenly_over_shards():
+    workflow_ids = WorkflowIdAllocator(node_id=77).allocate_many(4000)
+    owners = [shard_for(workflow_id, 2) for workflow_id in workflow_ids]
+
+    assert abs(owners.count(0) - 2000) < 150
+    # A burst of consecutive IDs must not pile onto one shard
+    assert all(len(set(owners[start:start + 20])) == 2 for start in range(0, 4000, 20))
@@ -0,0 +1,119 @@
+"""
+SQLite store: what goes in comes back, also after a restart
+"""
+
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from core.storage import NodeLease, NodeLeaseError, SQLiteWorkflowStore, WorkflowIdAllocator, WorkflowRecord
+
+
+def _record(description: str = 'Plan release', tasks: int = 3) -> WorkflowRecord:
+    return WorkflowRecord(description, {'tasks': [{'id': f"t{i}"} for i in range(tasks)]})
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'workflows.db')
+
+
+def test_round_trip(db_path):
+    store = SQLiteWorkflowStore(db_path, batch_size=2)
+    store.put('w1', _record())
+    store.update('w1', progress=40.0, completed_mask=0b11)
+
+    workflow = store.get('w1')
+    assert workflow.description == 'Plan release'
+    assert workflow.progress == 40.0
+    assert workflow.completed_mask == 0b11
+    assert workflow.structure['tasks'][2]['id'] == 't2'
+    assert store.get('missing') is None
+    store.close()
+
+
+def test_state_survives_restart(db_path):
+    store = SQLiteWorkflowStore(db_path, batch_size=100)
+    for i in range(10):
+        store.put(f"w{i}", _record(f"Workflow {i}"))
+    store.update('w3', progress=100.0)
+    store.update('w4', progress=50.0)
+    store.delete('w9')
+    store.close()  # Pending batch written on close
+
+    reopened = SQLiteWorkflowStore(db_path, cache_size=4)
+    assert len(reopened) == 9
+    assert reopened.get('w9') is None
+    assert reopened.get('w3').progress == 100.0
+    assert reopened.get('w4').version == 2
+    assert reopened.get('w0').description == 'Workflow 0'
+    assert reopened.verify_aggregates()['consistent']
+    assert reopened.aggregates.completed == 1
+    reopened.close()
+
+
+def test_range_by_id_scans_in_id_order(db_path):
+    store = SQLiteWorkflowStore(db_path)
+    for workflow_id in ('w3', 'w1', 'w2', 'w5'):
+        store.put(workflow_id, _record())
+
+    assert [workflow_id for workflow_id, _ in store.range_by_id('w2', 'w4')] == ['w2', 'w3']
+    store.close()
+
+
+def test_processes_sharing_a_database_get_distinct_nodes(db_path):
+    first = SQLiteWorkflowStore(db_path)
+    second = SQLiteWorkflowStore(db_path)
+
+    nodes = {first.lease_node_id(), second.lease_node_id()}
+    assert len(nodes) == 2
+    with pytest.raises(NodeLeaseError):
+        second.lease_node_id(first.leased_node_id)
+    assert second.leased_node_id in nodes  # A refused request keeps the current lease
+
+    released = first.leased_node_id
+    first.close()
+    assert SQLiteWorkflowStore(db_path).lease_node_id(released) == released
+    second.close()
+
+
+def test_ids_from_leased_nodes_do_not_collide(db_path):
+    stores = [SQLiteWorkflowStore(db_path) for _ in range(3)]
+    allocators = [WorkflowIdAllocator(node_id=store.lease_node_id()) for store in stores]
+
+    ids = [workflow_id for allocator in allocators for workflow_id in allocator.allocate_many(1000)]
+    assert len(set(ids)) == len(ids)
+    for store in stores:
+        store.close()
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_is_flushed_after_the_interval(db_path):
+    store = SQLiteWorkflowStore(db_path, batch_size=500, flush_interval_seconds=0.05)
+    store.put('w1', _record())
+    reader = SQLiteWorkflowStore(db_path, warm_on_open=False)
+    assert reader.get('w1') is None  # Still buffered
+
+    await asyncio.sleep(0.2)
+
+    assert reader.get('w1').description == 'Plan release'
+    reader.close()
+    store.close()
+
+
+def test_lease_heartbeat_is_renewed_without_writes(db_path):
+    lease = NodeLease(db_path, timeout_seconds=0.2)
+    node_id = lease.acquire()
+
+    def heartbeat() -> float:
+        with sqlite3.connect(db_path) as conn:
+            return conn.execute("SELECT heartbeat FROM node_leases WHERE node_id = ?", (node_id,)).fetchone()[0]
+
+    first = heartbeat()
+    time.sleep(0.3)
+    assert heartbeat() > first
+    lease.release()
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM node_leases").fetchone()[0] == 0
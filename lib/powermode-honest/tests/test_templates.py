@@ -0,0 +1,113 @@
+"""
+Template registry: keyword trie scoring, validation and hot reload
+"""
+
+import json
+import os
+
+import pytest
+
+from core.templates import CompiledTemplates, TemplateError, TemplateRegistry, WorkflowTemplate
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), '..', 'templates')
+SHIPPED = {
+    'development': 'dev_workflow.json',
+    'research': 'research_workflow.json',
+    'planning': 'planning_workflow.json',
+}
+
+
+def _template(workflow_type: str, keywords, priority: int = 0) -> WorkflowTemplate:
+    return WorkflowTemplate.from_dict({'workflow_type': workflow_type, 'keywords': keywords, 'priority': priority})
+
+
+def _write(directory, name: str, data) -> str:
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    return path
+
+
+def test_phrases_overlapping_in_the_trie_all_score():
+    compiled = CompiledTemplates([
+        _template('web', {'web': 1, 'web app': 3, 'app': 1}),
+        _template('mobile', {'mobile app': 5, 'app store': 2}),
+    ])
+
+    assert compiled.scores('Build a WEB app!') == {0: 5.0}
+    assert compiled.scores('mobile app store listing') == {0: 1.0, 1: 7.0}
+    assert compiled.best('mobile app store listing').workflow_type == 'mobile'
+    assert compiled.best('nothing relevant') is None
+    assert (compiled.max_phrase, compiled.phrase_count) == (2, 5)
+
+
+def test_ties_go_to_priority_then_configured_order():
+    first, second = _template('first', ['plan']), _template('second', ['plan'])
+    assert CompiledTemplates([first, second]).best('plan').workflow_type == 'first'
+
+    urgent = _template('urgent', ['plan'], priority=1)
+    assert CompiledTemplates([first, urgent]).best('plan').workflow_type == 'urgent'
+
+
+@pytest.mark.parametrize('data', [
+    [],
+    {'keywords': ['x']},
+    {'workflow_type': 'x', 'keywords': []},
+    {'workflow_type': 'x', 'keywords': {'!!!': 1}},
+    {'workflow_type': 'x', 'keywords': {'plan': 0}},
+    {'workflow_type': 'x', 'keywords': {'plan': True}},
+    {'workflow_type': 'x', 'keywords': ['plan'], 'phases': 'design'},
+    {'workflow_type': 'x', 'keywords': ['plan'], 'priority': 1.5},
+])
+def test_invalid_templates_are_rejected(data):
+    with pytest.raises(TemplateError):
+        WorkflowTemplate.from_dict(data)
+
+
+def test_shipped_templates_classify_descriptions():
+    registry = TemplateRegistry(SHIPPED, base_dir=TEMPLATE_DIR, default_type='planning')
+
+    assert registry.classify('Build a web app with user authentication') == 'development'
+    assert registry.classify('xyzzy') == 'planning'
+    assert registry.stats()['templates'] == 3
+    assert registry.load_errors == 0
+
+
+def test_changed_file_is_reloaded_and_a_broken_one_keeps_its_last_version(tmp_path):
+    path = _write(tmp_path, 'ops.json', {'workflow_type': 'ops', 'keywords': ['deploy']})
+    registry = TemplateRegistry({'ops': path}, check_interval_seconds=3600)
+    assert registry.classify('deploy the service') == 'ops'
+
+    _write(tmp_path, 'ops.json', {'workflow_type': 'ops', 'keywords': ['rollback']})
+    os.utime(path, (1, 1))
+    assert registry.classify('rollback now') is None  # Not re-checked before the interval
+    registry.reload()
+    assert registry.classify('rollback now') == 'ops'
+    assert registry.reloads == 1
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{not json')
+    os.utime(path, (2, 2))
+    registry.reload()
+    os.remove(path)
+    registry.reload()
+
+    assert registry.classify('rollback now') == 'ops'
+    assert registry.load_errors == 1
+    assert registry.get('ops').keywords == {('rollback',): 1.0}
+
+
+@pytest.mark.asyncio
+async def test_classify_async_reloads_in_the_background(tmp_path):
+    path = _write(tmp_path, 'ops.json', {'workflow_type': 'ops', 'keywords': ['deploy']})
+    registry = TemplateRegistry({'ops': path}, check_interval_seconds=0)
+    assert await registry.classify_async('deploy it') == 'ops'
+
+    _write(tmp_path, 'ops.json', {'workflow_type': 'ops', 'keywords': ['rollback']})
+    os.utime(path, (1, 1))
+    # The first call after the change still uses the current matcher while the reload runs
+    assert await registry.classify_async('rollback') is None
+    if registry._refreshing is not None:
+        await registry._refreshing
+
+    assert await registry.classify_async('rollback') == 'ops'
@@ -0,0 +1,175 @@
+"""
+Hot/cold tiering: archived workflows come back, a promotion is never lost
+and sweeps under an event loop run in the background
+
+The durability tests run the store in a child process that exits with
+os._exit() right after a read promoted a workflow - no close(), no
+atexit flush - and check the workflow from a fresh process.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+
+import pytest
+
+from core.storage import ColdArchive, SQLiteWorkflowStore, TieredWorkflowStore, WorkflowRecord
+from core.storage.record import epoch_ms
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+def _tiered(directory: str) -> TieredWorkflowStore:
+    return TieredWorkflowStore(
+        SQLiteWorkflowStore(os.path.join(directory, 'hot.db')),
+        ColdArchive(os.path.join(directory, 'cold')),
+        completed_after_seconds=0, sweep_interval_seconds=3600
+    )
+
+
+def _run(directory: str, script: str) -> str:
+    prelude = f"import os, sys\nsys.path.insert(0, {PACKAGE_DIR!r})\nfrom test_tiering import _tiered\n"
+    result = subprocess.run(
+        [sys.executable, '-c', prelude + textwrap.dedent(script), directory],
+        cwd=os.path.dirname(__file__), capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+
+def test_completed_workflows_are_archived_and_promoted(tmp_path):
+    store = _tiered(str(tmp_path))
+    store.put('w1', WorkflowRecord('Done', {'tasks': []}))
+    store.put('w2', WorkflowRecord('Open', {'tasks': []}))
+    store.update('w1', progress=100.0)
+
+    result = store.sweep(now=epoch_ms() + 10)
+    assert (result['archived'], result['hot_workflows'], result['cold_workflows']) == (1, 1, 1)
+    assert len(store) == 2
+
+    assert store.get('w1').progress == 100.0
+    assert store.promoted == 1
+    assert (len(store.hot), len(store.cold)) == (2, 0)
+    assert store.verify_aggregates()['consistent']
+    store.close()
+
+
+def _archive_completed(directory: str) -> None:
+    _run(directory, """
+        from core.storage import WorkflowRecord
+        from core.storage.record import epoch_ms
+        store = _tiered(sys.argv[1])
+        store.put('w1', WorkflowRecord('Release', {'tasks': []}))
+        store.update('w1', progress=100.0)
+        store.sweep(now=epoch_ms() + 10)
+        store.close()
+    """)
+
+
+def _check_after_crash(directory: str) -> str:
+    return _run(directory, """
+        store = _tiered(sys.argv[1])
+        workflow = store.get('w1')
+        print(workflow is not None and workflow.progress, len(store))
+        store.close()
+    """)
+
+
+def test_promotion_survives_a_crash(tmp_path):
+    directory = str(tmp_path)
+    _archive_completed(directory)
+
+    promoted = _run(directory, """
+        store = _tiered(sys.argv[1])
+        print(store.get('w1').progress)
+        sys.stdout.flush()
+        os._exit(0)
+    """)
+    assert promoted == '100.0'
+    assert _check_after_crash(directory) == '100.0 1'
+
+
+def test_crash_before_a_deferred_promotion_is_synced_loses_nothing(tmp_path):
+    directory = str(tmp_path)
+    _archive_completed(directory)
+
+    # Under a running loop the promotion is only made durable by the background task
+    promoted = _run(directory, """
+        import asyncio
+
+        async def read_and_crash():
+            store = _tiered(sys.argv[1])
+            print(store.get('w1').progress, store.tier_stats()['unsynced_promotions'])
+            sys.stdout.flush()
+            os._exit(0)
+
+        asyncio.run(read_and_crash())
+    """)
+    assert promoted == '100.0 1'
+    assert _check_after_crash(directory) == '100.0 1'
+
+
+@pytest.mark.asyncio
+async def test_promotions_are_synced_in_one_background_batch(tmp_path):
+    store = _tiered(str(tmp_path))
+    for i in range(3):
+        store.put(f"w{i}", WorkflowRecord(f"Done {i}", {'tasks': []}))
+        store.update(f"w{i}", progress=100.0)
+    store.sweep(now=epoch_ms() + 10)
+
+    assert [store.get(f"w{i}").progress for i in range(3)] == [100.0] * 3
+    assert store.tier_stats()['unsynced_promotions'] == 3
+    await asyncio.sleep(0.05)
+    assert store.tier_stats()['unsynced_promotions'] == 0
+    store.close()
+
+    reopened = _tiered(str(tmp_path))
+    assert (len(reopened.hot), len(reopened.cold), len(reopened)) == (3, 0, 3)
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_write_path_does_not_run_the_sweep(tmp_path):
+    store = TieredWorkflowStore(
+        SQLiteWorkflowStore(os.path.join(tmp_path, 'hot.db')), ColdArchive(os.path.join(tmp_path, 'cold')),
+        completed_after_seconds=0, sweep_interval_seconds=0
+    )
+    store.put('w1', WorkflowRecord('Done', {'tasks': []}))
+
+    store.update('w1', progress=100.0)
+    assert store.sweeps == 0  # Scheduled, not run inline
+    await asyncio.sleep(0.05)
+    assert store.sweeps >= 1 and len(store.cold) == 1
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_workflow_written_during_a_background_sweep_stays_hot(tmp_path):
+    store = _tiered(str(tmp_path))
+    for workflow_id in ('w1', 'w2'):
+        store.put(workflow_id, WorkflowRecord('Release', {'tasks': []}))
+        store.update(workflow_id, progress=100.0)
+    release = threading.Event()
+    write_block = store.cold.write_block
+
+    def slow_write_block(block):
+        release.wait(5)
+        return write_block(block)
+
+    store.cold.write_block = slow_write_block
+    sweep = asyncio.ensure_future(store.sweep_async(now=epoch_ms() + 10))
+    await asyncio.sleep(0.05)  # The loop keeps running while the block is written
+    store.update('w1', progress=90.0)
+    release.set()
+
+    assert (await sweep)['archived'] == 1
+    assert (len(store.hot), len(store.cold)) == (1, 1)
+    assert store.get('w1').progress == 90.0
+    assert store.verify_aggregates()['consistent']
+    store.close()
+
+    reopened = _tiered(str(tmp_path))
+    assert len(reopened) == 2 and reopened.get('w1').progress == 90.0
+    reopened.close()
@@ -0,0 +1,133 @@
+"""
+Tracing and profiling: spans follow awaits and tasks, exports are
+well-formed, and the profiler samples the configured fraction of calls
+"""
+
+import asyncio
+import json
+import os
+import pstats
+
+import pytest
+
+from conftest import engine_config
+from core.observability import SamplingProfiler, TracedComponent, Tracer, current_span
+
+
+@pytest.mark.asyncio
+async def test_children_in_tasks_share_the_trace_and_get_their_own_lane():
+    tracer = Tracer(enabled=True)
+
+    async def child(name):
+        await asyncio.sleep(0)
+        with tracer.span(name) as span:
+            await asyncio.sleep(0)
+            return span
+
+    with tracer.span('parent') as parent:
+        first, second = await asyncio.gather(child('first'), child('second'))
+        assert current_span() is parent
+    assert current_span() is None
+
+    assert first.parent_id == second.parent_id == parent.span_id
+    assert first.trace_id == second.trace_id == parent.trace_id
+    assert first.lane != second.lane
+    with tracer.span('unrelated') as other:
+        assert other.parent_id is None and other.trace_id != parent.trace_id
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+
+    with tracer.span('ignored') as span:
+        assert span is None
+
+    assert tracer.stats()['finished_spans'] == 0
+
+
+def test_ring_buffer_and_errors():
+    tracer = Tracer(enabled=True, max_spans=3)
+    for i in range(5):
+        with tracer.span(f"s{i}"):
+            pass
+    with pytest.raises(ValueError):
+        with tracer.span('failing'):
+            raise ValueError('bad input')
+
+    assert [span.name for span in tracer.spans()] == ['s3', 's4', 'failing']
+    assert tracer.spans()[-1].error == 'ValueError: bad input'
+    assert tracer.stats()['dropped_spans'] == 3
+
+
+def test_exports(tmp_path):
+    tracer = Tracer(enabled=True, service_name='test-service')
+    with tracer.span('outer', items=3):
+        with tracer.span('inner', cached=True):
+            pass
+
+    chrome_path = os.path.join(tmp_path, 'trace.json')
+    assert tracer.export(chrome_path) == 2
+    with open(chrome_path, encoding='utf-8') as f:
+        events = json.load(f)['traceEvents']
+    assert [(event['name'], event['ph']) for event in events] == [
+        ('outer', 'b'), ('inner', 'b'), ('inner', 'e'), ('outer', 'e')
+    ]
+
+    otlp_path = os.path.join(tmp_path, 'trace.jsonl')
+    tracer.export(otlp_path, 'otlp')
+    tracer.export(otlp_path, 'otlp')
+    with open(otlp_path, encoding='utf-8') as f:
+        requests = [json.loads(line) for line in f]
+    assert len(requests) == 2
+    spans = {span['name']: span for span in requests[0]['resourceSpans'][0]['scopeSpans'][0]['spans']}
+    assert spans['inner']['parentSpanId'] == spans['outer']['spanId']
+    assert 'parentSpanId' not in spans['outer']
+    assert spans['outer']['attributes'] == [{'key': 'items', 'value': {'intValue': '3'}}]
+    assert spans['inner']['attributes'] == [{'key': 'cached', 'value': {'boolValue': True}}]
+
+
+@pytest.mark.asyncio
+async def test_engine_component_calls_nest_under_the_operation(make_engine, tmp_path):
+    config = engine_config(str(tmp_path))
+    config['tracing'] = {'enabled': True}
+    engine = make_engine(config)
+    engine._trace_components()
+    assert isinstance(engine.workflow_organizer, TracedComponent)
+
+    await engine.organize_workflow('Release')
+
+    spans = {span.name: span for span in engine.tracer.spans()}
+    organize = spans['PowerModeHonest.organize_workflow']
+    assert spans['workflow_organizer.create_structure'].parent_id == organize.span_id
+    assert spans['workflow_organizer.create_structure'].trace_id == organize.trace_id
+
+
+def _busy() -> int:
+    return sum(i * i for i in range(1000))
+
+
+def test_profiler_samples_and_writes_pstats(tmp_path):
+    profiler = SamplingProfiler(sample_rate=1.0, directory=str(tmp_path), flush_every=2)
+    for _ in range(3):
+        with profiler.profile('organize') as sample:
+            assert sample is not None
+            with profiler.profile('nested') as nested:
+                assert nested is None  # Only one call is profiled at a time
+            _busy()
+    profiler.flush()
+
+    assert profiler.stats()['samples'] == {'organize': 3}
+    assert profiler.skipped == 3 and profiler.write_errors == 0
+    stats = pstats.Stats(profiler.path_for('organize'))
+    assert any(function[2] == '_busy' and calls[0] == 3 for function, calls in stats.stats.items())
+
+
+def test_profiler_off_and_invalid_rates(tmp_path):
+    profiler = SamplingProfiler(directory=str(tmp_path))
+    with profiler.profile('organize') as sample:
+        assert sample is None
+    profiler.flush()
+
+    assert not profiler.enabled and os.listdir(tmp_path) == []
+    with pytest.raises(ValueError):
+        SamplingProfiler(sample_rate=1.5)